@@ -1,30 +1,33 @@
 #admin.py
 import io
+import tempfile
 from django.contrib import messages
-import re
-from django.core.files.base import ContentFile
 from django.urls import path, reverse
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import admin
 from django.contrib.auth.models import User
 from .models import (
     Course, QuestionImage, Exam, Question, 
-    StudentAnswer, ExamSession, StudentClass, StudentScore, CourseRegistration
+    StudentAnswer, ExamSession, StudentClass, StudentScore, CourseRegistration, Job, RelayNode
 )
 from django.utils.html import format_html
 from django.utils.text import slugify
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from docx import Document
 from docx.shared import Inches
 from docx.shared import Pt, RGBColor
 import io
 from .views import grade_essays
-import openpyxl
-from openpyxl.styles import Font
-from django.db.models import Sum
-from xhtml2pdf import pisa
-from django.template.loader import get_template
 from .admin_base import SchoolScopedAdmin, is_school_admin, is_superadmin
+from .exam_cache import invalidate_exam
+from .scoring import score_exam
+from .answer_keys import regrade_exam
+from .broadsheet import select_exams, stream_broadsheet
+from .exports import stream_results_csv, stream_results_xlsx
+from .jobs import enqueue, progress_url
+from .result_slips import slip_header, slip_rows, write_class_zip, write_slips
+from .exam_clock import extend_time, force_submit
+from .exam_packs import get_exam_pack
 from .admin_users import SchoolAdmin, CustomUserAdmin # Triggers registration
 
 from unfold.admin import ModelAdmin # Ensure you use this
@@ -142,6 +145,8 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
     inlines = [QuestionInline]
     list_display = ("title", "course", "academic_year","total_questions", "grading_actions")
     list_filter = ("academic_year", "course")
+    actions = ['rescore_exams', 'regrade_exams', 'extend_exam_time', 'force_submit_exams', 'export_broadsheet', 'build_exam_packs']
+    actions_list = ["broadsheet_link"]
     
     def get_urls(self):
         urls = super().get_urls()
@@ -151,6 +156,8 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
             path('<int:exam_id>/grade-essays/', self.grade_essays_view, name="grade-essays"),
             path('<int:exam_id>/export-results/', self.export_results, name="export-exam-results"),
             path('<int:exam_id>/print-slips/', self.print_result_slips, name="print-result-slips"),
+            path('<int:exam_id>/regrades/', self.admin_site.admin_view(self.regrades_view), name="exam-regrades"),
+            path('broadsheet/', self.admin_site.admin_view(self.broadsheet_view), name="exam-broadsheet"),
         ]
         return custom_urls + urls
     
@@ -181,6 +188,9 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
             if new_questions:
                 Question.objects.bulk_create(new_questions)
                 self.message_user(request, f"Automatically generated {len(new_questions)} question placeholders.")
+
+        # bulk_create skips post_save, so drop the cached paper explicitly
+        invalidate_exam(obj.id)
                     
     def generate_word_template(self, request, exam_id):
         exam = self.get_object(request, exam_id)
@@ -245,93 +255,17 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
 
     def import_word_questions(self, request, exam_id):
         if request.method == "POST":
-            exam = Exam.objects.get(id=exam_id)
+            exam = self.get_object(request, exam_id)
             word_file = request.FILES.get("word_file")
-            doc = Document(word_file)
-            
-            # 1. Map Image IDs to binary data
-            images_data = {}
-            for rel in doc.part.rels.values():
-                if "image" in rel.target_ref:
-                    images_data[rel.rId] = rel.target_part.blob
-
-            # 2. Extract paragraph texts and associate images per paragraph
-            full_content = []
-            for para in doc.paragraphs:
-                found_image = None
-                if 'pic:pic' in para._p.xml:
-                    img_match = re.search(r'r:embed="(rId\d+)"', para._p.xml)
-                    if img_match:
-                        found_image = images_data.get(img_match.group(1))
-                full_content.append({'text': para.text, 'image': found_image})
-
-            full_text_blob = "\n".join([c['text'] for c in full_content])
-            blocks = full_text_blob.split("[[[% END %]]]")
-
-            def extract_tag(tag, text):
-                pattern = rf"\[\[\[% {tag} %\]\]\](.*?)\[\[\[% /{tag} %\]\]\]"
-                match = re.search(pattern, text, re.DOTALL)
-                return match.group(1).strip() if match else ""
-
-            def extract_option(letter, text):
-                pattern = rf"\[\[{letter}\]\](.*?)(\[\[|$)"
-                match = re.search(pattern, text, re.DOTALL)
-                return match.group(1).strip() if match else ""
-
-            highest_num = 0
-            content_cursor = 0
-
-            for block in blocks:
-                q_match = re.search(r"--- Question (\d+) ---", block)
-                if q_match:
-                    q_num = int(q_match.group(1))
-                    highest_num = max(highest_num, q_num)
-                    
-                    q_type = extract_tag("TYPE", block).lower()
-                    q_text = extract_tag("Q", block)
-                    opt_block = extract_tag("OPTIONS", block)
-                    q_points = extract_tag("POINTS", block) or "1.0"
-                    
-                    # Update Question data
-                    question, created = Question.objects.update_or_create(
-                        exam=exam,
-                        question_number=q_num,
-                        defaults={
-                            'school': exam.school,
-                            'question_type': q_type,
-                            'question_text': q_text,
-                            'option_a': extract_option('A', opt_block) if q_type == 'obj' else None,
-                            'option_b': extract_option('B', opt_block) if q_type == 'obj' else None,
-                            'option_c': extract_option('C', opt_block) if q_type == 'obj' else None,
-                            'option_d': extract_option('D', opt_block) if q_type == 'obj' else None,
-                            'correct_answer': extract_tag("CORRECT", block).upper(),
-                            'point': float(q_points),
-                        }
-                    )
-
-                    # Handle Images: Check content between start of this question and the END tag
-                    # We delete existing images first to prevent stacking copies on re-upload
-                    QuestionImage.objects.filter(question=question).delete()
-                    
-                    for i in range(content_cursor, len(full_content)):
-                        item = full_content[i]
-                        if item['image']:
-                            img_name = f"exam_{exam.id}_q{q_num}.png"
-                            QuestionImage.objects.create(
-                                question=question, 
-                                image=ContentFile(item['image'], name=img_name)
-                            )
-                        
-                        if "[[[% END %]]]" in item['text']:
-                            content_cursor = i + 1
-                            break
-            
-            if highest_num > exam.total_questions:
-                exam.total_questions = highest_num
-                exam.save()
-
-            self.message_user(request, f"Processed {highest_num} questions successfully.")
-            return redirect("..")
+            if not exam or not word_file:
+                return redirect("..")
+
+            # Parsing and image writes take minutes for big papers, so run it as a job
+            job = enqueue(
+                "import_word_questions", label=f"Import questions: {exam.title}",
+                school=exam.school, user=request.user, params={"exam_id": exam.id}, input_file=word_file,
+            )
+            return redirect(progress_url(job))
         return render(request, "admin/word_upload_form.html", {"exam_id": exam_id})
     
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -343,69 +277,81 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
     
     def print_result_slips(self, request, exam_id):
         exam = self.get_object(request, exam_id)
-        scores = StudentScore.objects.filter(exam=exam).select_related('user', 'user__userprofile__student_class')
-        total_possible = exam.questions.aggregate(total=Sum('point'))['total'] or 0
-        
-        template_path = 'admin/result_slips_pdf.html'
-        context = {
-            'exam': exam,
-            'scores': scores,
-            'total_possible': total_possible,
-            'school': exam.school,
-        }
-        
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'filename="results_{slugify(exam.title)}.pdf"'
-        
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        pisa_status = pisa.CreatePDF(html, dest=response)
-        if pisa_status.err:
-            return HttpResponse('We had some errors <pre>' + html + '</pre>')
-        return response
+        if not exam:
+            return redirect("..")
+
+        # Drawn page by page with reportlab, spooled to disk past a few MB and sent in chunks.
+        # ?split=class gives one PDF per class (drawn in parallel) in a zip
+        output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        header = slip_header(exam)
+        if request.GET.get("split") == "class":
+            write_class_zip(header, slip_rows(exam), output)
+            filename = f"results_{slugify(exam.title)}_by_class.zip"
+        else:
+            write_slips(header, slip_rows(exam), output)
+            filename = f"results_{slugify(exam.title)}.pdf"
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename)
     
     def export_results(self, request, exam_id):
         exam = self.get_object(request, exam_id)
-        scores = StudentScore.objects.filter(exam=exam).select_related('user', 'user__userprofile__student_class')
-        
-        # Create Workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Exam Results"
-
-        # Header Row
-        headers = ["Student Name", "Username/ID", "Class", "Score", "Total Possible", "Percentage (%)"]
-        ws.append(headers)
-        
-        # Style Header
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-
-        # Calculate Total Possible Points
-        total_possible = exam.questions.aggregate(total=Sum('point'))['total'] or 0
-
-        # Data Rows
-        for s in scores:
-            profile = getattr(s.user, 'userprofile', None)
-            class_name = str(profile.student_class) if profile else "N/A"
-            percentage = (s.score / total_possible * 100) if total_possible > 0 else 0
-            
-            ws.append([
-                s.user.get_full_name(),
-                s.user.username,
-                class_name,
-                s.score,
-                total_possible,
-                round(percentage, 2)
-            ])
-
-        # Response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename={slugify(exam.title)}_results.xlsx'
-        wb.save(response)
+        if not exam:
+            return redirect("..")
+
+        # Rows are streamed straight from the database, so the download starts at once
+        # and memory stays flat however many candidates sat the exam
+        if request.GET.get("format") == "csv":
+            response = StreamingHttpResponse(stream_results_csv(exam), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename={slugify(exam.title)}_results.csv'
+        else:
+            response = StreamingHttpResponse(
+                stream_results_xlsx(exam),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+            response['Content-Disposition'] = f'attachment; filename={slugify(exam.title)}_results.xlsx'
         return response
     
+    # -------------------
+    # Broadsheet (many exams in one workbook)
+    # -------------------
+    def broadsheet_response(self, exams, filename, student_class=None):
+        response = StreamingHttpResponse(
+            stream_broadsheet(exams, student_class),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        response['Content-Disposition'] = f'attachment; filename={slugify(filename)}_broadsheet.xlsx'
+        return response
+
+    @action(description="Export broadsheet for selected exams", icon="table_view")
+    def export_broadsheet(self, request, queryset):
+        exams = queryset.select_related("course").order_by("course__name", "title", "id")
+        return self.broadsheet_response(exams, "exams")
+
+    @action(description="Term Broadsheet", url_path="broadsheet-btn", icon="table_view")
+    def broadsheet_link(self, request):
+        return redirect("admin:exam-broadsheet")
+
+    def broadsheet_view(self, request):
+        school = None if is_superadmin(request.user) else request.user.userprofile.school
+        exams = self.get_queryset(request)
+        classes = StudentClass.objects.filter(school=school) if school else StudentClass.objects.all()
+
+        academic_year = request.GET.get("academic_year")
+        if academic_year:
+            student_class = classes.filter(id=request.GET.get("student_class") or None).first()
+            selected = select_exams(school, academic_year, student_class).filter(id__in=exams)
+            if not selected.exists():
+                self.message_user(request, "No exams match that year and class.", messages.WARNING)
+                return redirect("admin:exam-broadsheet")
+            name = f"{academic_year} {student_class or 'all classes'}"
+            return self.broadsheet_response(selected, name, student_class)
+
+        return render(request, "admin/broadsheet_form.html", {
+            "title": "Term Broadsheet",
+            "years": exams.order_by("-academic_year").values_list("academic_year", flat=True).distinct(),
+            "classes": classes.order_by("name", "group"),
+        })
+
     def grading_actions(self, obj):
         return format_html(
             '<div style="display: flex; gap: 6px;">'
@@ -414,15 +360,82 @@ class ExamAdmin(SchoolScopedAdmin, ModelAdmin):
             '<a class="button" style="background-color: #6366f1; color: white; border: none; padding: 5px 10px; border-radius: 4px; font-size: x-small;" href="{}">Import Questions</a>'
             '<a class="button" style="background-color: #f59e0b; color: white; border: none; padding: 5px 10px; border-radius: 4px; font-size: x-small;" href="{}">Export Results</a>'
             '<a class="button" style="background-color: #ef4444; color: white; border: none; padding: 5px 10px; border-radius: 4px; font-size: x-small;" href="{}">Print Result Slips</a>'
+            '<a class="button" style="background-color: #64748b; color: white; border: none; padding: 5px 10px; border-radius: 4px; font-size: x-small;" href="{}">Regrades</a>'
             '</div>',
             reverse('admin:grade-essays', args=[obj.pk]),
             reverse('admin:generate-word-template', args=[obj.pk]),
             reverse('admin:import-word-questions', args=[obj.pk]),
             reverse('admin:export-exam-results', args=[obj.pk]),
-            reverse('admin:print-result-slips', args=[obj.pk])
+            reverse('admin:print-result-slips', args=[obj.pk]),
+            reverse('admin:exam-regrades', args=[obj.pk])
         )
     grading_actions.short_description = "Exam Dashboard"
 
+    @action(description="Recalculate scores for selected exams")
+    def rescore_exams(self, request, queryset):
+        candidates = 0
+        for exam in queryset:
+            candidates += len(score_exam(exam))
+        self.message_user(request, f"Rescored {queryset.count()} exam(s) for {candidates} candidate results.")
+
+    @action(description="Re-mark answers against the current answer key and rescore")
+    def regrade_exams(self, request, queryset):
+        updated = 0
+        for exam in queryset:
+            updated += regrade_exam(exam)
+        self.message_user(request, f"Re-marked {updated} answers and recalculated scores.")
+
+    @action(description="Extend time for running candidates")
+    def extend_exam_time(self, request, queryset):
+        if 'apply' in request.POST:
+            try:
+                minutes = int(request.POST.get('minutes', 0))
+            except ValueError:
+                minutes = 0
+            if minutes <= 0:
+                self.message_user(request, "Enter a positive number of minutes.", messages.ERROR)
+                return redirect(request.get_full_path())
+
+            sessions = 0
+            for exam in queryset:
+                sessions += extend_time(exam, minutes)
+            # Connected candidates get the new deadline pushed through the clock stream
+            self.message_user(request, f"Added {minutes} minutes to {queryset.count()} exam(s) ({sessions} running sessions).")
+            return redirect(request.get_full_path())
+
+        return render(request, 'admin/exam_extend_time.html', {
+            'title': "Extend Exam Time",
+            'objects': queryset,
+            'action_name': 'extend_exam_time',
+            'opts': self.model._meta,
+        })
+
+    @action(description="Force submit all running candidates")
+    def force_submit_exams(self, request, queryset):
+        submitted = 0
+        for exam in queryset:
+            submitted += force_submit(exam)
+        self.message_user(request, f"Ended {submitted} running sessions. Their scores have been recorded.")
+
+    @action(description="Build offline exam packs")
+    def build_exam_packs(self, request, queryset):
+        # Otherwise the first candidate to ask builds it; doing it ahead keeps exam start quick
+        total = 0
+        for exam in queryset:
+            total += get_exam_pack(exam.id).size
+        self.message_user(request, f"Built offline packs for {queryset.count()} exam(s) ({total / 1024:.0f} KB).")
+
+    def regrades_view(self, request, exam_id):
+        exam = self.get_object(request, exam_id)
+        if exam is None:
+            raise Http404("Exam not found")
+        regrades = exam.regrades.select_related('question')[:200]
+        return render(request, "admin/exam_regrades.html", {
+            "exam": exam,
+            "regrades": regrades,
+            "in_progress": exam.regrades.filter(status__in=['pending', 'running']).exists(),
+        })
+
     def grade_essays_view(self, request, exam_id):
         # Import your view function
         return grade_essays(request, exam_id)
@@ -460,6 +473,40 @@ class StudentScoreAdmin(SchoolScopedAdmin):
 class ExamSessionAdmin(SchoolScopedAdmin, ModelAdmin):
     list_display = ("user", "exam", "start_time", "end_time")
     readonly_fields = ("user", "exam", "start_time", "end_time")
+    actions = ['extend_session_time', 'force_submit_sessions']
+
+    @action(description="Extend time for selected candidates")
+    def extend_session_time(self, request, queryset):
+        if 'apply' in request.POST:
+            try:
+                minutes = int(request.POST.get('minutes', 0))
+            except ValueError:
+                minutes = 0
+            if minutes <= 0:
+                self.message_user(request, "Enter a positive number of minutes.", messages.ERROR)
+                return redirect(request.get_full_path())
+
+            updated = 0
+            for exam in Exam.objects.filter(id__in=queryset.values('exam_id')):
+                user_ids = list(queryset.filter(exam=exam).values_list('user_id', flat=True))
+                updated += extend_time(exam, minutes, user_ids)
+            self.message_user(request, f"Added {minutes} minutes for {updated} candidate(s).")
+            return redirect(request.get_full_path())
+
+        return render(request, 'admin/exam_extend_time.html', {
+            'title': "Extend Candidate Time",
+            'objects': queryset,
+            'action_name': 'extend_session_time',
+            'opts': self.model._meta,
+        })
+
+    @action(description="Force submit selected candidates")
+    def force_submit_sessions(self, request, queryset):
+        submitted = 0
+        for exam in Exam.objects.filter(id__in=queryset.values('exam_id')):
+            user_ids = list(queryset.filter(exam=exam).values_list('user_id', flat=True))
+            submitted += force_submit(exam, user_ids)
+        self.message_user(request, f"Ended {submitted} running sessions. Their scores have been recorded.")
 
     def has_add_permission(self, request): return False
     def has_change_permission(self, request, obj=None): return False
@@ -479,6 +526,85 @@ class StudentAnswerAdmin(SchoolScopedAdmin, ModelAdmin):
     def has_delete_permission(self, request, obj=None): return False
 
 
+@admin.register(Job)
+class JobAdmin(SchoolScopedAdmin, ModelAdmin):
+    list_display = ("label", "status", "progress", "created_by", "created_at", "job_actions")
+    list_filter = ("status", "kind")
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+    # Where to send the admin once a job has finished, for jobs whose result is a page rather than a file
+    RESULT_PAGES = {"import_students": "admin:import-students-result"}
+
+    def has_add_permission(self, request): return False
+    def has_change_permission(self, request, obj=None): return False
+
+    # Existing 'School Admins' groups predate Job, so go by role; get_queryset keeps them to their school
+    def has_view_permission(self, request, obj=None):
+        return is_superadmin(request.user) or is_school_admin(request.user)
+
+    def has_module_permission(self, request):
+        return self.has_view_permission(request)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('<int:job_id>/progress/', self.admin_site.admin_view(self.progress_view), name="cbt_job_progress"),
+            path('<int:job_id>/status/', self.admin_site.admin_view(self.status_view), name="cbt_job_status"),
+            path('<int:job_id>/download/', self.admin_site.admin_view(self.download_view), name="cbt_job_download"),
+        ]
+        return custom_urls + urls
+
+    def job_actions(self, obj):
+        return format_html('<a class="button" href="{}">View</a>', reverse('admin:cbt_job_progress', args=[obj.pk]))
+    job_actions.short_description = "Progress"
+
+    def get_job(self, request, job_id):
+        return get_object_or_404(self.get_queryset(request), id=job_id)
+
+    def job_status(self, job):
+        data = {
+            "status": job.status,
+            "progress": job.progress,
+            "message": job.message,
+            "error": job.error.strip().splitlines()[-1] if job.error else "",
+            "download_url": reverse('admin:cbt_job_download', args=[job.pk]) if job.result_file else None,
+            "result_url": None,
+            # Per-row problems a handler reports without failing (e.g. a Word import that needs fixing)
+            "problems": (job.result or {}).get("errors", []) if isinstance(job.result, dict) else [],
+        }
+        if job.status == 'done' and job.kind in self.RESULT_PAGES:
+            data["result_url"] = reverse(self.RESULT_PAGES[job.kind], args=[job.pk])
+        return data
+
+    def progress_view(self, request, job_id):
+        job = self.get_job(request, job_id)
+        return render(request, "admin/job_progress.html", {
+            "job": job,
+            "initial": self.job_status(job),
+            "status_url": reverse('admin:cbt_job_status', args=[job.pk]),
+            "title": job.label,
+        })
+
+    def status_view(self, request, job_id):
+        return JsonResponse(self.job_status(self.get_job(request, job_id)))
+
+    def download_view(self, request, job_id):
+        job = self.get_job(request, job_id)
+        if not job.result_file:
+            raise Http404("This job has no file.")
+        return FileResponse(job.result_file.open("rb"), as_attachment=True, filename=job.result_file.name.rsplit("/", 1)[-1])
+
+
 # Re-register User
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
+
+
+@admin.register(RelayNode)
+class RelayNodeAdmin(SchoolScopedAdmin, ModelAdmin):
+    list_display = ("name", "school", "is_active", "last_pull_at", "last_push_at")
+    exclude = ("key_hash",)
+    readonly_fields = ("school", "created_at", "last_pull_at", "last_push_at")
+
+    # Keys are issued with `manage.py create_relay_node`; here nodes can be renamed or switched off
+    def has_add_permission(self, request): return False
@@ -1,5 +1,4 @@
 #admin_users.py
-import io
 import csv
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
@@ -13,12 +12,17 @@ from django import forms
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
-from .models import School, UserProfile, StudentClass, Course, CourseRegistration
+from .models import School, UserProfile, StudentClass, Course, Job
 from .admin_base import SchoolScopedAdmin, is_school_admin, is_superadmin, normalize_class_name
+from .subscriptions import subscription_changed
+from .hashing import hash_password
+from .jobs import enqueue, progress_url, scrub_expired_secrets, unseal
+from .registration import register, register_classes
+from .usernames import reserve_usernames, school_prefix
 from django.contrib import messages
 from django.db.models import Count
 from django.urls import path, reverse
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.http import HttpResponse
 from django.contrib.auth import update_session_auth_hash
 
@@ -51,12 +55,18 @@ class SchoolAdmin(ModelAdmin):
     def has_module_permission(self, request):
         return is_superadmin(request.user) # Hide model from sidebar for school admins
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        subscription_changed.send(sender=School, school_id=obj.id)
+
     def subscription_status(self, obj):
         return "Active" if obj.is_active else "Inactive"
 
     # --- ACTION: Bulk Activate ---
     def activate_schools(self, request, queryset):
         queryset.update(is_active=True)
+        for school_id in queryset.values_list('id', flat=True):
+            subscription_changed.send(sender=School, school_id=school_id)
     activate_schools.short_description = "Activate selected schools"
 
 
@@ -171,6 +181,7 @@ class CustomUserAdmin(SchoolScopedAdmin, UserAdmin, ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('import-students/', self.import_students, name="import-students"),
+            path('import-students/<int:job_id>/', self.admin_site.admin_view(self.import_result), name="import-students-result"),
             path('download-sample/', self.download_sample, name="download-sample"),
             path('download-bulk-slips/', self.download_bulk_slips, name="download-bulk-slips"),
         ]
@@ -193,41 +204,19 @@ class CustomUserAdmin(SchoolScopedAdmin, UserAdmin, ModelAdmin):
         return response
     
     def generate_school_prefix(self, school_name):
-        words = school_name.split()
-        
-        # Rule: Only one word -> first 3 letters
-        if len(words) == 1:
-            return words[0][:3].lower()
-        
-        # Rule: Exactly two words -> first 2 of word1 + first 1 of word2
-        # Example: "Flora School" -> "fls"
-        if len(words) == 2:
-            return (words[0][:2] + words[1][0]).lower()
-        
-        # Rule: Three or more words -> first 3 initials
-        # Example: "Great Heights Academy" -> "gha"
-        initials = "".join([word[0].lower() for word in words])
-        return initials[:3]
+        return school_prefix(school_name)
     
     def create_student_logic(self, school, first, last, password, middle="", class_name=None, student_class_obj=None, manual_username=None):
         if manual_username and manual_username.strip():
             username = manual_username.strip()
         else:
-            prefix = self.generate_school_prefix(school.name)
-            # Find the next available number for THIS school
-            count = User.objects.filter(userprofile__school=school, username__startswith=prefix).count()
-            
-            new_index = count + 1
-            username = f"{prefix}{new_index}"
-            # Safety: if flo1 exists but was deleted or moved, skip until we find a free slot
-            while User.objects.filter(username=username).exists():
-                new_index += 1
-                username = f"{prefix}{new_index}"
-
-        # Create User
-        user = User.objects.create_user(
+            # Next number from the prefix's sequence, safe against concurrent creates and imports
+            username = reserve_usernames(self.generate_school_prefix(school.name), 1, school)[0]
+
+        # Create User (hashed with the student profile, see hashing.py)
+        user = User.objects.create(
             username=username,
-            password=password,
+            password=hash_password(password),
             first_name=first,
             last_name=f"{last} {middle}" if middle else last
         )
@@ -249,9 +238,8 @@ class CustomUserAdmin(SchoolScopedAdmin, UserAdmin, ModelAdmin):
 
         # Course Auto-Registration
         if student_class_obj:
-            courses = Course.objects.filter(target_class=student_class_obj)
-            for course in courses:
-                CourseRegistration.objects.get_or_create(user=user, course=course, school=school)
+            course_ids = Course.objects.filter(target_class=student_class_obj).values_list('id', flat=True)
+            register([user.id], course_ids, school)
 
         return user, username
 
@@ -356,32 +344,48 @@ class CustomUserAdmin(SchoolScopedAdmin, UserAdmin, ModelAdmin):
             csv_file = request.FILES.get("csv_file")
             if not csv_file: return redirect("..")
 
-            io_string = io.StringIO(csv_file.read().decode('utf-8'))
-            reader = csv.reader(io_string)
-            next(reader) # skip header
-
-            imported_data = []
-            school = request.user.userprofile.school
-            
-            for row in reader:
-                if len(row) < 4: continue
-                row += [""] * (6 - len(row)) # padding
-                first, middle, last, password, class_name, _ = [item.strip() for item in row]
-
-                user, final_username = self.create_student_logic(
-                    school=school, first=first, middle=middle, last=last, 
-                    password=password, class_name=class_name
-                )
-
-                imported_data.append({
-                    'name': f"{first} {last}",
-                    'username': final_username,
-                    'password': password 
-                })
-                request.session['latest_import'] = imported_data
-
-            return render(request, "admin/import_success.html", {"students": imported_data, "count": len(imported_data)})
+            # Hashing a few hundred passwords outlives the request, so the import runs as a job
+            # (see job_handlers.import_students); the progress page links to import_result when done
+            job = enqueue(
+                "import_students",
+                label=f"Student import: {csv_file.name}",
+                school=request.user.userprofile.school,
+                user=request.user,
+                input_file=csv_file,
+            )
+            return redirect(progress_url(job))
         return render(request, "admin/csv_form.html")
+
+    def import_result(self, request, job_id):
+        # Only whoever ran the import sees its passwords; superusers have no profile to scope by
+        job = get_object_or_404(
+            Job, id=job_id, kind="import_students", status="done", created_by=request.user,
+        )
+        result = job.result or {}
+
+        if "sealed" in result:
+            # First visit: the generated passwords move into the session (for download_bulk_slips)
+            # and are scrubbed from the job row
+            created = unseal(result["sealed"])
+            if created is None:
+                messages.error(request, "These passwords have expired. Reset the students' passwords to issue new ones.")
+            else:
+                request.session['latest_import'] = created
+                request.session['latest_import_job'] = job.id
+            job.result = {"count": result["count"], "errors": result["errors"]}
+            job.save(update_fields=['result'])
+            result = job.result
+        scrub_expired_secrets()
+
+        students = []
+        if request.session.get('latest_import_job') == job.id:
+            students = request.session.get('latest_import', [])
+
+        return render(request, "admin/import_success.html", {
+            "students": students,
+            "count": result.get("count", len(students)),
+            "errors": result.get("errors", []),
+        })
     
 
     def download_bulk_slips(self, request):
@@ -438,17 +442,15 @@ class CustomUserAdmin(SchoolScopedAdmin, UserAdmin, ModelAdmin):
 
         # If the form was submitted
         course_ids = request.POST.getlist('courses')
-        count = 0
-        for student in queryset:
-            for c_id in course_ids:
-                reg, created = CourseRegistration.objects.get_or_create(
-                    user=student, 
-                    course_id=c_id,
-                    defaults={'school': request.user.userprofile.school}
-                )
-                if created: count += 1
-                
-        self.message_user(request, f"Successfully registered {count} new enrollments.")
+        user_ids = list(queryset.values_list('id', flat=True))
+        job = enqueue(
+            "register_courses",
+            label=f"Register {len(user_ids)} students for {len(course_ids)} courses",
+            school=request.user.userprofile.school,
+            user=request.user,
+            params={"user_ids": user_ids, "course_ids": [int(c_id) for c_id in course_ids]},
+        )
+        return redirect(progress_url(job))
 
     # --- PDF ACTION (FOR EXISTING STUDENTS) ---
     def download_existing_slips(self, request, queryset):
@@ -552,23 +554,8 @@ class StudentClassAdmin(SchoolScopedAdmin, ModelAdmin):
         icon="how_to_reg",
     )
     def bulk_register_courses(self, request, queryset):
-        total_registrations = 0
-        for student_class in queryset:
-            # 1. Get all students in this class
-            students = User.objects.filter(userprofile__student_class=student_class)
-            # 2. Get all courses assigned to this class
-            courses = Course.objects.filter(target_class=student_class)
-            
-            for student in students:
-                for course in courses:
-                    _, created = CourseRegistration.objects.get_or_create(
-                        user=student,
-                        course=course,
-                        school=student_class.school
-                    )
-                    if created:
-                        total_registrations += 1
-                                      
+        # Students x courses of each class, diffed against existing registrations and bulk inserted
+        total_registrations = register_classes(queryset.select_related('school'))
         self.message_user(request, f"Successfully created {total_registrations} new course registrations.")
     #bulk_register_courses.short_description = "Register all students in selected classes for their courses"
 
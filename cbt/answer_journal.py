@@ -0,0 +1,209 @@
+#answer_journal.py
+"""
+Write-behind journal for answer saves (ANSWER_WRITE_MODE = "journal").
+
+SaveAnswerView appends the raw answer to a fast append-only journal and returns
+immediately; `manage.py flush_answer_journal` merges the journal into StudentAnswer
+in bulk through answers.apply_answers(). EndExamSessionView force-flushes the
+candidate's own entries before scoring so nothing is lost.
+
+Backends (ANSWER_JOURNAL_URL):
+  sqlite:///path/to/journal.sqlite3  - local file in WAL mode with synchronous=FULL (fsync per append).
+                                       Good for a single box running several gunicorn workers.
+  redis://host:6379/0                - per-candidate Redis lists. Use this when more than one box
+                                       serves the API, so any box can flush any candidate.
+
+A batch being applied must stay visible to the end-of-exam flush, or the score misses it.
+SQLite rows are only deleted after they are applied, so a concurrent flush sees (and
+re-applies, harmlessly) them. Redis takes a candidate's list off the queue, so each
+flush holds a per-candidate lock: background flushes skip locked candidates, and the
+end-of-exam flush waits for the lock before it drains.
+"""
+import json
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .answers import apply_answers
+
+
+def journal_enabled():
+    return getattr(settings, "ANSWER_WRITE_MODE", "direct") == "journal"
+
+
+class SQLiteJournal:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_journal ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id INTEGER NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answer_journal_user ON answer_journal (user_id)")
+            self._local.conn = conn
+        return conn
+
+    def append(self, entries):
+        self._connection().executemany(
+            "INSERT INTO answer_journal (user_id, payload) VALUES (?, ?)",
+            [(entry["user_id"], json.dumps(entry)) for entry in entries],
+        )
+
+    def flush(self, apply, user_id=None, limit=5000):
+        conn = self._connection()
+        if user_id is None:
+            rows = conn.execute(
+                "SELECT id, payload FROM answer_journal ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, payload FROM answer_journal WHERE user_id = ? ORDER BY id LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        if not rows:
+            return 0
+
+        # Apply first, delete after: a crash in between replays the batch, which is
+        # harmless because apply_answers is last-write-wins on client_ts.
+        apply([json.loads(payload) for _, payload in rows])
+        ids = [row_id for row_id, _ in rows]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            conn.execute(
+                f"DELETE FROM answer_journal WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+        return len(rows)
+
+
+class RedisJournal:
+    USERS_KEY = "cbt:journal:users"
+    LOCK_TIMEOUT = 60 # Seconds a flush may hold a candidate; longer than applying one batch ever takes
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self._lock_error = redis.exceptions.LockError
+
+    def _user_key(self, user_id):
+        return f"cbt:journal:user:{user_id}"
+
+    def _lock(self, user_id):
+        return self.client.lock(f"cbt:journal:lock:{user_id}", timeout=self.LOCK_TIMEOUT)
+
+    def append(self, entries):
+        pipe = self.client.pipeline(transaction=True)
+        for entry in entries:
+            pipe.rpush(self._user_key(entry["user_id"]), json.dumps(entry))
+            pipe.sadd(self.USERS_KEY, entry["user_id"])
+        pipe.execute()
+
+    def flush(self, apply, user_id=None, limit=5000):
+        if user_id is None:
+            # Candidates another flush is holding are left for the next round
+            locks = {}
+            for uid in (int(u) for u in self.client.srandmember(self.USERS_KEY, limit) or []):
+                lock = self._lock(uid)
+                if lock.acquire(blocking=False):
+                    locks[uid] = lock
+        else:
+            # Wait for a flush that took this candidate's list to finish applying it
+            lock = self._lock(user_id)
+            if not lock.acquire(blocking_timeout=self.LOCK_TIMEOUT):
+                raise TimeoutError(f"Journal for user {user_id} is still held by another flush")
+            locks = {user_id: lock}
+
+        try:
+            return self._flush_locked(apply, list(locks))
+        finally:
+            for lock in locks.values():
+                try:
+                    lock.release()
+                except self._lock_error:
+                    pass # Expired (LOCK_TIMEOUT) and possibly taken over; nothing left to release
+
+    def _flush_locked(self, apply, user_ids):
+        if not user_ids:
+            return 0
+
+        # Atomically take each candidate's pending list (LRANGE + DEL + SREM in one MULTI)
+        pipe = self.client.pipeline(transaction=True)
+        for uid in user_ids:
+            pipe.lrange(self._user_key(uid), 0, -1)
+            pipe.delete(self._user_key(uid))
+            pipe.srem(self.USERS_KEY, uid)
+        results = pipe.execute()
+        taken = {uid: results[i * 3] for i, uid in enumerate(user_ids)}
+
+        entries = [json.loads(raw) for raws in taken.values() for raw in raws]
+        if not entries:
+            return 0
+        try:
+            apply(entries)
+        except Exception:
+            # Put everything back in front of anything appended meanwhile, then re-raise
+            pipe = self.client.pipeline(transaction=True)
+            for uid, raws in taken.items():
+                if raws:
+                    pipe.lpush(self._user_key(uid), *reversed(raws))
+                    pipe.sadd(self.USERS_KEY, uid)
+            pipe.execute()
+            raise
+        return len(entries)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                url = settings.ANSWER_JOURNAL_URL
+                if url.startswith("redis://") or url.startswith("rediss://"):
+                    _journal = RedisJournal(url)
+                else:
+                    _journal = SQLiteJournal(url.removeprefix("sqlite:///"))
+    return _journal
+
+
+def append_answers(user_id, school_id, entries):
+    """Queue {"questionId", "answer", "client_ts"} entries for one candidate."""
+    received_at = timezone.now().isoformat()
+    get_journal().append([
+        {
+            "user_id": user_id,
+            "school_id": school_id,
+            "questionId": entry.get("questionId"),
+            "answer": entry.get("answer"),
+            # No client clock -> order by arrival time, same as a direct save would
+            "client_ts": entry.get("client_ts") or received_at,
+        }
+        for entry in entries
+    ])
+
+
+def flush_journal(user_id=None, batch_size=5000):
+    """
+    Merges pending journal entries into StudentAnswer. With user_id, drains that
+    candidate completely; otherwise processes a single batch. Returns entries applied.
+    """
+    journal = get_journal()
+    total = 0
+    while True:
+        applied = journal.flush(apply_answers, user_id=user_id, limit=batch_size)
+        total += applied
+        if user_id is None or applied == 0:
+            return total
@@ -0,0 +1,114 @@
+#answer_keys.py
+"""
+Compiled per-exam answer keys.
+
+An answer key maps question id -> (exam, school, type, normalized correct answer, points).
+It is built once per exam content version (see exam_cache.get_exam_version), kept in the
+shared cache, and rebuilt automatically after any question edit bumps the version.
+Grading an answer is then a dictionary lookup instead of a Question read.
+
+The version and the key must sit in a cache every worker shares, or a corrected key only
+reaches one process (checks.py refuses LocMemCache with several workers). Saves already
+holding the old key when it changes are caught by the regrade's second pass (regrade.py).
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Case, Value, When
+from django.db.models.functions import Lower, Trim
+from django.db.models.lookups import Exact
+
+from .exam_cache import CACHE_TIMEOUT, get_exam_version
+from .models import Question, StudentAnswer
+from .scoring import score_exam
+
+
+AUTO_GRADED_TYPES = ('obj', 'tf', 'fitg')
+
+AnswerKeyEntry = namedtuple("AnswerKeyEntry", "exam_id school_id question_type key point")
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+def is_correct(entry, answer_text):
+    if entry.question_type not in AUTO_GRADED_TYPES or entry.key is None:
+        return False
+    return normalize(answer_text) == entry.key
+
+
+def _question_exam_key(question_id):
+    return f"cbt:question:{question_id}:exam"
+
+
+def compile_answer_key(exam_id):
+    rows = Question.objects.filter(exam_id=exam_id).values_list(
+        "id", "school_id", "question_type", "correct_answer", "point"
+    )
+    return {
+        q_id: AnswerKeyEntry(
+            exam_id, school_id, q_type,
+            normalize(correct) if correct not in (None, "") else None,
+            point,
+        )
+        for q_id, school_id, q_type, correct, point in rows
+    }
+
+
+def get_answer_key(exam_id):
+    key = f"cbt:exam:{exam_id}:{get_exam_version(exam_id)}:answer-key"
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = compile_answer_key(exam_id)
+        cache.set(key, answer_key, CACHE_TIMEOUT)
+        # Remember which exam each question belongs to, so saves can find the key by question id
+        cache.set_many({_question_exam_key(q_id): exam_id for q_id in answer_key}, CACHE_TIMEOUT)
+    return answer_key
+
+
+def lookup(question_ids):
+    """
+    Returns {question_id: AnswerKeyEntry} for the ids that exist. Once an exam's key is
+    warm this touches only the cache; unknown ids cost one small query.
+    """
+    question_ids = set(question_ids)
+    cached = cache.get_many([_question_exam_key(q_id) for q_id in question_ids])
+    exam_of = {q_id: cached.get(_question_exam_key(q_id)) for q_id in question_ids}
+
+    missing = [q_id for q_id, exam_id in exam_of.items() if exam_id is None]
+    if missing:
+        exam_of.update(Question.objects.filter(id__in=missing).values_list("id", "exam_id"))
+
+    entries = {}
+    for exam_id in {exam_id for exam_id in exam_of.values() if exam_id is not None}:
+        answer_key = get_answer_key(exam_id)
+        entries.update({q_id: answer_key[q_id] for q_id in question_ids if q_id in answer_key})
+    return entries
+
+
+def regrade_question(question):
+    """
+    Re-marks every StudentAnswer of one auto-graded question against its current
+    correct_answer with a single UPDATE ... CASE. Returns the number of rows touched.
+    """
+    if question.question_type not in AUTO_GRADED_TYPES:
+        return 0
+
+    if question.correct_answer in (None, ""):
+        return StudentAnswer.objects.filter(question=question).update(is_correct=False)
+
+    matches = Exact(Lower(Trim("answer_text")), normalize(question.correct_answer))
+    return StudentAnswer.objects.filter(question=question).update(
+        is_correct=Case(When(matches, then=Value(True)), default=Value(False)),
+        is_graded=True,
+    )
+
+
+def regrade_exam(exam):
+    """One UPDATE per auto-graded question, then a set-based rescore of the exam."""
+    updated = 0
+    for question in Question.objects.filter(exam=exam, question_type__in=AUTO_GRADED_TYPES):
+        updated += regrade_question(question)
+    score_exam(exam)
+    return updated
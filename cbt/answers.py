@@ -0,0 +1,159 @@
+#answers.py
+"""
+Single write path for candidate answers.
+
+Every save (one click, a batch, or a journal flush) goes through apply_answers():
+  1. question ids are validated and graded against the compiled answer key
+     (answer_keys.lookup - a cache read once the exam's key is warm)
+  2. one conditional upsert (INSERT ... ON CONFLICT DO UPDATE ... WHERE) that only
+     replaces a stored answer when the new one isn't older (last write wins). The check
+     is part of the write, so two saves racing for one answer can't let the older win.
+
+The upsert is raw SQL because the ORM's bulk_create can't put a WHERE on the update.
+PostgreSQL and SQLite (3.35+) both support it, RETURNING included.
+"""
+import datetime
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import answer_keys
+from .models import StudentAnswer
+
+
+def parse_client_ts(value):
+    """Accepts epoch milliseconds or an ISO-8601 string. Missing/invalid -> server time."""
+    if value in (None, ""):
+        return timezone.now()
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        try:
+            return datetime.datetime.fromtimestamp(float(value) / 1000, tz=datetime.timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return timezone.now()
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        return timezone.now()
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+    return parsed
+
+
+def apply_answers(entries):
+    """
+    entries: iterable of {"user_id", "school_id", "questionId", "answer", "client_ts"} dicts,
+    possibly for many candidates at once.
+
+    Returns {"saved": {(user_id, question_id): is_correct}, "stale": [(user_id, question_id)],
+    "invalid": [(user_id, question_id)]}. Entries for the same user + question are
+    coalesced first (latest client_ts wins).
+    """
+    latest = {}
+    invalid = []
+    for entry in entries:
+        try:
+            key = (int(entry["user_id"]), int(entry.get("questionId")))
+        except (KeyError, TypeError, ValueError):
+            invalid.append((entry.get("user_id"), entry.get("questionId")))
+            continue
+        answered_at = parse_client_ts(entry.get("client_ts"))
+        current = latest.get(key)
+        if current is None or answered_at >= current["answered_at"]:
+            latest[key] = {
+                "school_id": entry.get("school_id"),
+                "answer": entry.get("answer"),
+                "answered_at": answered_at,
+            }
+
+    if not latest:
+        return {"saved": {}, "stale": [], "invalid": invalid}
+
+    question_ids = {question_id for _, question_id in latest}
+
+    questions = answer_keys.lookup(question_ids)
+
+    graded, rows = {}, []
+    for key, item in latest.items():
+        question = questions.get(key[1])
+        # A question only accepts answers from candidates of its own school
+        if question is None or question.school_id != item["school_id"]:
+            invalid.append(key)
+            continue
+
+        is_correct = answer_keys.is_correct(question, item["answer"])
+        rows.append((
+            item["school_id"],
+            key[0],
+            key[1],
+            item["answer"] if item["answer"] is not None else "",
+            is_correct,
+            question.question_type != 'essay', # Essay remains ungraded
+            item["answered_at"],
+        ))
+        graded[key] = is_correct
+
+    written = _upsert(rows)
+    saved = {key: is_correct for key, is_correct in graded.items() if key in written}
+    stale = [key for key in graded if key not in written]
+    return {"saved": saved, "stale": stale, "invalid": invalid}
+
+
+UPSERT_BATCH = 500
+UPSERT_COLUMNS = ("school", "user", "question", "answer_text", "is_correct", "is_graded", "answered_at")
+
+
+def _upsert(rows):
+    """
+    rows: (school_id, user_id, question_id, answer_text, is_correct, is_graded, answered_at)
+    tuples, one per user + question. Returns the (user_id, question_id) pairs written; the
+    rest lost to a stored answer with a later answered_at.
+    """
+    if not rows:
+        return set()
+
+    meta, ops = StudentAnswer._meta, connection.ops
+    table = ops.quote_name(meta.db_table)
+    columns = [ops.quote_name(meta.get_field(name).column) for name in UPSERT_COLUMNS]
+    points, updated_at = (ops.quote_name(meta.get_field(name).column) for name in ("points_earned", "updated_at"))
+    user, question, answered_at = columns[1], columns[2], columns[6]
+    refreshed = columns[:1] + columns[3:] + [updated_at]
+    now = ops.adapt_datetimefield_value(timezone.now())
+
+    written = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            params = []
+            for row in batch:
+                params.extend(row[:6])
+                params.extend([ops.adapt_datetimefield_value(row[6]), 0.0, now])
+            values = ", ".join(["(" + ", ".join(["%s"] * (len(columns) + 2)) + ")"] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}, {points}, {updated_at}) VALUES {values} "
+                f"ON CONFLICT ({user}, {question}) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in refreshed)
+                + f" WHERE {table}.{answered_at} IS NULL OR excluded.{answered_at} >= {table}.{answered_at}"
+                f" RETURNING {user}, {question}",
+                params,
+            )
+            written.update(cursor.fetchall())
+    return written
+
+
+def save_answers(user_id, school_id, entries):
+    """
+    Saves {"questionId", "answer", "client_ts"} entries for one candidate.
+
+    Returns {"saved": [{"questionId", "is_correct"}], "stale": [ids], "invalid": [ids]}.
+    """
+    result = apply_answers(
+        dict(entry, user_id=user_id, school_id=school_id) for entry in entries
+    )
+    return {
+        "saved": [
+            {"questionId": question_id, "is_correct": is_correct}
+            for (_, question_id), is_correct in result["saved"].items()
+        ],
+        "stale": [question_id for _, question_id in result["stale"]],
+        "invalid": [question_id for _, question_id in result["invalid"]],
+    }
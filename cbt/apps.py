@@ -6,4 +6,6 @@ class CbtConfig(AppConfig):
     name = 'cbt'
 
     def ready(self):
+        import cbt.checks
         import cbt.signals
+        import cbt.job_handlers
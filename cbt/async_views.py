@@ -0,0 +1,183 @@
+#async_views.py
+"""
+Async versions of the hot candidate endpoints, bound in urls.py when ASYNC_CANDIDATE_VIEWS
+is on (off by default, see the setting). Under the ASGI server a candidate waiting on the
+cache holds no worker thread, so one box can keep thousands of mostly idle candidates connected.
+
+URLs, request bodies and responses are the same as the APIView versions in views.py.
+DRF views can't be async, so these are plain Django views that check the JWT themselves
+(auth_context.aget_auth_context).
+
+Under ASGI Django runs every sync view, and the async ORM calls, of a worker on a single
+thread (thread_sensitive). Heavier DB work here therefore goes to the thread pool
+(_in_pool), and urls.py wraps the remaining candidate APIViews in offload() for the same
+reason. Otherwise logins, paper fetches, batch saves and submissions would queue behind
+each other.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .answer_journal import append_answers, journal_enabled
+from .answer_keys import get_answer_key
+from .answers import save_answers
+from .auth_context import aget_auth_context
+from .exam_cache import aget_exam_bundle
+from .exam_clock import get_session_end
+from .models import Exam, ExamSession, StudentAnswer
+from .serializers import ExamSessionSerializer
+
+
+def _unauthorized():
+    return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+
+def _in_pool(fn):
+    """sync_to_async() on the thread pool rather than the worker's one thread-sensitive thread."""
+    def run(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Pool threads never see request_finished, so they close their own connections
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def offload(view):
+    """Wraps a sync view (APIView.as_view()) so the ASGI handler runs it, rendering included, in the thread pool."""
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, "render", None)):
+            response.render()
+        return response
+
+    run = _in_pool(render)
+
+    async def offloaded(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    offloaded.csrf_exempt = getattr(view, "csrf_exempt", False)
+    return offloaded
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# -------------------
+# Get Question by Index
+# -------------------
+@require_GET
+async def question_by_index(request, exam_id, index):
+    context = await aget_auth_context(request)
+    if context is None:
+        return _unauthorized()
+
+    bundle = await aget_exam_bundle(exam_id)
+    try:
+        if not bundle or bundle["school_id"] != context.school_id:
+            raise IndexError
+        question = dict(bundle["questions"][index])
+    except IndexError:
+        return JsonResponse({"error": "Question not found"}, status=404)
+
+    question["student_answer"] = await (
+        StudentAnswer.objects.filter(user_id=context.user_id, question_id=question["id"])
+        .values_list("answer_text", flat=True).afirst()
+    )
+    return JsonResponse(question)
+
+
+# -------------------
+# Save Student Answer
+# -------------------
+@csrf_exempt
+@require_POST
+async def save_answer(request):
+    context = await aget_auth_context(request)
+    if context is None:
+        return _unauthorized()
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON parse error"}, status=400)
+    entry = {
+        "questionId": data.get("questionId"),
+        "answer": data.get("selectedOption"),
+        "client_ts": data.get("client_ts"),
+    }
+
+    if journal_enabled():
+        await _in_pool(append_answers)(context.user_id, context.school_id, [entry])
+        return JsonResponse({"status": "saved", "queued": True})
+
+    # Grading + upsert is a few cache reads and one or two queries; run it off the event loop
+    result = await _in_pool(save_answers)(context.user_id, context.school_id, [entry])
+    if result["invalid"]:
+        return JsonResponse({"detail": "No Question matches the given query."}, status=404)
+    if result["stale"]:
+        return JsonResponse({"status": "stale"})
+
+    return JsonResponse({"status": "saved", "is_correct": result["saved"][0]["is_correct"]})
+
+
+# -------------------
+# Start Exam Session
+# -------------------
+@csrf_exempt
+@require_POST
+async def start_exam_session(request, exam_id):
+    context = await aget_auth_context(request)
+    if context is None:
+        return _unauthorized()
+
+    exam = await (
+        Exam.objects.filter(id=exam_id, school_id=context.school_id)
+        .values("start_datetime", "duration_minutes").afirst()
+    )
+    if not exam:
+        return JsonResponse({"error": "Exam not found"}, status=404)
+    if not exam["start_datetime"]:
+        return JsonResponse({"error": "Exam start time is not configured."}, status=400)
+
+    now = timezone.now()
+    official_end_time = exam["start_datetime"] + timezone.timedelta(minutes=exam["duration_minutes"])
+    if now < exam["start_datetime"]:
+        return JsonResponse({"error": "The exam has not started yet."}, status=403)
+    if now > official_end_time:
+        return JsonResponse({"error": "The exam window has already closed."}, status=403)
+
+    # Build (or confirm) the compiled answer key now so answer saves never read Question rows
+    await _in_pool(get_answer_key)(exam_id)
+
+    session, _ = await ExamSession.objects.aget_or_create(
+        user_id=context.user_id,
+        exam_id=exam_id,
+        defaults={"school_id": context.school_id, "start_time": now, "end_time": official_end_time},
+    )
+    return JsonResponse(ExamSessionSerializer(session).data)
+
+
+# -------------------
+# Remaining Time
+# -------------------
+@require_GET
+async def remaining_time(request, exam_id):
+    context = await aget_auth_context(request)
+    if context is None:
+        return _unauthorized()
+
+    # One query: the session row already carries the deadline
+    end_time = await get_session_end(context.user_id, exam_id, context.school_id)
+    if end_time is None:
+        return JsonResponse({"remaining_time": 0})
+    return JsonResponse({"remaining_time": max(0, int((end_time - timezone.now()).total_seconds()))})
@@ -0,0 +1,152 @@
+#auth_context.py
+"""
+Cached "who is this request" context: school, role, class and the school's
+subscription end, without touching UserProfile / School on every request.
+
+Lookup order:
+  1. the request itself (computed at most once per request)
+  2. a tiny per-process dict with a short TTL (AUTH_CONTEXT_LOCAL_TTL seconds)
+  3. the shared cache (AUTH_CONTEXT_TTL seconds), invalidated from signals.py
+     whenever a UserProfile changes
+  4. the database (one query for the profile)
+
+The school's subscription comes from subscriptions.get_subscription_status(), which is
+cached per school, so a renewal only has to drop one school entry, not every user of it.
+
+aget_auth_context() is the same lookup for the async views, which authenticate the JWT
+themselves (DRF's JWTAuthentication is sync-only).
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import UserProfile
+from .subscriptions import aget_subscription_status, get_subscription_status
+
+
+TTL = getattr(settings, "AUTH_CONTEXT_TTL", 300)
+LOCAL_TTL = getattr(settings, "AUTH_CONTEXT_LOCAL_TTL", 10)
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+class AuthContext(namedtuple("AuthContext", "user_id school_id role class_id subscription_end")):
+    __slots__ = ()
+
+    def is_subscription_active(self):
+        # Same rule as School.is_subscription_active()
+        if not self.subscription_end:
+            return False
+        return timezone.now() <= self.subscription_end
+
+
+def _user_key(user_id):
+    return f"cbt:auth:user:{user_id}"
+
+
+def _local_get(key):
+    item = _local.get(key)
+    if item and item[0] > time.monotonic():
+        return item[1]
+    return None
+
+
+def _local_set(key, value):
+    with _local_lock:
+        if len(_local) > 10000:
+            _local.clear()
+        _local[key] = (time.monotonic() + LOCAL_TTL, value)
+
+
+def _cached(key, load):
+    value = _local_get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is None:
+            value = load()
+            cache.set(key, value, TTL)
+        _local_set(key, value)
+    return value
+
+
+def _load_user(user_id):
+    profile = UserProfile.objects.filter(user_id=user_id).values("school_id", "role", "student_class_id").first()
+    if not profile:
+        return (None, None, None)
+    return (profile["school_id"], profile["role"], profile["student_class_id"])
+
+
+def build_auth_context(user_id):
+    school_id, role, class_id = _cached(_user_key(user_id), lambda: _load_user(user_id))
+    subscription_end = None
+    if school_id:
+        subscription_end = get_subscription_status(school_id).subscription_end
+    return AuthContext(user_id, school_id, role, class_id, subscription_end)
+
+
+def get_auth_context(request):
+    """Auth context for request.user, or None for anonymous requests."""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    # DRF's Request falls back to the wrapped HttpRequest's attributes, which may hold the
+    # session user's context from the middleware, so check it belongs to this user
+    context = getattr(request, "_cbt_auth_context", None)
+    if context is None or context.user_id != user.id:
+        context = build_auth_context(user.id)
+        request._cbt_auth_context = context
+    return context
+
+
+async def abuild_auth_context(user_id):
+    key = _user_key(user_id)
+    value = _local_get(key)
+    if value is None:
+        value = await cache.aget(key)
+        if value is None:
+            profile = await (
+                UserProfile.objects.filter(user_id=user_id)
+                .values_list("school_id", "role", "student_class_id").afirst()
+            )
+            value = tuple(profile) if profile else (None, None, None)
+            await cache.aset(key, value, TTL)
+        _local_set(key, value)
+
+    school_id, role, class_id = value
+    subscription_end = None
+    if school_id:
+        subscription_end = (await aget_subscription_status(school_id)).subscription_end
+    return AuthContext(user_id, school_id, role, class_id, subscription_end)
+
+
+async def aget_auth_context(request, allow_query_token=False):
+    """
+    Auth context for the JWT access token on an async request, or None if it is missing
+    or invalid. Like DRF's JWTAuthentication minus the per-request User read; access
+    tokens are short-lived, so a deactivated user drops out when theirs expires.
+    allow_query_token also accepts ?token= (EventSource can't set headers).
+    """
+    raw_token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not raw_token and allow_query_token:
+        raw_token = request.GET.get("token", "")
+    if not raw_token:
+        return None
+    try:
+        user_id = int(AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError, ValueError):
+        return None
+    return await abuild_auth_context(user_id)
+
+
+def invalidate_user(user_id):
+    with _local_lock:
+        _local.pop(_user_key(user_id), None)
+    cache.delete(_user_key(user_id))
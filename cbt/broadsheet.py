@@ -0,0 +1,128 @@
+#broadsheet.py
+"""
+Term broadsheet: every student x every exam in one workbook.
+
+The score matrix is one grouped query over StudentScore: a conditional aggregate per exam
+(MAX(CASE WHEN exam_id = n THEN score END)) turns the rows into columns, SUM/COUNT give
+the total and exams sat, and RANK() windows give the overall and in-class positions.
+Everything else is a lookup per exam (titles, possible points, summary statistics).
+
+Sheets: "Broadsheet" (all students by position), one sheet per class (class positions)
+when more than one class is in it, and "Exam Summary".
+"""
+from django.db.models import Avg, Case, Count, F, Max, Min, Sum, When, Window
+from django.db.models.functions import Rank
+
+from .models import Exam, Question, StudentScore
+from .xlsx import stream_xlsx
+
+
+def select_exams(school=None, academic_year=None, student_class=None, exam_ids=None):
+    exams = Exam.objects.select_related("course")
+    if school:
+        exams = exams.filter(school=school)
+    if academic_year:
+        exams = exams.filter(academic_year=academic_year)
+    if student_class:
+        exams = exams.filter(course__target_class=student_class)
+    if exam_ids:
+        exams = exams.filter(id__in=exam_ids)
+    return exams.order_by("course__name", "title", "id")
+
+
+def exam_label(exam):
+    return f"{exam.course.name} ({exam.title})" if exam.title else exam.course.name
+
+
+def score_matrix(exams, student_class=None):
+    """One dict per student: names, class, exam_<id> scores, total, sat, position, class_position."""
+    columns = {
+        f"exam_{exam.id}": Max(Case(When(exam_id=exam.id, then=F("score"))))
+        for exam in exams
+    }
+    scores = StudentScore.objects.filter(exam__in=exams)
+    if student_class:
+        scores = scores.filter(user__userprofile__student_class=student_class)
+
+    return list(
+        scores.values(
+            "user_id", "user__first_name", "user__last_name", "user__username",
+            "user__userprofile__student_class_id",
+            "user__userprofile__student_class__name", "user__userprofile__student_class__group",
+        )
+        .annotate(**columns, total=Sum("score"), sat=Count("id"))
+        .annotate(
+            position=Window(Rank(), order_by=F("total").desc()),
+            class_position=Window(
+                Rank(), partition_by=F("user__userprofile__student_class_id"), order_by=F("total").desc()
+            ),
+        )
+        .order_by("position", "user__last_name", "user__first_name")
+    )
+
+
+def _class_name(row):
+    name = row["user__userprofile__student_class__name"]
+    if not name:
+        return "N/A"
+    return f"{name} {row['user__userprofile__student_class__group'] or ''}".strip()
+
+
+def _student_rows(matrix, exams, position_key):
+    for row in matrix:
+        yield (
+            row[position_key],
+            f"{row['user__first_name']} {row['user__last_name']}".strip(),
+            row["user__username"],
+            _class_name(row),
+            *[row[f"exam_{exam.id}"] for exam in exams],
+            row["total"],
+            round(row["total"] / row["sat"], 2) if row["sat"] else None,
+            row["sat"],
+        )
+
+
+def _summary_rows(exams):
+    possible = dict(
+        Question.objects.filter(exam__in=exams).values("exam_id").annotate(total=Sum("point")).values_list("exam_id", "total")
+    )
+    stats = {
+        row["exam_id"]: row
+        for row in StudentScore.objects.filter(exam__in=exams).values("exam_id").annotate(
+            candidates=Count("id"), highest=Max("score"), lowest=Min("score"), average=Avg("score"),
+        )
+    }
+    for exam in exams:
+        row = stats.get(exam.id, {})
+        yield (
+            exam_label(exam),
+            exam.academic_year,
+            possible.get(exam.id, 0),
+            row.get("candidates", 0),
+            row.get("highest"),
+            row.get("lowest"),
+            round(row["average"], 2) if row.get("average") is not None else None,
+        )
+
+
+def stream_broadsheet(exams, student_class=None):
+    exams = list(exams)
+    matrix = score_matrix(exams, student_class)
+    header = ["Position", "Student Name", "Username/ID", "Class", *[exam_label(exam) for exam in exams], "Total", "Average", "Exams Sat"]
+
+    sheets = [("Broadsheet", header, _student_rows(matrix, exams, "position"))]
+
+    by_class = {}
+    for row in matrix:
+        by_class.setdefault(_class_name(row), []).append(row)
+    if len(by_class) > 1:
+        for class_name in sorted(by_class):
+            rows = sorted(by_class[class_name], key=lambda row: row["class_position"])
+            sheets.append((class_name, header, _student_rows(rows, exams, "class_position")))
+
+    sheets.append((
+        "Exam Summary",
+        ["Exam", "Academic Year", "Total Possible", "Candidates", "Highest", "Lowest", "Average"],
+        _summary_rows(exams),
+    ))
+    return stream_xlsx(sheets)
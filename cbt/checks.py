@@ -0,0 +1,56 @@
+#checks.py
+"""
+System checks for deployment settings the exam caches and background jobs depend on.
+
+Exam versions, answer keys and the clock channel live in the default cache. LocMemCache
+keeps them per process, so with several web workers (or a separate job worker) an
+invalidation or a clock event only reaches the process that made it, and the others
+serve the stale paper or grade with the old key until their entries expire. These checks
+fail `manage.py check` (and the Procfile's web command, which runs it first) instead.
+
+The same goes for job files: a Celery worker on another dyno can't read an upload saved
+to the web process's local MEDIA_ROOT, nor can the web process serve its result file.
+"""
+import os
+
+from django.conf import settings
+from django.core import checks
+
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+LOCAL_STORAGE_BACKEND = "django.core.files.storage.FileSystemStorage"
+
+
+@checks.register(checks.Tags.caches, deploy=False)
+def shared_cache_check(app_configs, **kwargs):
+    if settings.CACHES["default"]["BACKEND"] != LOCMEM_BACKEND:
+        return []
+
+    errors = []
+    workers = int(os.getenv("WEB_CONCURRENCY", 1) or 1)
+    if workers > 1:
+        errors.append(checks.Error(
+            f"The default cache is LocMemCache but WEB_CONCURRENCY={workers}.",
+            hint="Exam invalidations would only reach one worker. Set REDIS_URL, or run a single worker.",
+            id="cbt.E001",
+        ))
+    if not getattr(settings, "JOBS_EAGER", True):
+        errors.append(checks.Error(
+            "The default cache is LocMemCache but jobs run in a separate Celery worker.",
+            hint="Exams changed by a job would stay stale on the web workers. Set REDIS_URL.",
+            id="cbt.E002",
+        ))
+    return errors
+
+
+@checks.register(deploy=False)
+def job_storage_check(app_configs, **kwargs):
+    if getattr(settings, "JOBS_EAGER", True) or getattr(settings, "JOBS_SHARED_STORAGE", False):
+        return []
+    if settings.STORAGES["default"]["BACKEND"] != LOCAL_STORAGE_BACKEND:
+        return []
+    return [checks.Error(
+        "Jobs run in a separate Celery worker but files are stored on the local MEDIA_ROOT.",
+        hint="Use shared storage (STORAGES['default']), or set JOBS_SHARED_STORAGE=True if MEDIA_ROOT is a shared volume.",
+        id="cbt.E003",
+    )]
@@ -0,0 +1,99 @@
+#exam_cache.py
+"""
+Read-through cache for the parts of an exam every candidate sees the same way:
+the ExamSerializer payload and the answer-free QuestionWithAnswerSerializer payloads.
+
+Entries are keyed by exam id + a content version. Invalidating an exam just swaps
+the version token, so stale entries are never read again and simply expire.
+Works with any Django cache backend, but only a shared one (RedisCache) carries an
+invalidation to every worker; LocMemCache is for a single process (see checks.py).
+"""
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Exam, Question
+from .serializers import ExamSerializer, QuestionWithAnswerSerializer
+
+
+CACHE_TIMEOUT = getattr(settings, "EXAM_CACHE_TIMEOUT", 60 * 60)
+LOCK_TIMEOUT = 10
+
+
+def _version_key(exam_id):
+    return f"cbt:exam:{exam_id}:version"
+
+
+def get_exam_version(exam_id):
+    version = cache.get(_version_key(exam_id))
+    if version is None:
+        # add() so two workers racing on a cold cache agree on one token
+        cache.add(_version_key(exam_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(exam_id))
+    return version
+
+
+def invalidate_exam(exam_id):
+    cache.set(_version_key(exam_id), uuid.uuid4().hex, None)
+
+
+def invalidate_exams(exam_ids):
+    """For edits the bundle embeds from outside the exam (school, course and class names)."""
+    cache.set_many({_version_key(exam_id): uuid.uuid4().hex for exam_id in exam_ids}, None)
+
+
+def _load_bundle(exam_id):
+    exam = Exam.objects.select_related("school", "course__target_class").filter(id=exam_id).first()
+    if not exam:
+        return None
+
+    questions = Question.objects.filter(exam=exam).order_by("question_number").prefetch_related("images__blob__variants")
+    return {
+        "school_id": exam.school_id,
+        "exam": ExamSerializer(exam).data,
+        # Empty answers map -> student_answer is None; views merge the candidate's own answers in
+        "questions": QuestionWithAnswerSerializer(questions, many=True, context={"answers": {}}).data,
+    }
+
+
+def get_exam_bundle(exam_id):
+    """
+    Returns {"school_id", "exam", "questions"} for an exam, or None if it doesn't exist.
+    Only one worker rebuilds a missing entry; the others wait briefly for it instead
+    of all hitting the database at exam start.
+    """
+    key = f"cbt:exam:{exam_id}:{get_exam_version(exam_id)}:bundle"
+    bundle = cache.get(key)
+    if bundle is not None:
+        return bundle
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        for _ in range(20):
+            time.sleep(0.05)
+            bundle = cache.get(key)
+            if bundle is not None:
+                return bundle
+
+    try:
+        bundle = _load_bundle(exam_id)
+        if bundle is not None:
+            cache.set(key, bundle, CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return bundle
+
+
+async def aget_exam_bundle(exam_id):
+    """get_exam_bundle() for async views: a warm bundle is two cache reads, a cold one is built in a thread."""
+    version = await cache.aget(_version_key(exam_id))
+    if version is not None:
+        bundle = await cache.aget(f"cbt:exam:{exam_id}:{version}:bundle")
+        if bundle is not None:
+            return bundle
+    return await sync_to_async(get_exam_bundle)(exam_id)
@@ -0,0 +1,158 @@
+#exam_clock.py
+"""
+Server-pushed exam clock (Server-Sent Events), replacing /time/ polling.
+
+A candidate opens one stream per exam (ExamClockStreamView, served under ASGI). The
+stream sends the authoritative deadline once, then only heartbeats, until either:
+
+  * an admin extends the time  -> a new "deadline" event
+  * an admin forces submission -> a "submit" event, then the stream closes
+  * the deadline passes        -> an "expired" event, then the stream closes
+
+Admin changes are written to ExamSession first and then announced through a small
+per-exam cache entry (`cbt:exam:<id>:clock`). Each stream checks that entry every
+EXAM_CLOCK_POLL seconds (a cache read, no DB) and re-reads its session when the entry
+changes. The announcement is only a fast path: every stream also re-reads its session
+each EXAM_CLOCK_RESYNC seconds, so a change still arrives when the worker that made it
+doesn't share this worker's cache. The DB always stays the source of truth.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .answer_journal import flush_journal, journal_enabled
+from .models import ExamSession
+from .scoring import score_exam
+
+
+HEARTBEAT = getattr(settings, "EXAM_CLOCK_HEARTBEAT", 15)
+POLL = getattr(settings, "EXAM_CLOCK_POLL", 1.0)
+RESYNC = getattr(settings, "EXAM_CLOCK_RESYNC", 10)
+
+
+def _event_key(exam_id):
+    return f"cbt:exam:{exam_id}:clock"
+
+
+def publish(exam_id, event_type, user_ids=None):
+    """Announce a clock change to open streams; user_ids=None means every candidate."""
+    cache.set(_event_key(exam_id), {
+        "seq": time.time_ns(),
+        "type": event_type,
+        "user_ids": sorted(user_ids) if user_ids is not None else None,
+    }, None)
+
+
+# -------------------
+# Admin operations
+# -------------------
+def extend_time(exam, minutes, user_ids=None):
+    """
+    Pushes back the deadline of running sessions. Extending the whole exam also lengthens
+    the exam itself, so candidates who start later get the same deadline. Sessions already
+    past their deadline stay closed.
+    """
+    sessions = ExamSession.objects.filter(exam=exam, end_time__gt=timezone.now())
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+    updated = sessions.update(end_time=F("end_time") + timezone.timedelta(minutes=minutes))
+
+    if user_ids is None:
+        exam.duration_minutes += minutes
+        exam.save(update_fields=["duration_minutes"])
+
+    publish(exam.id, "extend", user_ids)
+    return updated
+
+
+def force_submit(exam, user_ids=None):
+    """
+    Ends running sessions now. Open streams tell the client to submit; candidates who are
+    offline are scored here so their result doesn't wait for them to reconnect. The sessions
+    are then deleted, as EndExamSessionView does, so a later /end/ can't score again.
+    """
+    sessions = ExamSession.objects.filter(exam=exam, end_time__gt=timezone.now())
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+    affected = list(sessions.values_list("user_id", flat=True))
+    if not affected:
+        return 0
+
+    ExamSession.objects.filter(exam=exam, user_id__in=affected).update(end_time=timezone.now())
+    publish(exam.id, "submit", affected)
+
+    if journal_enabled():
+        for user_id in affected:
+            flush_journal(user_id=user_id)
+    score_exam(exam, affected)
+    ExamSession.objects.filter(exam=exam, user_id__in=affected).delete()
+    return len(affected)
+
+
+# -------------------
+# Stream
+# -------------------
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _clock(end_time):
+    now = timezone.now()
+    return {
+        "end_time": end_time.isoformat(),
+        "server_time": now.isoformat(),
+        "remaining_time": max(0, int((end_time - now).total_seconds())),
+    }
+
+
+async def get_session_end(user_id, exam_id, school_id):
+    """The candidate's current deadline, or None if they have no session for this exam."""
+    return await (
+        ExamSession.objects.filter(user_id=user_id, exam_id=exam_id, school_id=school_id)
+        .values_list("end_time", flat=True).afirst()
+    )
+
+
+async def clock_events(user_id, exam_id, school_id, end_time):
+    event = await cache.aget(_event_key(exam_id))
+    last_seq = event["seq"] if event else None
+    last_sent = last_checked = time.monotonic()
+
+    # Tell the browser to reconnect quickly if the connection drops
+    yield f"retry: 3000\n{_sse('deadline', _clock(end_time))}"
+
+    while True:
+        await asyncio.sleep(POLL)
+
+        announced = None
+        event = await cache.aget(_event_key(exam_id))
+        if event and event["seq"] != last_seq:
+            last_seq = event["seq"]
+            if event["user_ids"] is None or user_id in event["user_ids"]:
+                announced = event["type"]
+
+        if announced or time.monotonic() - last_checked >= RESYNC:
+            last_checked = time.monotonic()
+            current = await get_session_end(user_id, exam_id, school_id)
+            # Gone (submitted or force-submitted), or cut short to now by an edit
+            if current is None or announced == "submit" or (current < end_time and current <= timezone.now()):
+                yield _sse("submit", {"reason": "ended_by_admin"})
+                return
+            if announced or current != end_time:
+                end_time = current
+                yield _sse("deadline", _clock(end_time))
+                last_sent = time.monotonic()
+
+        if timezone.now() >= end_time:
+            yield _sse("expired", _clock(end_time))
+            return
+
+        if time.monotonic() - last_sent >= HEARTBEAT:
+            yield _sse("heartbeat", _clock(end_time))
+            last_sent = time.monotonic()
+
@@ -0,0 +1,221 @@
+#exam_packs.py
+"""
+Offline exam packs for halls with unreliable internet.
+
+A pack is one zip per exam, built on first request and reused until the exam changes. It
+is keyed on the exam_cache version, so anything that invalidates the cached paper also
+retires the pack:
+
+    manifest.json   exam details, window, answer-free questions, sha256 of every image
+    manifest.sig    signature of manifest.json (django.core.signing, see sign/verify_pack)
+    images/...      one resized copy per image (image_variants.py), stored uncompressed
+
+The candidate's device starts the exam online, downloads the pack once (GET
+/api/exam/<id>/pack/, only served inside the exam window to a candidate with a running
+session, so the paper never leaves early), runs the exam from it and queues answers locally. When the connection is back it posts them to
+/api/exam/<id>/sync/ with an HMAC of the body made with its sync key. That key comes with
+the pack and belongs to the candidate's ExamSession. The signature stands in for the JWT,
+because the 5 minute access token will long have expired after an outage. Answers go
+through the normal write path (answers.py): last write wins by client timestamp, so a
+batch sent twice changes nothing.
+
+Client timestamps only order answers; they never decide whether a batch is accepted. The
+server takes batches until EXAM_SYNC_GRACE_MINUTES after the session's end time, judged
+by its own clock. Submitting online deletes the session, which retires the key, so
+nothing can be synced into a result once the candidate has handed in.
+"""
+import hashlib
+import hmac
+import io
+import json
+import os
+import zipfile
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .answer_journal import append_answers, flush_journal, journal_enabled
+from .answers import parse_client_ts, save_answers
+from .exam_cache import get_exam_bundle, get_exam_version
+from .models import Exam, ExamPack, QuestionImage, StudentScore
+from .scoring import score_exam
+
+
+PACK_FORMAT = 1
+PACK_SALT = "cbt.exam_packs.pack"
+SYNC_SALT = "cbt.exam_packs.sync"
+
+# Device clocks drift; answers stamped later than this after the candidate's end time are late
+CLOCK_SKEW = timezone.timedelta(minutes=5)
+
+
+# -------------------
+# Signing
+# -------------------
+def sign(data):
+    return signing.Signer(salt=PACK_SALT, algorithm="sha256").signature(hashlib.sha256(data).hexdigest())
+
+
+def verify_pack(fileobj):
+    """Checks a pack's signature and image hashes. Returns the manifest; raises signing.BadSignature."""
+    with zipfile.ZipFile(fileobj) as archive:
+        manifest = archive.read("manifest.json")
+        if not hmac.compare_digest(sign(manifest), archive.read("manifest.sig").decode()):
+            raise signing.BadSignature("Exam pack manifest signature does not match")
+        data = json.loads(manifest)
+        for path, sha in data["files"].items():
+            if hashlib.sha256(archive.read(path)).hexdigest() != sha:
+                raise signing.BadSignature(f"Exam pack file {path} does not match the manifest")
+    return data
+
+
+def sync_key(session):
+    # Bound to the session row: gone once the candidate submits, and a new session gets a new key
+    message = f"{session.user_id}:{session.exam_id}:{session.id}:{session.start_time.isoformat()}"
+    return salted_hmac(SYNC_SALT, message, algorithm="sha256").hexdigest()
+
+
+def verify_batch(session, body, signature):
+    expected = hmac.new(sync_key(session).encode(), body, hashlib.sha256).hexdigest()
+    return bool(signature) and hmac.compare_digest(expected, signature)
+
+
+def sync_deadline(session):
+    """Server time after which the session's batches are refused."""
+    return session.end_time + timezone.timedelta(minutes=getattr(settings, "EXAM_SYNC_GRACE_MINUTES", 60))
+
+
+# -------------------
+# Build
+# -------------------
+def _pack_file(image, max_width):
+    """-> (stored file, width, height): the widest variant that fits, WebP first; the original if there is none."""
+    variants = [v for v in image.blob.variants.all() if v.width <= max_width] if image.blob_id else []
+    best = max(variants, key=lambda v: (v.width, v.format == "webp"), default=None)
+    if best:
+        return best.file, best.width, best.height
+    return image.image, None, None
+
+
+def _build(exam, version):
+    bundle = get_exam_bundle(exam.id)
+    max_width = getattr(settings, "EXAM_PACK_IMAGE_WIDTH", 1024)
+
+    images = {}
+    for image in QuestionImage.objects.filter(question__exam=exam).select_related("blob").prefetch_related("blob__variants").order_by("id"):
+        images.setdefault(image.question_id, []).append(image)
+
+    buffer, files, questions = io.BytesIO(), {}, []
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for question in bundle["questions"]:
+            entries = []
+            for image in images.get(question["id"], []):
+                stored, width, height = _pack_file(image, max_width)
+                path = f"images/{os.path.basename(stored.name)}"
+                if path not in files:
+                    try:
+                        with stored.open("rb") as handle:
+                            data = handle.read()
+                    except OSError:
+                        continue # Missing from storage; the online paper can't show it either
+                    files[path] = hashlib.sha256(data).hexdigest()
+                    archive.writestr(path, data, compress_type=zipfile.ZIP_STORED) # Already compressed
+                entries.append({"path": path, "caption": image.caption, "width": width, "height": height})
+            # Image URLs are replaced by paths inside the pack
+            questions.append(dict(question, images=entries))
+
+        manifest = json.dumps({
+            "format": PACK_FORMAT,
+            "exam_id": exam.id,
+            "version": version,
+            "built_at": timezone.now().isoformat(),
+            "starts_at": exam.start_datetime.isoformat() if exam.start_datetime else None,
+            "ends_at": exam.end_datetime.isoformat() if exam.end_datetime else None,
+            "exam": bundle["exam"],
+            "questions": questions,
+            "files": files,
+        }, default=str).encode()
+        archive.writestr("manifest.json", manifest)
+        signature = sign(manifest)
+        archive.writestr("manifest.sig", signature)
+    return buffer.getvalue(), signature
+
+
+def get_exam_pack(exam_id):
+    """The ExamPack for the exam's current content, built if needed; None if the exam doesn't exist."""
+    version = get_exam_version(exam_id)
+    pack = ExamPack.objects.filter(exam_id=exam_id, version=version).first()
+    if pack:
+        return pack
+
+    with transaction.atomic():
+        # At exam start every candidate asks at once; the row lock lets one build while the rest wait for it
+        exam = Exam.objects.select_for_update().select_related("school").filter(id=exam_id).first()
+        if exam is None:
+            return None
+        pack = ExamPack.objects.filter(exam=exam).first()
+        if pack and pack.version == version:
+            return pack
+
+        content, signature = _build(exam, version)
+        old_name = pack.file.name if pack else None
+        pack = pack or ExamPack(exam=exam)
+        pack.file.save(f"exam_{exam.id}_{version[:12]}.zip", ContentFile(content), save=False)
+        pack.version, pack.signature = version, signature
+        pack.sha256, pack.size = hashlib.sha256(content).hexdigest(), len(content)
+        pack.save()
+        if old_name and old_name != pack.file.name:
+            transaction.on_commit(lambda: default_storage.delete(old_name))
+    return pack
+
+
+# -------------------
+# Sync
+# -------------------
+def sync_answers(session, entries, finished=False):
+    """
+    Saves a verified offline batch for a running session (the caller checks sync_deadline).
+    Entries for other exams' questions are invalid; ones stamped after the session's end
+    time are late. Both are dropped.
+
+    Returns save_answers()' result plus "late", and "score" when the candidate was scored.
+    """
+    user_id, exam = session.user_id, session.exam
+    question_ids = {question["id"] for question in get_exam_bundle(exam.id)["questions"]}
+    ends_at = session.end_time
+
+    accepted, invalid, late = [], [], []
+    for entry in entries:
+        try:
+            question_id = int(entry.get("questionId"))
+        except (TypeError, ValueError):
+            question_id = None
+        if question_id not in question_ids:
+            invalid.append(entry.get("questionId"))
+        elif parse_client_ts(entry.get("client_ts")) > ends_at + CLOCK_SKEW:
+            late.append(question_id)
+        else:
+            accepted.append(entry)
+
+    if journal_enabled():
+        append_answers(user_id, exam.school_id, accepted)
+        result = {"saved": [], "stale": [], "invalid": [], "queued": len(accepted)}
+    else:
+        result = save_answers(user_id, exam.school_id, accepted)
+    result["invalid"] += invalid
+    result["late"] = late
+
+    # Finished offline, or force-submitted while offline (the session stays, already scored):
+    # score with what just arrived
+    if finished or StudentScore.objects.filter(user_id=user_id, exam=exam).exists():
+        if journal_enabled():
+            flush_journal(user_id=user_id)
+        result["score"] = score_exam(exam, [user_id])[user_id]
+        if finished:
+            session.delete()
+    return result
@@ -0,0 +1,80 @@
+#exports.py
+import csv
+import io
+from django.db.models import Sum
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+from .models import StudentScore
+from .xlsx import stream_xlsx
+
+
+RESULT_HEADERS = ["Student Name", "Username/ID", "Class", "Score", "Total Possible", "Percentage (%)"]
+
+
+def result_rows(exam):
+    """
+    One tuple per StudentScore, streamed from the database in chunks (values_list +
+    iterator) rather than model instances, so 50k scores use the same memory as 50.
+    """
+    # Calculate Total Possible Points
+    total_possible = exam.questions.aggregate(total=Sum('point'))['total'] or 0
+
+    scores = StudentScore.objects.filter(exam=exam).order_by('id').values_list(
+        'user__first_name', 'user__last_name', 'user__username',
+        'user__userprofile__student_class__name', 'user__userprofile__student_class__group',
+        'score',
+    )
+    for first, last, username, class_name, group, score in scores.iterator(chunk_size=2000):
+        percentage = (score / total_possible * 100) if total_possible > 0 else 0
+        yield (
+            f"{first} {last}".strip(),
+            username,
+            f"{class_name} {group or ''}".strip() if class_name else "N/A",
+            score,
+            total_possible,
+            round(percentage, 2),
+        )
+
+
+def stream_results_xlsx(exam):
+    return stream_xlsx([("Exam Results", RESULT_HEADERS, result_rows(exam))])
+
+
+class _Echo:
+    # csv.writer target that hands each line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def stream_results_csv(exam):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(RESULT_HEADERS)
+    for row in result_rows(exam):
+        yield writer.writerow(row)
+
+
+def render_result_slips(exam, progress=None):
+    """
+    The exam's result slips as PDF bytes via xhtml2pdf. Superseded by result_slips.py;
+    kept as the baseline for `manage.py benchmark_slips`. Raises ValueError on render errors.
+    """
+    scores = StudentScore.objects.filter(exam=exam).select_related('user', 'user__userprofile__student_class')
+    total_possible = exam.questions.aggregate(total=Sum('point'))['total'] or 0
+
+    context = {
+        'exam': exam,
+        'scores': scores,
+        'total_possible': total_possible,
+        'school': exam.school,
+    }
+
+    template = get_template('admin/result_slips_pdf.html')
+    html = template.render(context)
+    if progress:
+        progress(10, "Rendering PDF")
+
+    buffer = io.BytesIO()
+    pisa_status = pisa.CreatePDF(html, dest=buffer)
+    if pisa_status.err:
+        raise ValueError(f"xhtml2pdf reported {pisa_status.err} error(s) while rendering the slips")
+    return buffer.getvalue()
@@ -0,0 +1,107 @@
+#hashing.py
+"""
+Password hashing for student accounts created in bulk.
+
+PBKDF2 is deliberately slow (Django 5.2: 1,000,000 iterations, roughly a tenth of a
+second per password), so hashing dominates student imports. hash_passwords() spreads
+make_password over a process pool sized to the CPU count (PASSWORD_HASH_WORKERS), and
+the hashes go straight into User(password=...) for bulk_create.
+
+EXAM_ACCOUNT_FAST_HASH (off by default) is an opt-in, lower-cost profile for temporary
+exam-only candidate accounts: students are hashed with ExamAccountHasher, which is the
+same PBKDF2-SHA256 at EXAM_ACCOUNT_HASH_ITERATIONS. It is weaker against offline
+cracking of a leaked database, so only turn it on for throwaway candidate logins,
+never for staff. Admin and staff passwords always use the default hasher.
+
+Django upgrades a non-default hash the first time the user logs in, which would put
+one full-cost hash on every candidate's first login (the whole hall at once).
+ExamAccountBackend verifies exam-account hashes without that upgrade; settings only
+installs it while EXAM_ACCOUNT_FAST_HASH is on. Turned off later, ModelBackend still
+accepts the existing exam hashes and upgrades them at each candidate's next login.
+
+Benchmark: python manage.py benchmark_hashing --count 200
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+POOL_THRESHOLD = 20 # Below this many passwords a process pool costs more than it saves
+EXAM_HASHER = "pbkdf2_sha256_exam"
+
+
+class ExamAccountHasher(PBKDF2PasswordHasher):
+    algorithm = EXAM_HASHER
+    iterations = getattr(settings, "EXAM_ACCOUNT_HASH_ITERATIONS", 100_000)
+
+
+class ExamAccountBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            return None
+        if not user.password.startswith(EXAM_HASHER + "$"):
+            return None # Everyone else goes through ModelBackend as usual
+
+        # No setter: keep the cheap hash instead of upgrading it on this login
+        if check_password(password, user.password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def student_hasher():
+    """Hasher name for new student accounts."""
+    return EXAM_HASHER if getattr(settings, "EXAM_ACCOUNT_FAST_HASH", False) else "default"
+
+
+def hash_password(password, hasher=None):
+    return make_password(password, hasher=hasher or student_hasher())
+
+
+def init_django_worker():
+    # Spawned workers (macOS/Windows) start without Django configured; shared with result_slips
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def pool_size():
+    return getattr(settings, "PASSWORD_HASH_WORKERS", None) or os.cpu_count() or 1
+
+
+def hash_passwords(passwords, progress=None, hasher=None, workers=None):
+    """
+    Hashes in input order. progress(percent, message) is reported over 0-80%, the
+    caller has the rest for its inserts.
+    """
+    hash_one = partial(make_password, hasher=hasher or student_hasher())
+
+    def report(done):
+        if progress and done % 50 == 0:
+            progress(done * 80 / len(passwords), f"Hashed {done} of {len(passwords)} passwords")
+
+    hashes = []
+    workers = workers or pool_size()
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        for password in passwords:
+            hashes.append(hash_one(password))
+            report(len(hashes))
+        return hashes
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_django_worker) as pool:
+        for password_hash in pool.map(hash_one, passwords, chunksize=max(1, len(passwords) // (workers * 4))):
+            hashes.append(password_hash)
+            report(len(hashes))
+    return hashes
@@ -0,0 +1,184 @@
+#image_store.py
+"""
+Content-addressed store for question images.
+
+Every distinct picture is one ImageBlob (keyed by sha256, file under blobs/ab/<sha>.png).
+QuestionImage rows point at a blob and their `image` names the blob's file, so the
+serializers keep using image.url. Re-importing a paper or reusing a diagram in another
+exam stores nothing new.
+
+ref_count is the number of QuestionImages using a blob:
+  * bulk paths (word_import) call add_refs() for the rows they bulk_create
+  * single saves (admin inline uploads) go through ingest_upload() and the
+    QuestionImage signals in signals.py
+  * deletes (including cascades from Question/Exam) decrement in post_delete
+
+`manage.py gc_image_blobs` recounts from the actual references (repairing any drift),
+then deletes blobs that have had no references for the grace period, files (and their
+variants' files, see image_variants.py) included.
+"""
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import ImageBlob, QuestionImage
+
+
+WRITE_WORKERS = 8 # Storage writes (disk or S3) are I/O bound, so threads
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write(blob):
+    # blob.file.save() runs upload_to (image_blob_path) and records the stored name
+    blob.file.save(f"image{blob._ext}", ContentFile(blob._data), save=False)
+    return blob
+
+
+def store_blobs(images, written=None):
+    """
+    images: iterable of (sha256, bytes, ext). Returns {sha256: ImageBlob}, writing only
+    the contents not stored yet (in parallel). ref_count is left to the caller (add_refs).
+
+    Files are written straight away but the rows only exist once the caller's transaction
+    commits. Callers pass a list as `written` to get the new file names, and delete them
+    (discard_files) if that transaction rolls back.
+    """
+    wanted = {}
+    for sha, data, ext in images:
+        wanted.setdefault(sha, (data, ext))
+    if not wanted:
+        return {}
+
+    blobs = {blob.sha256: blob for blob in ImageBlob.objects.filter(sha256__in=wanted)}
+    missing = []
+    for sha in wanted.keys() - blobs.keys():
+        blob = ImageBlob(sha256=sha, size=len(wanted[sha][0]))
+        blob._data, blob._ext = wanted[sha][0], wanted[sha][1] or ".png"
+        missing.append(blob)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+            list(pool.map(_write, missing))
+        # A concurrent import may have stored the same content; its row wins and our copy is deleted
+        ImageBlob.objects.bulk_create(missing, ignore_conflicts=True)
+        blobs.update({blob.sha256: blob for blob in ImageBlob.objects.filter(sha256__in=[b.sha256 for b in missing])})
+        ours = [blob.file.name for blob in missing if blobs[blob.sha256].file.name == blob.file.name]
+        discard_files([blob.file.name for blob in missing if blobs[blob.sha256].file.name != blob.file.name])
+        if written is not None:
+            written.extend(ours)
+    return blobs
+
+
+def discard_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass # Already gone
+
+
+def store_blob(data, ext):
+    sha = sha256(data)
+    return store_blobs([(sha, data, ext)])[sha]
+
+
+def _by_blob(blob_ids):
+    counts = Counter(blob_id for blob_id in blob_ids if blob_id)
+    # CASE id WHEN .. THEN n END, so all blobs move in one UPDATE
+    return counts, Case(*[When(id=blob_id, then=Value(n)) for blob_id, n in counts.items()])
+
+
+def add_refs(blob_ids):
+    counts, delta = _by_blob(blob_ids)
+    if counts:
+        ImageBlob.objects.filter(id__in=counts).update(ref_count=F("ref_count") + delta)
+
+
+def release_refs(blob_ids):
+    counts, delta = _by_blob(blob_ids)
+    if counts:
+        ImageBlob.objects.filter(id__in=counts).update(ref_count=Greatest(F("ref_count") - delta, Value(0)))
+
+
+def ingest_upload(question_image):
+    """For a QuestionImage saved with a freshly uploaded file: point it at the blob for that content."""
+    upload = question_image.image
+    upload.seek(0)
+    data = upload.read()
+    blob = store_blob(data, os.path.splitext(upload.name)[1].lower())
+    question_image.blob = blob
+    question_image.content_hash = blob.sha256
+    question_image.image.name = blob.file.name
+    question_image.image._committed = True # Already in storage as the blob's file
+    return blob
+
+
+# -------------------
+# Maintenance (gc_image_blobs)
+# -------------------
+def recount():
+    """Sets every ref_count from the actual QuestionImage references. Returns how many were wrong."""
+    actual = QuestionImage.objects.filter(blob=OuterRef("pk")).values("blob").annotate(n=Count("id")).values("n")
+    drifted = ImageBlob.objects.exclude(ref_count=Coalesce(Subquery(actual), 0))
+    return drifted.update(ref_count=Coalesce(Subquery(actual), 0))
+
+
+def collect_garbage(grace, dry_run=False):
+    """Deletes unreferenced blobs older than `grace` (a timedelta); files go once the row delete commits. Returns (count, bytes)."""
+    # The grace period covers imports that stored blobs but haven't committed their QuestionImages yet
+    candidates = ImageBlob.objects.filter(ref_count=0, created_at__lt=timezone.now() - grace)
+    count = freed = 0
+    for blob in candidates.iterator():
+        if dry_run:
+            count, freed = count + 1, freed + blob.size
+            continue
+        with transaction.atomic():
+            # Re-check under lock: an import may have picked the blob up since the query
+            locked = ImageBlob.objects.select_for_update().filter(id=blob.id, ref_count=0).first()
+            if not locked or QuestionImage.objects.filter(blob=locked).exists():
+                continue
+            names = [locked.file.name, *locked.variants.values_list("file", flat=True)]
+            locked.delete() # Cascades to its ImageVariants
+            transaction.on_commit(lambda names=names: [default_storage.delete(name) for name in names])
+        count, freed = count + 1, freed + blob.size
+    return count, freed
+
+
+def adopt_legacy(batch_size=200):
+    """
+    Moves QuestionImages stored before the blob store (one file per question) onto blobs.
+    The old files are deleted once nothing refers to them. Returns (adopted, missing files).
+    """
+    adopted, skipped = 0, set()
+    while True:
+        images = list(QuestionImage.objects.filter(blob__isnull=True).exclude(image="").exclude(id__in=skipped)[:batch_size])
+        if not images:
+            break
+        for image in images:
+            old_name = image.image.name
+            try:
+                with default_storage.open(old_name, "rb") as handle:
+                    data = handle.read()
+            except OSError:
+                skipped.add(image.id) # File is gone; leave the row for an admin to look at
+                continue
+
+            blob = store_blob(data, os.path.splitext(old_name)[1].lower())
+            with transaction.atomic():
+                QuestionImage.objects.filter(id=image.id).update(blob=blob, image=blob.file.name, content_hash=blob.sha256)
+                add_refs([blob.id])
+            if old_name != blob.file.name and not QuestionImage.objects.filter(image=old_name).exists():
+                default_storage.delete(old_name)
+            adopted += 1
+    return adopted, len(skipped)
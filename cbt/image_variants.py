@@ -0,0 +1,130 @@
+#image_variants.py
+"""
+Responsive variants for question images.
+
+Each ImageBlob gets WebP and JPEG copies at IMAGE_VARIANT_WIDTHS (never wider than the
+original), recompressed so a 3 MB PNG pasted into Word becomes a few tens of KB. The
+serializer returns them as a srcset list with byte sizes and clients take the smallest
+one that fits; the original stays available as "image".
+
+Variants belong to the blob, so an image reused across questions and exams is resized
+once. Resizing is CPU bound and runs in a process pool (workers get bytes, return bytes);
+the parent writes the files and rows.
+
+  * word import: the job handler calls build_variants() for the exam's new blobs
+  * admin uploads: signals.py queues an "optimize_images" job once the save commits
+  * backfill: python manage.py optimize_images
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, UnidentifiedImageError
+
+from .exam_cache import invalidate_exam
+from .hashing import init_django_worker
+from .models import ImageBlob, ImageVariant, Question
+
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+BATCH_SIZE = 20 # Blobs read into memory at a time
+
+
+def variant_widths(original_width):
+    configured = sorted(getattr(settings, "IMAGE_VARIANT_WIDTHS", None) or [320, 640, 1024])
+    widths = [w for w in configured if w < original_width]
+    # Images narrower than the largest width still get a recompressed copy at their own size
+    if original_width <= configured[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def _flatten(image):
+    # JPEG has no alpha: put transparent diagrams on white rather than black
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_variants(data):
+    """-> [(format, width, height, bytes)] for one image; [] if Pillow can't read it. Runs in the worker pool."""
+    try:
+        original = Image.open(io.BytesIO(data))
+        original.load()
+    except (UnidentifiedImageError, OSError):
+        return []
+
+    rendered = []
+    for width in variant_widths(original.width):
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+
+        webp = io.BytesIO()
+        resized.save(webp, "WEBP", quality=WEBP_QUALITY, method=4)
+        jpeg = io.BytesIO()
+        _flatten(resized).save(jpeg, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+        for fmt, buffer in (("webp", webp), ("jpeg", jpeg)):
+            # A recompressed copy bigger than the original helps nobody (small line drawings)
+            if buffer.tell() < len(data):
+                rendered.append((fmt, width, height, buffer.getvalue()))
+    return rendered
+
+
+def _render(args):
+    blob_id, data = args
+    return blob_id, render_variants(data)
+
+
+def _read(blob):
+    with blob.file.open("rb") as handle:
+        return handle.read()
+
+
+def build_variants(blobs, progress=None, workers=None):
+    """Builds the variants for the blobs in `blobs` (a queryset) not optimized yet. Returns how many blobs were done."""
+    pending = list(blobs.filter(optimized=False).values_list("id", flat=True))
+    if not pending:
+        return 0
+
+    workers = min(workers or getattr(settings, "IMAGE_VARIANT_WORKERS", None) or os.cpu_count() or 1, len(pending))
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_django_worker) if workers > 1 else None
+    done = 0
+    try:
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch = {blob.id: blob for blob in ImageBlob.objects.filter(id__in=pending[start:start + BATCH_SIZE])}
+            jobs = []
+            for blob in batch.values():
+                try:
+                    jobs.append((blob.id, _read(blob)))
+                except OSError:
+                    pass # File is missing from storage; leave the blob for gc_image_blobs/adopt_legacy to sort out
+
+            variants = []
+            for blob_id, rendered in (pool.map if pool else map)(_render, jobs):
+                for fmt, width, height, content in rendered:
+                    variant = ImageVariant(blob=batch[blob_id], format=fmt, width=width, height=height, size=len(content))
+                    variant.file.save(f"variant.{fmt}", ContentFile(content), save=False)
+                    variants.append(variant)
+
+            with transaction.atomic():
+                ImageVariant.objects.bulk_create(variants, ignore_conflicts=True)
+                ImageBlob.objects.filter(id__in=[blob_id for blob_id, _ in jobs]).update(optimized=True)
+            done += len(jobs)
+            if progress:
+                progress(min(99, 100 * done // len(pending)), f"Optimized {done} of {len(pending)} images")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    # Cached exam payloads carry the srcset lists
+    for exam_id in Question.objects.filter(images__blob__in=pending).values_list("exam_id", flat=True).distinct():
+        invalidate_exam(exam_id)
+    return done
@@ -0,0 +1,59 @@
+#job_handlers.py
+# Job handlers for the heavy admin operations; registered on import (CbtConfig.ready)
+import csv
+import io
+from . import student_import
+from .image_variants import build_variants
+from .jobs import handler, scrub_expired_secrets, seal
+from .models import Exam, ImageBlob
+from .registration import register
+from .word_import import import_word_document
+
+
+@handler("import_word_questions")
+def import_word_questions(job, progress):
+    exam = Exam.objects.select_related("school").get(id=job.params["exam_id"])
+    with job.input_file.open("rb") as word_file:
+        report = import_word_document(exam, word_file, progress)
+
+    job.result = report
+    if report["errors"]:
+        job.message = f"Nothing imported: fix {len(report['errors'])} question(s) in the document and upload it again."
+    else:
+        job.message = (
+            f"Processed {report['created'] + report['updated'] + report['unchanged']} questions successfully "
+            f"({report['created']} new, {report['updated']} changed, {report['unchanged']} unchanged; "
+            f"{report['images_written']} images saved, {report['images_kept']} kept)."
+        )
+        if report["skipped"]:
+            job.message += f" {len(report['skipped'])} blank question(s) skipped."
+        # After the import has committed, so the questions are live while their images are resized
+        build_variants(ImageBlob.objects.filter(question_images__question__exam=exam).distinct(), progress)
+
+
+@handler("optimize_images")
+def optimize_images(job, progress):
+    count = build_variants(ImageBlob.objects.filter(id__in=job.params["blob_ids"]), progress)
+    job.message = f"Optimized {count} image(s)."
+
+
+@handler("import_students")
+def import_students(job, progress):
+    with job.input_file.open("rb") as csv_file:
+        reader = csv.reader(io.StringIO(csv_file.read().decode("utf-8")))
+    next(reader, None) # skip header
+
+    result = student_import.import_students(job.school, reader, progress)
+    # Generated passwords stay on the job encrypted, until the admin opens the results page
+    # (CustomUserAdmin.import_result) or JOB_SECRET_TTL passes, whichever is first
+    job.result = {"count": len(result["created"]), "errors": result["errors"], "sealed": seal(result["created"])}
+    job.message = f"Imported {len(result['created'])} students; {len(result['errors'])} rows need fixing."
+    # The uploaded CSV holds plain-text passwords, don't keep it around
+    job.input_file.delete(save=False)
+    scrub_expired_secrets()
+
+
+@handler("register_courses")
+def register_courses(job, progress):
+    count = register(job.params["user_ids"], job.params["course_ids"], job.school)
+    job.message = f"Successfully registered {count} new enrollments."
@@ -0,0 +1,148 @@
+#jobs.py
+"""
+Background jobs for admin operations that are too slow for one HTTP request
+(Word question imports, image optimization, CSV student imports, bulk course registration).
+
+    job = enqueue("import_word_questions", label="...", school=..., user=..., params={"exam_id": ...}, input_file=...)
+    return redirect(progress_url(job))
+
+Handlers are registered by kind with @handler("kind") (see job_handlers.py) and are
+called as fn(job, progress), where progress(percent, message="") updates the Job row.
+A handler may set job.result (small JSON), job.message (shown when done) and/or call
+save_result_file(). Secrets (generated passwords) go into job.result only through
+seal(): encrypted, and unreadable after JOB_SECRET_TTL seconds; scrub_expired_secrets()
+then removes the ciphertext too.
+
+Where jobs run is decided by JOBS_EAGER:
+  * True (default unless CELERY_BROKER_URL is set; REDIS_URL alone doesn't count): in-process,
+    right after the enqueuing transaction commits; no broker or worker process needed
+  * False: handed to Celery (cbt.tasks.run_job_task) through CELERY_BROKER_URL. input_file
+    and result_file then cross processes (and usually machines), so they need storage
+    both sides can reach; checks.py fails the system check on a local MEDIA_ROOT unless
+    JOBS_SHARED_STORAGE says it is a shared volume
+"""
+import base64
+import json
+import traceback
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import Job
+
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind, label, school=None, user=None, params=None, input_file=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'")
+
+    job = Job(kind=kind, label=label[:255], school=school, created_by=user, params=params or {})
+    if input_file is not None:
+        # The worker can't read the request's upload, so keep a copy with the job
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job
+
+
+def dispatch(job_id):
+    if getattr(settings, "JOBS_EAGER", True):
+        run_job(job_id)
+    else:
+        from .tasks import run_job_task
+        run_job_task.delay(job_id)
+
+
+def _progress_reporter(job_id):
+    last = {"percent": -1, "message": None}
+
+    def progress(percent, message=""):
+        percent = max(0, min(99, int(percent))) # 100 is set when the handler returns
+        # Only write when something visible changed, handlers may call this per row
+        if percent == last["percent"] and message == last["message"]:
+            return
+        last.update(percent=percent, message=message)
+        Job.objects.filter(id=job_id).update(progress=percent, message=message[:255])
+
+    return progress
+
+
+def run_job(job_id):
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(id=job_id, status='queued').first()
+        if not job:
+            return None # Already picked up (a retried Celery delivery)
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+    try:
+        HANDLERS[job.kind](job, _progress_reporter(job.id))
+    except Exception:
+        Job.objects.filter(id=job.id).update(
+            status='failed', error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        return None
+
+    job.status = 'done'
+    job.progress = 100
+    job.message = job.message or "Finished"
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'message', 'result', 'input_file', 'result_file', 'finished_at'])
+    return job
+
+
+def save_result_file(job, filename, content):
+    """content: bytes or a File. Stored on job.result_file; saved with the job when the handler returns."""
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    job.result_file.save(filename, content, save=False)
+
+
+def _fernet():
+    key = salted_hmac("cbt.jobs.seal", "job-secrets", algorithm="sha256").digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def seal(data):
+    """Encrypts JSON-able data for job.result; unseal() gives it back for JOB_SECRET_TTL seconds."""
+    return _fernet().encrypt(json.dumps(data).encode()).decode()
+
+
+def unseal(token):
+    """The sealed data, or None once it has expired (or was tampered with)."""
+    try:
+        return json.loads(_fernet().decrypt(token.encode(), ttl=getattr(settings, "JOB_SECRET_TTL", 3600)))
+    except InvalidToken:
+        return None
+
+
+def scrub_expired_secrets():
+    """Drops sealed data older than JOB_SECRET_TTL from finished jobs' results."""
+    cutoff = timezone.now() - timezone.timedelta(seconds=getattr(settings, "JOB_SECRET_TTL", 3600))
+    scrubbed = 0
+    for job in Job.objects.filter(status='done', finished_at__lt=cutoff, result__has_key="sealed"):
+        job.result = {key: value for key, value in job.result.items() if key != "sealed"}
+        job.save(update_fields=['result'])
+        scrubbed += 1
+    return scrubbed
+
+
+def progress_url(job):
+    return reverse("admin:cbt_job_progress", args=[job.id])
@@ -0,0 +1,336 @@
+#loadtest.py
+"""
+Exam-hall load generator used by `manage.py loadtest`.
+
+seed_hall() creates a throwaway school with one class, one course, one exam that is
+open right now, its questions and N registered students (all sharing one pre-hashed
+password so seeding stays fast). run_hall() then drives the real candidate flow for
+every student, in waves:
+
+    /api/login/ -> /api/exam/<id>/ -> /start/ -> paper or per-question fetches
+    -> /api/answer/ bursts (or /api/answers/batch/) with /time/ polling -> /end/
+
+By default requests go through Django's test client in-process, which lets us count
+DB queries per request. With base_url they go over HTTP to a running server
+(gunicorn/uvicorn) that must point at the same database; query counts are then not
+available.
+"""
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.utils import timezone
+
+from .models import Course, CourseRegistration, Exam, Question, School, StudentClass, UserProfile
+
+
+PASSWORD = "Loadtest123!"
+QUESTION_TYPES = ['obj', 'obj', 'obj', 'tf', 'fitg', 'essay']
+
+
+# -------------------
+# Seeding
+# -------------------
+def seed_hall(students, questions, duration_minutes=120):
+    token = uuid.uuid4().hex[:6]
+    now = timezone.now()
+
+    school = School.objects.create(
+        name=f"Loadtest School {token}",
+        email=f"loadtest-{token}@example.com",
+        is_active=True,
+        subscription_end=now + timezone.timedelta(days=1),
+    )
+    student_class = StudentClass.objects.create(school=school, name="Loadtest Class")
+    course = Course.objects.create(school=school, name=f"Loadtest Course {token}", target_class=student_class)
+    exam = Exam.objects.create(
+        school=school,
+        course=course,
+        title=f"Loadtest {token}",
+        start_datetime=now - timezone.timedelta(minutes=1),
+        total_questions=questions,
+        duration_minutes=duration_minutes,
+    )
+
+    Question.objects.bulk_create([
+        Question(
+            school=school,
+            exam=exam,
+            question_number=i,
+            question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+            question_text=f"Loadtest question {i}",
+            option_a="Alpha", option_b="Beta", option_c="Gamma", option_d="Delta",
+            correct_answer={'obj': 'A', 'tf': 'T', 'fitg': 'lagos', 'essay': None}[QUESTION_TYPES[i % len(QUESTION_TYPES)]],
+        )
+        for i in range(1, questions + 1)
+    ])
+
+    password_hash = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [User(username=f"lt{token}_{i}", password=password_hash, first_name="Load", last_name=f"Student {i}")
+         for i in range(students)],
+        batch_size=1000,
+    )
+    users = list(User.objects.filter(username__startswith=f"lt{token}_").values_list("id", "username"))
+    UserProfile.objects.bulk_create(
+        [UserProfile(user_id=user_id, school=school, role='student', student_class=student_class) for user_id, _ in users],
+        batch_size=1000,
+    )
+    CourseRegistration.objects.bulk_create(
+        [CourseRegistration(user_id=user_id, course=course, school=school) for user_id, _ in users],
+        batch_size=1000,
+    )
+
+    return {
+        "school_id": school.id,
+        "exam_id": exam.id,
+        "usernames": [username for _, username in users],
+        "question_count": questions,
+    }
+
+
+def cleanup_hall(hall):
+    # Deleting the school cascades to everything seeded (profiles delete their users via signals)
+    School.objects.filter(id=hall["school_id"]).delete()
+
+
+# -------------------
+# Transport
+# -------------------
+class InProcessTransport:
+    """Django test client; counts DB queries issued while serving each request."""
+    counts_queries = True
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, token=None, body=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        queries = [0]
+
+        def counter(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            if method == "GET":
+                response = self.client.get(path, **headers)
+            else:
+                response = self.client.post(path, data=json.dumps(body or {}), content_type="application/json", **headers)
+
+        data = None
+        if response.get("Content-Type", "").startswith("application/json") and response.content:
+            data = response.json()
+        return response.status_code, data, queries[0]
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    counts_queries = False
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def request(self, method, path, token=None, body=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.session.request(method, self.base_url + path, json=body if method != "GET" else None, headers=headers)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return response.status_code, data, None
+
+    def close(self):
+        self.session.close()
+
+
+# -------------------
+# Candidate flow
+# -------------------
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, endpoint, seconds, status, queries):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status, queries))
+
+
+def _call(transport, recorder, endpoint, method, path, token=None, body=None):
+    started = time.perf_counter()
+    try:
+        status, data, queries = transport.request(method, path, token, body)
+    except Exception:
+        status, data, queries = 599, None, None
+    recorder.add(endpoint, time.perf_counter() - started, status, queries)
+    return status, data
+
+
+def _answer_for(index):
+    question_type = QUESTION_TYPES[index % len(QUESTION_TYPES)]
+    return {
+        'obj': random.choice("ABCD"),
+        'tf': random.choice("TF"),
+        'fitg': random.choice(["Lagos", "Abuja"]),
+        'essay': "Loadtest essay answer",
+    }[question_type]
+
+
+def run_candidate(transport, recorder, username, options):
+    status, data = _call(transport, recorder, "login", "POST", "/api/login/",
+                         body={"examNo": username, "password": PASSWORD})
+    if status != 200 or not data or not data.get("valid"):
+        return False
+    token = data["access"]
+    exam_id = data["exam"]["id"]
+    base = f"/api/exam/{exam_id}"
+
+    _call(transport, recorder, "exam", "GET", f"{base}/", token)
+    _call(transport, recorder, "start", "POST", f"{base}/start/", token)
+
+    question_ids = []
+    if options["fetch"] == "paper":
+        status, data = _call(transport, recorder, "paper", "GET", f"{base}/paper/", token)
+        if data:
+            question_ids = [q["id"] for q in data.get("questions", [])]
+    else:
+        for index in range(options["questions"]):
+            status, data = _call(transport, recorder, "question", "GET", f"{base}/question/{index}/", token)
+            if data and "id" in data:
+                question_ids.append(data["id"])
+
+    # Candidates revisit and change answers, so each question is answered `changes` times
+    poll_every = max(1, len(question_ids) // max(1, options["time_polls"]))
+    for _ in range(options["changes"]):
+        if options["answer_mode"] == "batch":
+            _call(transport, recorder, "answers-batch", "POST", "/api/answers/batch/", token, body={"answers": [
+                {"questionId": q_id, "answer": _answer_for(i), "client_ts": int(time.time() * 1000)}
+                for i, q_id in enumerate(question_ids)
+            ]})
+            _call(transport, recorder, "time", "GET", f"{base}/time/", token)
+            continue
+
+        for i, q_id in enumerate(question_ids):
+            _call(transport, recorder, "answer", "POST", "/api/answer/", token,
+                  body={"questionId": q_id, "selectedOption": _answer_for(i)})
+            if options["think_time"]:
+                time.sleep(random.uniform(0, options["think_time"]))
+            if i % poll_every == 0:
+                _call(transport, recorder, "time", "GET", f"{base}/time/", token)
+
+    status, _ = _call(transport, recorder, "end", "POST", f"{base}/end/", token)
+    return status == 200
+
+
+def run_hall(hall, options, base_url=None):
+    """
+    options: questions, fetch ("paper"|"index"), answer_mode ("single"|"batch"), changes,
+    time_polls, think_time, wave_size, wave_interval, concurrency.
+    """
+    recorder = Recorder()
+    usernames = hall["usernames"]
+    options = dict(options, questions=hall["question_count"])
+    started = time.perf_counter()
+
+    def worker(position, username):
+        # Students log in in waves of wave_size, wave_interval seconds apart
+        start_at = started + (position // options["wave_size"]) * options["wave_interval"]
+        delay = start_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        transport = HttpTransport(base_url) if base_url else InProcessTransport()
+        try:
+            return run_candidate(transport, recorder, username, options)
+        finally:
+            transport.close()
+
+    with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+        finished = list(pool.map(worker, range(len(usernames)), usernames))
+
+    elapsed = time.perf_counter() - started
+    return build_report(recorder, elapsed, finished, options, base_url)
+
+
+# -------------------
+# Reporting
+# -------------------
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    # Nearest rank: the smallest value with at least pct% of the samples at or below it
+    index = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def build_report(recorder, elapsed, finished, options, base_url):
+    endpoints = {}
+    total_requests = 0
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = [s[0] * 1000 for s in samples]
+        queries = [s[2] for s in samples if s[2] is not None]
+        errors = sum(1 for s in samples if s[1] >= 400)
+        total_requests += len(samples)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": errors,
+            "rps": round(len(samples) / elapsed, 2) if elapsed else 0,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+        }
+
+    return {
+        "created_at": timezone.now().isoformat(),
+        "target": base_url or "in-process",
+        "options": options,
+        "students": len(finished),
+        "completed": sum(1 for ok in finished if ok),
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0,
+        "endpoints": endpoints,
+    }
+
+
+def format_report(report, baseline=None):
+    lines = [
+        f"Target: {report['target']}  students: {report['completed']}/{report['students']} completed  "
+        f"elapsed: {report['elapsed_s']}s  throughput: {report['throughput_rps']} req/s",
+        f"{'endpoint':<15}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}",
+    ]
+    for endpoint, row in report["endpoints"].items():
+        queries = row["queries_per_request"]
+        line = (
+            f"{endpoint:<15}{row['requests']:>7}{row['errors']:>6}{row['rps']:>9}"
+            f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{queries if queries is not None else '-':>9}"
+        )
+        previous = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if previous and previous["p95_ms"]:
+            change = (row["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   p95 {change:+.1f}% vs baseline"
+            if queries is not None and previous.get("queries_per_request") is not None:
+                line += f", queries {previous['queries_per_request']} -> {queries}"
+        lines.append(line)
+
+    if baseline and baseline.get("throughput_rps"):
+        change = (report["throughput_rps"] - baseline["throughput_rps"]) / baseline["throughput_rps"] * 100
+        lines.append(f"Throughput {change:+.1f}% vs baseline ({baseline['throughput_rps']} req/s)")
+    return "\n".join(lines)
@@ -0,0 +1,49 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from cbt.hashing import EXAM_HASHER, hash_passwords, pool_size
+
+
+class Command(BaseCommand):
+    help = 'Measures student accounts created per second: serial vs pooled hashing, default vs exam-account hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Accounts per run.')
+        parser.add_argument('--workers', type=int, default=None, help='Pool size (default: PASSWORD_HASH_WORKERS or CPU count).')
+        parser.add_argument('--skip-serial', action='store_true', help='Skip the serial default-hasher run (the slowest).')
+        parser.add_argument('--no-db', action='store_true', help='Time hashing only, without the bulk_create.')
+
+    def handle(self, *args, **options):
+        count, workers = options['count'], options['workers'] or pool_size()
+        passwords = [f"Bench{i}!pw" for i in range(count)]
+
+        runs = [
+            ("default, serial", "default", 1),
+            ("default, pooled", "default", workers),
+            ("exam-account, serial", EXAM_HASHER, 1),
+            ("exam-account, pooled", EXAM_HASHER, workers),
+        ]
+        if options['skip_serial']:
+            runs = runs[1:]
+
+        self.stdout.write(f"{count} accounts per run, pool of {workers} worker(s)")
+        baseline = None
+        for label, hasher, run_workers in runs:
+            started = time.perf_counter()
+            hashes = hash_passwords(passwords, hasher=hasher, workers=run_workers)
+            if not options['no_db']:
+                # Same insert path as the student import; rolled back so nothing is left behind
+                with transaction.atomic():
+                    User.objects.bulk_create([
+                        User(username=f"bench_{hasher[:6]}_{run_workers}_{i}", password=password_hash)
+                        for i, password_hash in enumerate(hashes)
+                    ], batch_size=500)
+                    transaction.set_rollback(True)
+            elapsed = time.perf_counter() - started
+
+            rate = count / elapsed
+            baseline = baseline or rate
+            self.stdout.write(f"  {label:<22} {elapsed:8.2f}s  {rate:8.1f} users/s  x{rate / baseline:.1f}")
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
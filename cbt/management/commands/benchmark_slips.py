@@ -0,0 +1,52 @@
+import io
+import time
+from django.core.management.base import BaseCommand, CommandError
+from cbt.exports import render_result_slips
+from cbt.models import Exam
+from cbt.result_slips import slip_header, slip_rows, write_class_zip, write_slips
+
+
+class Command(BaseCommand):
+    help = 'Compares result slip rendering speed (pages/s): xhtml2pdf template vs reportlab, single PDF and per-class zip.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--workers', type=int, default=None, help='Processes for the per-class run (default: SLIP_WORKERS or CPU count).')
+        parser.add_argument('--skip-xhtml2pdf', action='store_true', help='Skip the old path (slow for big exams).')
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.select_related('school', 'course').filter(id=options['exam_id']).first()
+        if not exam:
+            raise CommandError(f"Exam {options['exam_id']} not found.")
+        pages = exam.scores.count()
+        if not pages:
+            raise CommandError("The exam has no scores to print.")
+
+        def reportlab_single():
+            return len(_run(lambda out: write_slips(slip_header(exam), slip_rows(exam), out)))
+
+        def reportlab_by_class():
+            return len(_run(lambda out: write_class_zip(slip_header(exam), slip_rows(exam), out, workers=options['workers'])))
+
+        runs = [("reportlab", reportlab_single), ("reportlab, per class", reportlab_by_class)]
+        if not options['skip_xhtml2pdf']:
+            runs.insert(0, ("xhtml2pdf (old)", lambda: len(render_result_slips(exam))))
+
+        self.stdout.write(f"{pages} slips for {exam}")
+        baseline = None
+        for label, run in runs:
+            started = time.perf_counter()
+            size = run()
+            elapsed = time.perf_counter() - started
+
+            rate = pages / elapsed
+            baseline = baseline or rate
+            self.stdout.write(f"  {label:<22} {elapsed:8.2f}s  {rate:8.1f} pages/s  x{rate / baseline:.1f}  {size / 1024:.0f} KB")
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+
+def _run(write):
+    buffer = io.BytesIO()
+    write(buffer)
+    return buffer.getvalue()
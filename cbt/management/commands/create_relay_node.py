@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from cbt.models import School
+from cbt.relay import create_node
+
+
+class Command(BaseCommand):
+    help = 'Registers an exam-centre relay node for a school (run on the central server) and prints its key.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('school_id', type=int)
+        parser.add_argument('name', help='e.g. "Main hall"')
+
+    def handle(self, *args, **options):
+        school = School.objects.filter(id=options['school_id']).first()
+        if not school:
+            raise CommandError(f"No school with id {options['school_id']}.")
+
+        node, key = create_node(school, options['name'])
+        self.stdout.write(self.style.SUCCESS(f"Relay node '{node.name}' created for {school.name}."))
+        self.stdout.write("Set this on the relay as RELAY_KEY. It is not stored and won't be shown again:")
+        self.stdout.write(key)
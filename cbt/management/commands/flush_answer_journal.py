@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from cbt.answer_journal import flush_journal
+
+
+class Command(BaseCommand):
+    help = 'Merges the write-behind answer journal into StudentAnswer (ANSWER_WRITE_MODE=journal).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and flush continuously.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the journal is empty.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain whatever is pending, one bulk batch at a time
+            total = 0
+            while True:
+                applied = flush_journal(batch_size=options['batch_size'])
+                total += applied
+                if applied < options['batch_size']:
+                    break
+
+            if total:
+                self.stdout.write(f'Flushed {total} journaled answers.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Answer journal flushed.'))
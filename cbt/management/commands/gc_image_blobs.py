@@ -0,0 +1,25 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from cbt.image_store import adopt_legacy, collect_garbage, recount
+
+
+class Command(BaseCommand):
+    help = 'Repairs image blob reference counts and deletes blobs (and their files) no question uses any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24, help='Only delete blobs unreferenced and older than this (default 24).')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it.')
+        parser.add_argument('--adopt-legacy', action='store_true', help='First move images uploaded before the blob store onto blobs.')
+
+    def handle(self, *args, **options):
+        if options['adopt_legacy']:
+            adopted, missing = adopt_legacy()
+            self.stdout.write(f"Adopted {adopted} legacy image(s); {missing} had no file in storage.")
+
+        drifted = recount()
+        if drifted:
+            self.stdout.write(self.style.WARNING(f"Repaired {drifted} reference count(s)."))
+
+        count, freed = collect_garbage(timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} unused blob(s), {freed / 1024:.1f} KB."))
@@ -0,0 +1,61 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cbt.loadtest import cleanup_hall, format_report, run_hall, seed_hall
+
+
+class Command(BaseCommand):
+    help = 'Simulates an exam hall (login waves, paper fetch, answer bursts, time polling, submit) and reports latency per endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--questions', type=int, default=40)
+        parser.add_argument('--fetch', choices=['paper', 'index'], default='index',
+                            help='Load the whole paper at once or one question per request (the current frontend).')
+        parser.add_argument('--answer-mode', choices=['single', 'batch'], default='single')
+        parser.add_argument('--changes', type=int, default=1, help='How many times each question is (re)answered.')
+        parser.add_argument('--time-polls', type=int, default=4, help='Remaining-time polls per pass over the paper.')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Max random pause between answers, in seconds.')
+        parser.add_argument('--wave-size', type=int, default=50, help='Students that log in together.')
+        parser.add_argument('--wave-interval', type=float, default=2.0, help='Seconds between login waves.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneously active candidates (threads).')
+        parser.add_argument('--base-url', help='Hit a running server over HTTP instead of the in-process test client.')
+        parser.add_argument('--output', help='Write the JSON report here (use it later as --baseline).')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against.')
+        parser.add_argument('--keep-data', action='store_true', help="Don't delete the seeded school afterwards.")
+        parser.add_argument('--force', action='store_true', help='Allow seeding when DEBUG is off.')
+
+    def handle(self, *args, **options):
+        # Seeding writes a whole school into the configured database
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to seed a non-DEBUG database; pass --force if this really is a test database.')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        self.stdout.write(f"Seeding {options['students']} students and {options['questions']} questions...")
+        hall = seed_hall(options['students'], options['questions'])
+
+        try:
+            report = run_hall(hall, {
+                'fetch': options['fetch'],
+                'answer_mode': options['answer_mode'],
+                'changes': options['changes'],
+                'time_polls': options['time_polls'],
+                'think_time': options['think_time'],
+                'wave_size': max(1, options['wave_size']),
+                'wave_interval': options['wave_interval'],
+                'concurrency': max(1, options['concurrency']),
+            }, base_url=options['base_url'])
+        finally:
+            if not options['keep_data']:
+                cleanup_hall(hall)
+
+        self.stdout.write(format_report(report, baseline))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,25 @@
+import time
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from cbt.image_variants import build_variants
+from cbt.models import ImageBlob, ImageVariant
+
+
+class Command(BaseCommand):
+    help = 'Builds the resized WebP/JPEG variants for question images that have none yet (e.g. ones stored before variants existed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Resizing processes (default: IMAGE_VARIANT_WORKERS or CPU count).')
+        parser.add_argument('--rebuild', action='store_true', help='Drop and rebuild every variant (after changing IMAGE_VARIANT_WIDTHS).')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            for name in ImageVariant.objects.values_list('file', flat=True).iterator():
+                default_storage.delete(name)
+            ImageVariant.objects.all().delete()
+            ImageBlob.objects.update(optimized=False)
+
+        started = time.perf_counter()
+        count = build_variants(ImageBlob.objects.all(), workers=options['workers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Optimized {count} image(s) in {elapsed:.1f}s.'))
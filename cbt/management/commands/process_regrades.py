@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from cbt.models import QuestionRegrade
+from cbt.regrade import process_regrade, settle_regrade
+
+
+class Command(BaseCommand):
+    help = 'Runs queued question regrades (e.g. ones interrupted by a restart) and their overdue second passes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also rerun regrades that failed.')
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        queued = QuestionRegrade.objects.filter(status__in=statuses).order_by('created_at')
+        if options['retry_failed']:
+            queued.filter(status='failed').update(status='pending', error='')
+
+        done = 0
+        for regrade_id in list(queued.values_list('id', flat=True)):
+            if process_regrade(regrade_id):
+                done += 1
+
+        # Second passes whose timer was lost (restart) or never ran
+        cutoff = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'REGRADE_SETTLE_SECONDS', 120))
+        overdue = QuestionRegrade.objects.filter(status='done', settled_at__isnull=True, finished_at__lte=cutoff)
+        settled = 0
+        for regrade_id in list(overdue.values_list('id', flat=True)):
+            settle_regrade(regrade_id)
+            settled += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} regrade(s), settled {settled}.'))
@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from requests import RequestException
+from cbt.relay import parse_day, pull, push
+
+
+class Command(BaseCommand):
+    help = "Relay mode: pulls the day's exams from the central server and pushes answers and scores back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pull-only', action='store_true')
+        parser.add_argument('--push-only', action='store_true')
+        parser.add_argument('--day', help='Exam day to pull, YYYY-MM-DD (default: today).')
+        parser.add_argument('--exam', type=int, action='append', help='Only this exam id (repeatable).')
+        parser.add_argument('--loop', type=int, default=0, help='Keep pushing every N seconds.')
+        parser.add_argument('--pull-every', type=int, default=600, help='With --loop, pull again every N seconds (default 600).')
+
+    def handle(self, *args, **options):
+        try:
+            day = parse_day(options['day'])
+        except ValueError:
+            raise CommandError("--day must be YYYY-MM-DD")
+
+        last_pull = None
+        while True:
+            try:
+                if not options['push_only'] and (last_pull is None or time.monotonic() - last_pull >= options['pull_every']):
+                    stats = pull(day, options['exam'])
+                    last_pull = time.monotonic()
+                    self.stdout.write(
+                        f"Pulled {stats['exams']} exam(s), {stats['questions']} questions, {stats['students']} students "
+                        f"({stats['images_fetched']} new images, {stats['changed']} exam(s) changed)."
+                    )
+                if not options['pull_only']:
+                    stats = push()
+                    self.stdout.write(
+                        f"Pushed: {stats['saved']} answers saved, {stats['stale']} already newer, "
+                        f"{stats['rejected']} rejected, {stats['scored']} scores recomputed."
+                    )
+            except RequestException as e:
+                # The link to central drops; candidates carry on locally and the next round catches up
+                if not options['loop']:
+                    raise CommandError(f"Sync with the central server failed: {e}")
+                self.stdout.write(self.style.WARNING(f"Sync with the central server failed, retrying: {e}"))
+
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -1,40 +1,75 @@
+import re
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings # Add this import
 from django.shortcuts import redirect
 from django.http import JsonResponse
+from .auth_context import abuild_auth_context, get_auth_context
+
+# Only the API and the admin are subscription-gated; everything else skips the user lookup
+CHECKED_PREFIXES = ("/api/", "/admin/")
+
+EXEMPT_PATHS = (
+    "/admin/login/",
+    "/admin/logout/",
+    "/api/login/",
+    "/api/subscribe/",
+    "/api/paystack-webhook/",
+)
+EXEMPT_MATCH = re.compile("|".join(re.escape(p) for p in EXEMPT_PATHS)).match
+
 
 class SubscriptionMiddleware:
+    # Runs natively in both modes so the async candidate views aren't pushed back onto a thread
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        path = request.path
+
+        # 1️⃣ Exempt paths, and anything outside /api/ and /admin/ (no user/profile lookup at all)
+        if not path.startswith(CHECKED_PREFIXES) or EXEMPT_MATCH(path):
+            return self.get_response(request)
+
         user = request.user
 
-        # 1️⃣ Allow unauthenticated users
+        # 2️⃣ Allow unauthenticated users
         if not user.is_authenticated:
             return self.get_response(request)
 
-        # 2️⃣ Superadmins bypass
+        # 3️⃣ Superadmins bypass
         if user.is_superuser:
             return self.get_response(request)
 
-        # 3️⃣ Exempt paths
-        exempt_paths = (
-            "/admin/login/",
-            "/admin/logout/",
-            "/api/login/",
-            "/api/subscribe/",
-            "/api/paystack-webhook/",
-        )
-        if request.path.startswith(exempt_paths):
-            return self.get_response(request)
+        # 4️⃣ Subscription Check for Admin and APIs (cached per school, expiry compared here)
+        context = get_auth_context(request)
+        return self.expired_response(request, user, context) or self.get_response(request)
 
-        # 4️⃣ Subscription Check for Admin and APIs
-        profile = getattr(user, "userprofile", None)
-        school = profile.school if profile else None
+    async def __acall__(self, request):
+        path = request.path
+        if not path.startswith(CHECKED_PREFIXES) or EXEMPT_MATCH(path):
+            return await self.get_response(request)
 
-        if school and not school.is_subscription_active():
+        user = await request.auser()
+        if not user.is_authenticated or user.is_superuser:
+            return await self.get_response(request)
+
+        context = await abuild_auth_context(user.id)
+        request._cbt_auth_context = context
+        return self.expired_response(request, user, context) or await self.get_response(request)
+
+    def expired_response(self, request, user, context):
+        path = request.path
+        if context.school_id and not context.is_subscription_active():
             # If it's an API call, return JSON so the frontend can handle the popup/redirect
-            if request.path.startswith("/api/"):
+            if path.startswith("/api/"):
                 return JsonResponse({
                     "detail": "Subscription expired",
                     "status": "expired",
@@ -42,9 +77,8 @@ class SubscriptionMiddleware:
                 }, status=403)
 
             # If they are trying to access the Django Admin directly
-            if request.path.startswith("/admin/"):
-                if "/logout/" not in request.path:
+            if path.startswith("/admin/"):
+                if "/logout/" not in path:
                     # Redirect to absolute Next.js URL
                     return redirect(f"{settings.FRONTEND_URL}/payment?email={user.email}&plan=monthly")
-
-        return self.get_response(request)
\ No newline at end of file
+        return None
@@ -0,0 +1,228 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:05
+
+import cbt.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0002_courseregistration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('code', models.CharField(blank=True, max_length=20, null=True, verbose_name='Course Code (For Tertiary)')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='School',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('email', models.EmailField(default='admin@justcbt.com', max_length=254, unique=True)),
+                ('school_type', models.CharField(choices=[('secondary', 'Secondary School'), ('tertiary', 'Tertiary Institution'), ('others', 'Others')], default='tertiary', max_length=20)),
+                ('color', models.CharField(default='#0D7313', max_length=10)),
+                ('icon', models.ImageField(blank=True, null=True, upload_to=cbt.models.school_icon_path)),
+                ('is_active', models.BooleanField(default=False)),
+                ('subscription_plan', models.CharField(choices=[('trial', 'Trial'), ('monthly', 'Monthly'), ('yearly', 'Yearly')], default='trial', max_length=20)),
+                ('subscription_start', models.DateTimeField(blank=True, null=True)),
+                ('subscription_end', models.DateTimeField(blank=True, null=True)),
+                ('trial_used', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SchoolRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('processed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='question',
+            options={'ordering': ['question_number']},
+        ),
+        migrations.RemoveField(
+            model_name='exam',
+            name='course_code',
+        ),
+        migrations.RemoveField(
+            model_name='exam',
+            name='course_title',
+        ),
+        migrations.RemoveField(
+            model_name='question',
+            name='correct_option',
+        ),
+        migrations.RemoveField(
+            model_name='studentanswer',
+            name='selected_option',
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='academic_year',
+            field=models.CharField(default='2025/2026', help_text='e.g., 2025/2026', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='start_datetime',
+            field=models.DateTimeField(blank=True, help_text='When the exam window opens, Date:2026-12-31 14:30:00', null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='correct_answer',
+            field=models.TextField(blank=True, help_text='Correct option letter or exact word for FITG', null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='point',
+            field=models.FloatField(default=1.0, help_text='Points for getting this right'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='question_type',
+            field=models.CharField(choices=[('obj', 'Objective (MCQ)'), ('tf', 'True / False'), ('fitg', 'Fill in the Gap'), ('essay', 'Essay / Theory')], default='obj', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='answer_text',
+            field=models.TextField(default=''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='is_graded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='points_earned',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='question_text',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='studentanswer',
+            name='is_correct',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='courseregistration',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='courseregistration',
+            name='course',
+            field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='registrations', to='cbt.course'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='course',
+            field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='exams', to='cbt.course'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='courseregistration',
+            unique_together={('user', 'course')},
+        ),
+        migrations.CreateModel(
+            name='QuestionImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to=cbt.models.question_image_path)),
+                ('caption', models.CharField(blank=True, max_length=255, null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='cbt.question')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='courses', to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='courseregistration',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exams', to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school'),
+        ),
+        migrations.AddField(
+            model_name='studentscore',
+            name='school',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school'),
+        ),
+        migrations.CreateModel(
+            name='StudentClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('group', models.CharField(blank=True, max_length=100, null=True)),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='classes', to='cbt.school')),
+            ],
+            options={
+                'verbose_name': 'Class / Level',
+                'unique_together': {('school', 'name', 'group')},
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='target_class',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='courses', to='cbt.studentclass'),
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('student', 'Student'), ('admin', 'Admin'), ('superadmin', 'Superadmin')], max_length=20)),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school')),
+                ('student_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='cbt.studentclass')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='courseregistration',
+            name='exam',
+        ),
+        migrations.AlterUniqueTogether(
+            name='course',
+            unique_together={('school', 'name', 'code', 'target_class')},
+        ),
+    ]
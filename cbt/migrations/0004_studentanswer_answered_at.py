@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0003_baseline_schema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentanswer',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
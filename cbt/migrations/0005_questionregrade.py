@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0004_studentanswer_answered_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionRegrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_answer', models.TextField(blank=True, null=True)),
+                ('new_answer', models.TextField(blank=True, null=True)),
+                ('old_point', models.FloatField()),
+                ('new_point', models.FloatField()),
+                ('old_type', models.CharField(max_length=10)),
+                ('new_type', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('answers_updated', models.PositiveIntegerField(default=0)),
+                ('scores_adjusted', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regrades', to='cbt.exam')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regrades', to='cbt.question')),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='cbt.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
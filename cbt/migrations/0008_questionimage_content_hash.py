@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0007_usernamesequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
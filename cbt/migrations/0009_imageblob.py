@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+import cbt.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0008_questionimage_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to=cbt.models.image_blob_path)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='questionimage',
+            name='image',
+            field=models.ImageField(max_length=255, upload_to=cbt.models.question_image_path),
+        ),
+        migrations.AddField(
+            model_name='questionimage',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='question_images', to='cbt.imageblob'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+import cbt.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0009_imageblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='optimized',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=4)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file', models.FileField(max_length=255, upload_to=cbt.models.image_variant_path)),
+                ('size', models.PositiveIntegerField()),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='cbt.imageblob')),
+            ],
+            options={
+                'unique_together': {('blob', 'format', 'width')},
+            },
+        ),
+    ]
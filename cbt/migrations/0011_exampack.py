@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:06
+
+import cbt.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0010_imagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamPack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to=cbt.models.exam_pack_path)),
+                ('sha256', models.CharField(max_length=64)),
+                ('signature', models.CharField(max_length=100)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pack', to='cbt.exam')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cbt', '0012_relaynode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionregrade',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
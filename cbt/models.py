@@ -1,5 +1,6 @@
 from django.utils import timezone
 import datetime
+import os
 from django.db import models
 
 from django.db import models
@@ -173,6 +174,16 @@ class Question(models.Model):
 
     def __str__(self):
         return f"Q{self.question_number} - {self.get_question_type_display()}"
+
+    KEY_FIELDS = ('correct_answer', 'point', 'question_type')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The answer key as loaded, so signals.py can spot key edits without reading the row again
+        if all(name in instance.__dict__ for name in cls.KEY_FIELDS):
+            instance._loaded_key = tuple(instance.__dict__[name] for name in cls.KEY_FIELDS)
+        return instance
     
     def save(self, *args, **kwargs):
         if not self.question_number:
@@ -184,13 +195,66 @@ class Question(models.Model):
                 self.question_number = 1
         super().save(*args, **kwargs)
 
+def image_blob_path(instance, filename):
+    # Content-addressed: the same picture is stored once however many questions use it
+    return f'blobs/{instance.sha256[:2]}/{instance.sha256}{os.path.splitext(filename)[1].lower()}'
+
+
+# One stored image file per distinct content; QuestionImages point at it (see image_store.py)
+class ImageBlob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=image_blob_path, max_length=255)
+    size = models.PositiveIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0) # QuestionImages using it; 0 = collectable (gc_image_blobs)
+    optimized = models.BooleanField(default=False) # Variants built (image_variants.py)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+def image_variant_path(instance, filename):
+    return f'blobs/{instance.blob.sha256[:2]}/{instance.blob.sha256}_{instance.width}.{instance.format}'
+
+
+# Recompressed, resized copy of a blob served to candidates instead of the original
+class ImageVariant(models.Model):
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    blob = models.ForeignKey(ImageBlob, on_delete=models.CASCADE, related_name="variants")
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(upload_to=image_variant_path, max_length=255)
+    size = models.PositiveIntegerField() # Bytes, sent to clients so they can pick the smallest that fits
+
+    class Meta:
+        unique_together = ('blob', 'format', 'width')
+
+    def __str__(self):
+        return f"{self.blob.sha256[:12]} {self.width}w {self.format}"
+
+
 class QuestionImage(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to=question_image_path)
+    image = models.ImageField(upload_to=question_image_path, max_length=255) # Same file as blob.file once stored
     caption = models.CharField(max_length=255, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True) # sha256 of the file
+    blob = models.ForeignKey(ImageBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="question_images")
 
     def __str__(self):
         return f"Image for {self.question}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Blob as loaded, for the ref counting in signals.py
+        if 'blob_id' in instance.__dict__:
+            instance._loaded_blob = instance.blob_id
+        return instance
     
 
 
@@ -207,11 +271,53 @@ class StudentAnswer(models.Model):
     is_correct = models.BooleanField(default=False)
     points_earned = models.FloatField(default=0.0) # For manual grading/essays
 
+    # Client-side time of the change, used for last-write-wins when saves arrive out of order
+    answered_at = models.DateTimeField(null=True, blank=True)
+    # Server time of the last write; a relay node pushes what changed since its last push (relay.py)
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+
     class Meta:
         unique_together = ('user', 'question')
 
 
 
+# Queued re-marking of one question after its answer key, points or type changed
+class QuestionRegrade(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="regrades")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="regrades")
+
+    # Key/points/type before and after the edit that triggered this regrade
+    old_answer = models.TextField(blank=True, null=True)
+    new_answer = models.TextField(blank=True, null=True)
+    old_point = models.FloatField()
+    new_point = models.FloatField()
+    old_type = models.CharField(max_length=10)
+    new_type = models.CharField(max_length=10)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    answers_updated = models.PositiveIntegerField(default=0)
+    scores_adjusted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Second pass for answers graded with the old key while the first one ran (regrade.settle_regrade)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Regrade {self.question} ({self.status})"
+
+
 class ExamSession(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="exam_sessions")
@@ -231,6 +337,7 @@ class StudentScore(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="scores")
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="scores")
     score = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True) # See StudentAnswer.updated_at
 
     class Meta:
         unique_together = ('user', 'exam')
@@ -239,4 +346,93 @@ class StudentScore(models.Model):
         return f"{self.user.username} - {self.exam.course.name}: {self.score}"
 
 
+def job_file_path(instance, filename):
+    return f'jobs/{instance.school_id or "global"}/{timezone.now():%Y/%m}/{filename}'
+
+
+# Long admin operations (imports, exports, slip PDFs) run as jobs; see jobs.py
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    kind = models.CharField(max_length=50)
+    label = models.CharField(max_length=255)
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to=job_file_path, null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0) # Percent
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to=job_file_path, null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.label} ({self.status})"
+
+
+# Next free number per username prefix ("gha" -> gha1, gha2, ...); see usernames.py.
+# Keyed by prefix alone: usernames are global and two schools can share a prefix
+class UsernameSequence(models.Model):
+    prefix = models.CharField(max_length=50, unique=True)
+    school = models.ForeignKey(School, on_delete=models.SET_NULL, null=True, blank=True) # School that first used it
+    next_value = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.prefix}{self.next_value}"
+
+
+def exam_pack_path(instance, filename):
+    return f'exam_packs/{instance.exam.school_id or "global"}/{filename}'
+
+
+# Offline bundle of an exam (exam_packs.py), rebuilt when the exam's cache version changes
+class ExamPack(models.Model):
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name="pack")
+    version = models.CharField(max_length=64) # exam_cache version it was built from
+    file = models.FileField(upload_to=exam_pack_path, max_length=255)
+    sha256 = models.CharField(max_length=64)
+    signature = models.CharField(max_length=100) # Over the manifest, see exam_packs.sign
+    size = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Pack for {self.exam}"
+
+
+# An exam-centre relay allowed to pull its school's exams and push results (central side, relay.py)
+class RelayNode(models.Model):
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name="relay_nodes")
+    name = models.CharField(max_length=100)
+    key_hash = models.CharField(max_length=64, unique=True) # sha256 of the key; the key is shown once (create_relay_node)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_pull_at = models.DateTimeField(null=True, blank=True)
+    last_push_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.school})"
+
+
+# Relay side: one row recording how far this node has synced with the central server
+class RelaySyncState(models.Model):
+    pulled_at = models.DateTimeField(null=True, blank=True)
+    pushed_at = models.DateTimeField(null=True, blank=True)
+    push_watermark = models.DateTimeField(null=True, blank=True) # Latest updated_at already pushed
 
+    @classmethod
+    def load(cls):
+        return cls.objects.get_or_create(pk=1)[0]
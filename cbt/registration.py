@@ -0,0 +1,56 @@
+#registration.py
+"""
+Course registration in sets rather than per (student, course) get_or_create.
+
+The wanted pairs are built in memory, diffed against the existing (user, course) rows
+in one query, and the missing ones are bulk_created with ignore_conflicts (so a
+concurrent registration of the same pair is skipped instead of failing). A class of 400
+with 12 courses is 2-3 queries instead of ~4,800.
+"""
+from itertools import product
+
+from .models import Course, CourseRegistration, UserProfile
+
+
+BATCH_SIZE = 1000
+
+
+def register_pairs(pairs, school):
+    """Registers each (user_id, course_id) pair not already registered. Returns how many were new."""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    existing = set(CourseRegistration.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        course_id__in={course_id for _, course_id in pairs},
+    ).values_list("user_id", "course_id"))
+    missing = pairs - existing
+
+    CourseRegistration.objects.bulk_create([
+        CourseRegistration(user_id=user_id, course_id=course_id, school=school)
+        for user_id, course_id in missing
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(missing)
+
+
+def register(user_ids, course_ids, school):
+    """Every user for every course."""
+    return register_pairs(product(user_ids, course_ids), school)
+
+
+def register_classes(classes):
+    """Every student of each class for every course targeted at that class. Returns how many were new."""
+    classes = {student_class.id: student_class for student_class in classes}
+
+    courses_by_class = {}
+    for course_id, class_id in Course.objects.filter(target_class__in=classes).values_list("id", "target_class_id"):
+        courses_by_class.setdefault(class_id, []).append(course_id)
+
+    # Registrations carry the class's school, so group the pairs by school
+    pairs_by_school = {}
+    for user_id, class_id in UserProfile.objects.filter(student_class__in=classes).values_list("user_id", "student_class_id"):
+        school = classes[class_id].school
+        pairs_by_school.setdefault(school, []).extend((user_id, course_id) for course_id in courses_by_class.get(class_id, []))
+
+    return sum(register_pairs(pairs, school) for school, pairs in pairs_by_school.items())
@@ -0,0 +1,189 @@
+#regrade.py
+"""
+Incremental regrade when a question's answer key changes after candidates answered it.
+
+signals.py snapshots correct_answer / point / question_type before each Question save.
+If any of them changed and the question already has answers, queue_regrade() records a
+QuestionRegrade and runs it once the edit commits:
+
+  * StudentScore rows are adjusted by the point delta, grouped into the three
+    cases that matter (stays correct, loses the mark, gains the mark)
+  * is_correct is recomputed with one UPDATE ... CASE (answer_keys.regrade_question)
+
+Type changes (or fractional points, which the integer StudentScore can't take as an
+exact delta) fall back to a set-based rescore of only the candidates who answered.
+
+A save that fetched the answer key just before the edit can still write an is_correct
+from the old key after the regrade ran. REGRADE_SETTLE_SECONDS later, once no request
+can still hold the old key, settle_regrade() re-marks any such answers and rescores
+their candidates. `manage.py process_regrades` catches up on settles a restart lost.
+"""
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower, Trim
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .answer_keys import AUTO_GRADED_TYPES, normalize, regrade_question
+from .models import Question, QuestionRegrade, StudentAnswer, StudentScore
+from .scoring import score_exam
+
+
+def snapshot(question):
+    return (question.correct_answer, question.point, question.question_type)
+
+
+def key_changed(before, question):
+    old_answer, old_point, old_type = before
+    if old_type == 'essay' and question.question_type == 'essay':
+        return False # Essay marks are awarded by hand in grade_essays
+    return (
+        old_type != question.question_type
+        or old_point != question.point
+        or normalize(old_answer or "") != normalize(question.correct_answer or "")
+    )
+
+
+def queue_regrade(question, before):
+    if not StudentAnswer.objects.filter(question=question).exists():
+        return None
+
+    old_answer, old_point, old_type = before
+    regrade = QuestionRegrade.objects.create(
+        school_id=question.school_id,
+        exam_id=question.exam_id,
+        question=question,
+        old_answer=old_answer,
+        new_answer=question.correct_answer,
+        old_point=old_point,
+        new_point=question.point,
+        old_type=old_type,
+        new_type=question.question_type,
+    )
+    transaction.on_commit(lambda: process_regrade(regrade.id))
+    return regrade
+
+
+def _new_key_matches(question):
+    if question.correct_answer in (None, ""):
+        return Q(pk__in=[])
+    return Exact(Lower(Trim("answer_text")), normalize(question.correct_answer))
+
+
+def _apply_point_deltas(regrade, question):
+    answers = StudentAnswer.objects.filter(question=question)
+    matches = _new_key_matches(question)
+    groups = [
+        (answers.filter(matches, is_correct=True), regrade.new_point - regrade.old_point),
+        (answers.filter(~Q(matches), is_correct=True), -regrade.old_point),
+        (answers.filter(matches, is_correct=False), regrade.new_point),
+    ]
+
+    adjusted = 0
+    for group, delta in groups:
+        if delta:
+            adjusted += StudentScore.objects.filter(
+                exam_id=regrade.exam_id, user_id__in=group.values("user_id")
+            ).update(score=F("score") + int(delta))
+    return adjusted
+
+
+def process_regrade(regrade_id):
+    with transaction.atomic():
+        regrade = QuestionRegrade.objects.select_for_update().filter(id=regrade_id, status='pending').first()
+        if not regrade:
+            return None
+        regrade.status = 'running'
+        regrade.save(update_fields=['status'])
+
+    try:
+        with transaction.atomic():
+            question = Question.objects.select_related("exam").get(id=regrade.question_id)
+            simple = (
+                regrade.old_type == regrade.new_type
+                and regrade.new_type in AUTO_GRADED_TYPES
+                and float(regrade.old_point).is_integer()
+                and float(regrade.new_point).is_integer()
+            )
+
+            if simple:
+                # Deltas read the old is_correct values, so they must run before the UPDATE
+                regrade.scores_adjusted = _apply_point_deltas(regrade, question)
+                regrade.answers_updated = regrade_question(question)
+            else:
+                regrade.answers_updated = regrade_question(question)
+                user_ids = set(StudentAnswer.objects.filter(question=question).values_list("user_id", flat=True))
+                scored = set(
+                    StudentScore.objects.filter(exam_id=regrade.exam_id, user_id__in=user_ids)
+                    .values_list("user_id", flat=True)
+                )
+                # Only touch candidates who already have a score; the rest are scored on submit
+                score_exam(question.exam, scored)
+                regrade.scores_adjusted = len(scored)
+
+            regrade.status = 'done'
+            regrade.finished_at = timezone.now()
+            regrade.save()
+    except Exception:
+        # Recorded for the exam's regrade page; `manage.py process_regrades --retry-failed` reruns it
+        QuestionRegrade.objects.filter(id=regrade_id).update(
+            status='failed', error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        return None
+    schedule_settle(regrade.id)
+    return regrade
+
+
+def _settle_in_thread(regrade_id):
+    try:
+        settle_regrade(regrade_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_settle(regrade_id):
+    delay = getattr(settings, "REGRADE_SETTLE_SECONDS", 120)
+    if delay <= 0:
+        settle_regrade(regrade_id)
+    elif getattr(settings, "JOBS_EAGER", True):
+        timer = threading.Timer(delay, _settle_in_thread, [regrade_id])
+        timer.daemon = True
+        timer.start()
+    else:
+        from .tasks import settle_regrade_task
+        settle_regrade_task.apply_async((regrade_id,), countdown=delay)
+
+
+def settle_regrade(regrade_id):
+    """
+    Second pass of a finished regrade: re-marks answers whose is_correct disagrees with the
+    question's current key and rescores their candidates. Returns how many candidates that was.
+    """
+    with transaction.atomic():
+        regrade = (
+            QuestionRegrade.objects.select_for_update()
+            .filter(id=regrade_id, status='done', settled_at__isnull=True).first()
+        )
+        if not regrade:
+            return 0
+
+        question = Question.objects.select_related("exam").get(id=regrade.question_id)
+        user_ids = set()
+        if question.question_type in AUTO_GRADED_TYPES:
+            matches = _new_key_matches(question)
+            stale = StudentAnswer.objects.filter(question=question).filter(
+                Q(matches, is_correct=False) | Q(~Q(matches), is_correct=True)
+            )
+            user_ids = set(stale.values_list("user_id", flat=True))
+        if user_ids:
+            regrade_question(question)
+            scored = StudentScore.objects.filter(exam_id=regrade.exam_id, user_id__in=user_ids).values_list("user_id", flat=True)
+            score_exam(question.exam, set(scored))
+
+        regrade.settled_at = timezone.now()
+        regrade.save(update_fields=['settled_at'])
+    return len(user_ids)
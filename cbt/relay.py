@@ -0,0 +1,291 @@
+#relay.py
+"""
+Exam-centre relay: a local copy of this project on the hall's LAN that serves the candidate
+API (login through end session) from its own database, so exam-time traffic never reaches
+the central server.
+
+    central                                   relay (RELAY_UPSTREAM_URL + RELAY_KEY set)
+    GET  /api/relay/snapshot/  ------------>  pull(): the day's exams, questions, images,
+    GET  /api/relay/blob/<sha>/               classes, courses, registrations and students
+                                              (password hashes included, so logins work)
+    POST /api/relay/push/      <------------  push(): StudentAnswer/StudentScore rows changed
+                                              since the last push, gzipped, in batches
+
+Rows keep their central primary keys on the relay, so a pushed answer names the same user
+and question on both sides. Central applies pushed answers through answers.apply_answers
+(graded with its own key, last write wins by client time) and recomputes the pushed scores
+itself, so a push can be repeated safely. That is also why the push window overlaps the
+previous one by PUSH_OVERLAP.
+
+Questions and students are edited centrally; a pull overwrites the relay's copy. Start the
+relay from an empty database (migrate only): pulled rows take central's ids.
+Run `python manage.py relay_sync` on the relay (--loop to keep it running through the day),
+and `python manage.py create_relay_node` on central to issue its key.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import secrets
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .answers import apply_answers
+from .exam_cache import invalidate_exam
+from .image_store import recount, store_blobs
+from .image_variants import build_variants
+from .models import (
+    Course, CourseRegistration, Exam, ImageBlob, Question, QuestionImage, RelayNode, RelaySyncState,
+    School, StudentAnswer, StudentClass, StudentScore, UserProfile,
+)
+from .scoring import score_exam
+
+
+PUSH_BATCH = 5000
+PUSH_OVERLAP = datetime.timedelta(minutes=2) # Covers writes that committed after a later one was pushed
+TIMEOUT = 60
+
+USER_FIELDS = ["id", "username", "password", "first_name", "last_name", "email", "is_active", "date_joined"]
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _rows(queryset, fields=None):
+    return list(queryset.values(*(fields or _fields(queryset.model))))
+
+
+def encode(payload):
+    return gzip.compress(json.dumps(payload, cls=DjangoJSONEncoder).encode())
+
+
+def decode(body, encoding=None):
+    return json.loads(gzip.decompress(body) if encoding == "gzip" else body)
+
+
+# -------------------
+# Central side
+# -------------------
+def create_node(school, name):
+    """Returns (RelayNode, key). Only the key's hash is stored, so this is the one chance to copy it."""
+    key = secrets.token_urlsafe(32)
+    node = RelayNode.objects.create(school=school, name=name, key_hash=hashlib.sha256(key.encode()).hexdigest())
+    return node, key
+
+
+def authenticate_node(request):
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme != "Relay" or not key:
+        return None
+    return RelayNode.objects.select_related("school").filter(
+        key_hash=hashlib.sha256(key.encode()).hexdigest(), is_active=True
+    ).first()
+
+
+def snapshot(node, day, exam_ids=None):
+    """Everything a relay needs to run the node's school's exams on `day` (a date, central time)."""
+    exams = Exam.objects.filter(school=node.school, start_datetime__date=day)
+    if exam_ids:
+        exams = exams.filter(id__in=exam_ids)
+    courses = Course.objects.filter(id__in=exams.values("course_id"))
+    registrations = CourseRegistration.objects.filter(course__in=courses)
+    users = User.objects.filter(id__in=registrations.values("user_id"))
+    images = QuestionImage.objects.filter(question__exam__in=exams, blob__isnull=False)
+
+    node.last_pull_at = timezone.now()
+    node.save(update_fields=["last_pull_at"])
+    return {
+        "day": day.isoformat(),
+        "school": _rows(School.objects.filter(id=node.school_id)),
+        "classes": _rows(StudentClass.objects.filter(school=node.school)),
+        "courses": _rows(courses),
+        "exams": _rows(exams),
+        "questions": _rows(Question.objects.filter(exam__in=exams)),
+        # Blob ids differ per database; the relay maps them back by content hash
+        "images": _rows(images, ["id", "question_id", "caption", "content_hash", "image", "blob__sha256"]),
+        "users": _rows(users, USER_FIELDS),
+        "profiles": _rows(UserProfile.objects.filter(user__in=users)),
+        "registrations": _rows(registrations),
+    }
+
+
+def blob_for_node(node, sha):
+    return ImageBlob.objects.filter(sha256=sha, question_images__question__school=node.school).distinct().first()
+
+
+def apply_push(node, payload):
+    """Applies a relay's batch: {"answers": [...], "scores": [{"user_id", "exam_id"}]}. Returns counts."""
+    school_id = node.school_id
+    answers = payload.get("answers") or []
+    scores = payload.get("scores") or []
+
+    # A node only writes for its own school's candidates and questions
+    user_ids = set(UserProfile.objects.filter(
+        school_id=school_id, user_id__in={a.get("user_id") for a in answers} | {s.get("user_id") for s in scores},
+    ).values_list("user_id", flat=True))
+    question_ids = set(Question.objects.filter(
+        school_id=school_id, id__in={a.get("questionId") for a in answers},
+    ).values_list("id", flat=True))
+
+    result = apply_answers(
+        dict(a, school_id=school_id) for a in answers
+        if a.get("user_id") in user_ids and a.get("questionId") in question_ids
+    )
+
+    by_exam = {}
+    for row in scores:
+        if row.get("user_id") in user_ids:
+            by_exam.setdefault(row.get("exam_id"), set()).add(row["user_id"])
+    scored = 0
+    for exam in Exam.objects.filter(school_id=school_id, id__in=by_exam):
+        scored += len(score_exam(exam, by_exam[exam.id])) # Recomputed here from the answers, not trusted
+
+    node.last_push_at = timezone.now()
+    node.save(update_fields=["last_push_at"])
+    saved, stale = len(result["saved"]), len(result["stale"])
+    return {"saved": saved, "stale": stale, "rejected": len(answers) - saved - stale, "scored": scored}
+
+
+# -------------------
+# Relay side
+# -------------------
+def _upstream(method, path, payload=None, **kwargs):
+    base = getattr(settings, "RELAY_UPSTREAM_URL", "")
+    if not base:
+        raise RuntimeError("RELAY_UPSTREAM_URL is not set; this instance is not a relay.")
+    headers = {"Authorization": f"Relay {settings.RELAY_KEY}"}
+    if payload is not None:
+        headers.update({"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        kwargs["data"] = encode(payload)
+    response = requests.request(method, f"{base.rstrip('/')}{path}", headers=headers, timeout=TIMEOUT, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def _upsert(model, rows):
+    if rows:
+        fields = list(rows[0])
+        model.objects.bulk_create(
+            [model(**row) for row in rows],
+            update_conflicts=True, unique_fields=["id"], update_fields=[f for f in fields if f != "id"],
+        )
+
+
+def _normalized(rows):
+    return {row["id"]: json.loads(json.dumps(row, cls=DjangoJSONEncoder)) for row in rows}
+
+
+def _fetch_blobs(images):
+    have = set(ImageBlob.objects.filter(sha256__in={row["blob__sha256"] for row in images}).values_list("sha256", flat=True))
+    wanted = {row["blob__sha256"]: row["image"] for row in images if row["blob__sha256"] not in have}
+    fetched = []
+    for sha, name in wanted.items():
+        content = _upstream("GET", f"/api/relay/blob/{sha}/").content
+        fetched.append((sha, content, "." + name.rsplit(".", 1)[-1] if "." in name else ".png"))
+    return store_blobs(fetched), len(fetched)
+
+
+def pull(day=None, exam_ids=None):
+    """Replaces the relay's copy of the day's exams with central's. Returns counts."""
+    params = {"day": day.isoformat()} if day else {}
+    if exam_ids:
+        params["exam"] = exam_ids
+    data = _upstream("GET", "/api/relay/snapshot/", params=params).json()
+
+    # Images are files: fetch the ones this relay doesn't have before touching the database
+    _, fetched = _fetch_blobs(data["images"])
+    blob_ids = dict(ImageBlob.objects.filter(sha256__in={row["blob__sha256"] for row in data["images"]}).values_list("sha256", "id"))
+
+    exam_ids = [row["id"] for row in data["exams"]]
+    with transaction.atomic():
+        # Only exams whose content really changed lose their cached paper, answer key and pack
+        before = _normalized(_rows(Question.objects.filter(exam_id__in=exam_ids))), _normalized(_rows(Exam.objects.filter(id__in=exam_ids)))
+        for model, rows in (
+            (School, data["school"]), (StudentClass, data["classes"]), (Course, data["courses"]),
+            (Exam, data["exams"]), (Question, data["questions"]), (User, data["users"]),
+            (UserProfile, data["profiles"]), (CourseRegistration, data["registrations"]),
+        ):
+            _upsert(model, rows)
+        _upsert(QuestionImage, [
+            {"id": row["id"], "question_id": row["question_id"], "caption": row["caption"], "content_hash": row["content_hash"],
+             "image": row["image"], "blob_id": blob_ids[row["blob__sha256"]]}
+            for row in data["images"]
+        ])
+
+        # Whatever central deleted since the last pull
+        question_ids = [row["id"] for row in data["questions"]]
+        Question.objects.filter(exam_id__in=exam_ids).exclude(id__in=question_ids).delete()
+        QuestionImage.objects.filter(question_id__in=question_ids).exclude(id__in=[row["id"] for row in data["images"]]).delete()
+        CourseRegistration.objects.filter(course_id__in=[row["id"] for row in data["courses"]]).exclude(
+            id__in=[row["id"] for row in data["registrations"]]
+        ).delete()
+
+        # Rows came in with central's ids; move the sequences past them (Postgres; a no-op on SQLite)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [School, StudentClass, Course, Exam, Question, User, UserProfile, CourseRegistration, QuestionImage]):
+                cursor.execute(sql)
+
+        after = _normalized(data["questions"]), _normalized(data["exams"])
+        changed = {
+            row["exam_id"] for row in list(before[0].values()) + list(after[0].values())
+            if before[0].get(row["id"]) != after[0].get(row["id"])
+        } | {exam_id for exam_id in exam_ids if before[1].get(exam_id) != after[1].get(exam_id)}
+        for exam_id in changed:
+            transaction.on_commit(lambda exam_id=exam_id: invalidate_exam(exam_id))
+
+        state = RelaySyncState.load()
+        state.pulled_at = timezone.now()
+        state.save(update_fields=["pulled_at"])
+
+    recount() # QuestionImages were bulk_created, so refs are counted from the rows
+    build_variants(ImageBlob.objects.filter(question_images__question__exam_id__in=exam_ids).distinct())
+    return {"exams": len(exam_ids), "questions": len(data["questions"]), "students": len(data["users"]), "images_fetched": fetched, "changed": len(changed)}
+
+
+def push():
+    """Sends answers and scores changed since the last push. Returns counts from central."""
+    state = RelaySyncState.load()
+    started = timezone.now()
+    since = state.push_watermark - PUSH_OVERLAP if state.push_watermark else None
+
+    answers = StudentAnswer.objects.all()
+    scores = StudentScore.objects.all()
+    if since:
+        answers, scores = answers.filter(updated_at__gt=since), scores.filter(updated_at__gt=since)
+    watermark = max(filter(None, [
+        state.push_watermark,
+        answers.aggregate(latest=Max("updated_at"))["latest"],
+        scores.aggregate(latest=Max("updated_at"))["latest"],
+    ]), default=None)
+
+    totals = {"saved": 0, "stale": 0, "rejected": 0, "scored": 0}
+    batch = []
+    rows = answers.values_list("user_id", "question_id", "answer_text", "answered_at", "updated_at").iterator(chunk_size=PUSH_BATCH)
+    for user_id, question_id, answer_text, answered_at, updated_at in rows:
+        batch.append({"user_id": user_id, "questionId": question_id, "answer": answer_text, "client_ts": answered_at or updated_at})
+        if len(batch) >= PUSH_BATCH:
+            for key, n in _upstream("POST", "/api/relay/push/", {"answers": batch}).json().items():
+                totals[key] += n
+            batch = []
+
+    # Scores last, so central recomputes them with every answer above already in
+    score_rows = [{"user_id": user_id, "exam_id": exam_id} for user_id, exam_id in scores.values_list("user_id", "exam_id")]
+    if batch or score_rows:
+        for key, n in _upstream("POST", "/api/relay/push/", {"answers": batch, "scores": score_rows}).json().items():
+            totals[key] += n
+
+    state.push_watermark, state.pushed_at = watermark, started
+    state.save(update_fields=["push_watermark", "pushed_at"])
+    return totals
+
+
+def parse_day(value):
+    return datetime.date.fromisoformat(value) if value else timezone.localdate()
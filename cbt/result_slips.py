@@ -0,0 +1,154 @@
+#result_slips.py
+"""
+Result slips drawn straight onto a reportlab canvas (one A4 page per candidate),
+replacing the xhtml2pdf render of result_slips_pdf.html.
+
+The slips work from plain tuples (SlipHeader + rows from slip_rows()), not model
+instances, so the same drawing code runs in worker processes for the per-class split:
+each class's PDF is drawn in a process pool and the results are zipped.
+
+    write_slips(header, slip_rows(exam), fileobj)     # one PDF
+    write_class_zip(header, slip_rows(exam), fileobj) # one PDF per class, zipped
+
+Benchmark against the old path: python manage.py benchmark_slips <exam_id>
+"""
+import io
+import os
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils.text import slugify
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+from .hashing import init_django_worker
+from .models import StudentScore
+
+
+SlipHeader = namedtuple("SlipHeader", "school_name color academic_year course_name exam_title total_possible")
+SlipRow = namedtuple("SlipRow", "name username class_name score")
+
+
+def slip_header(exam):
+    total_possible = exam.questions.aggregate(total=Sum('point'))['total'] or 0
+    return SlipHeader(
+        exam.school.name, exam.school.color, exam.academic_year, exam.course.name, exam.title, total_possible,
+    )
+
+
+def slip_rows(exam):
+    scores = StudentScore.objects.filter(exam=exam).order_by(
+        'user__userprofile__student_class__name', 'user__last_name', 'user__first_name',
+    ).values_list(
+        'user__first_name', 'user__last_name', 'user__username',
+        'user__userprofile__student_class__name', 'user__userprofile__student_class__group', 'score',
+    )
+    for first, last, username, class_name, group, score in scores.iterator(chunk_size=2000):
+        yield SlipRow(
+            f"{first} {last}".strip(), username,
+            f"{class_name} {group or ''}".strip() if class_name else "N/A", score,
+        )
+
+
+def _school_color(value):
+    try:
+        return colors.HexColor(value)
+    except (TypeError, ValueError):
+        return colors.HexColor("#0D7313")
+
+
+def draw_slip(p, header, row):
+    width, height = A4
+    left, right, top = 1.5 * cm, width - 1.5 * cm, height - 1.5 * cm
+
+    # Border
+    p.setLineWidth(2)
+    p.setStrokeColor(colors.HexColor("#333333"))
+    p.rect(left, 12 * cm, right - left, top - 12 * cm)
+
+    # Header
+    p.setFillColor(_school_color(header.color))
+    p.setFont("Helvetica-Bold", 22)
+    p.drawCentredString(width / 2, top - 1.5 * cm, header.school_name.upper()[:45])
+    p.setFillColor(colors.black)
+    p.setFont("Helvetica", 12)
+    p.drawCentredString(width / 2, top - 2.3 * cm, "EXAMINATION RESULT SLIP")
+    p.drawCentredString(width / 2, top - 2.9 * cm, f"Academic Year: {header.academic_year}")
+    p.setLineWidth(0.5)
+    p.setStrokeColor(colors.HexColor("#cccccc"))
+    p.line(left + 0.5 * cm, top - 3.4 * cm, right - 0.5 * cm, top - 3.4 * cm)
+
+    # Student info
+    y = top - 4.6 * cm
+    for label, value in (
+        ("Name:", row.name), ("Student ID:", row.username),
+        ("Course:", header.course_name), ("Class:", row.class_name),
+    ):
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(left + 1 * cm, y, label)
+        p.setFont("Helvetica", 12)
+        p.drawString(left + 4 * cm, y, str(value))
+        y -= 0.8 * cm
+
+    # Score box
+    box_top = y - 0.6 * cm
+    p.setFillColor(colors.HexColor("#f0f0f0"))
+    p.roundRect(left + 1 * cm, box_top - 2.6 * cm, right - left - 2 * cm, 2.6 * cm, 10, stroke=0, fill=1)
+    p.setFillColor(colors.black)
+    p.setFont("Helvetica-Bold", 18)
+    p.drawCentredString(width / 2, box_top - 1.2 * cm, f"SCORE: {row.score} / {header.total_possible:g}")
+    percentage = (row.score / header.total_possible * 100) if header.total_possible > 0 else 0
+    p.setFont("Helvetica", 11)
+    p.drawCentredString(width / 2, box_top - 2 * cm, f"Percentage: {percentage:.1f}%")
+
+    # Signature
+    p.drawRightString(right - 1 * cm, 14 * cm, "_________________________")
+    p.drawRightString(right - 1 * cm, 13.3 * cm, "Exam Controller Signature")
+
+
+def write_slips(header, rows, fileobj):
+    """Draws one page per row into fileobj. Returns the page count."""
+    p = canvas.Canvas(fileobj, pagesize=A4, pageCompression=1)
+    p.setTitle(f"Results - {header.course_name} {header.exam_title}".strip())
+    pages = 0
+    for row in rows:
+        draw_slip(p, header, row)
+        p.showPage()
+        pages += 1
+    if not pages:
+        p.setFont("Helvetica", 12)
+        p.drawString(2 * cm, A4[1] - 2 * cm, "No results for this exam yet.")
+        p.showPage()
+    p.save()
+    return pages
+
+
+def _class_pdf(args):
+    header, class_name, rows = args
+    buffer = io.BytesIO()
+    write_slips(header, rows, buffer)
+    return class_name, buffer.getvalue()
+
+
+def write_class_zip(header, rows, fileobj, workers=None):
+    """One PDF per class, drawn in parallel worker processes, zipped into fileobj. Returns the class count."""
+    by_class = {}
+    for row in rows:
+        by_class.setdefault(row.class_name, []).append(row)
+    jobs = [(header, class_name, class_rows) for class_name, class_rows in sorted(by_class.items())]
+
+    workers = min(workers or getattr(settings, "SLIP_WORKERS", None) or os.cpu_count() or 1, len(jobs) or 1)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_django_worker) if workers > 1 else None
+    try:
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as archive: # PDFs are already compressed
+            for class_name, pdf in (pool.map if pool else map)(_class_pdf, jobs):
+                archive.writestr(f"{slugify(class_name) or 'class'}.pdf", pdf)
+    finally:
+        if pool:
+            pool.shutdown()
+    return len(jobs)
@@ -0,0 +1,70 @@
+#scoring.py
+"""
+Set-based scoring for an exam.
+
+A candidate's score is:
+    sum(question.point) over auto-graded questions answered correctly
+  + sum(points_earned)   over essay answers that have been manually graded
+
+compute_scores() works that out for every candidate of an exam with one GROUP BY
+query; save_scores() writes StudentScore with one bulk upsert.
+"""
+from django.db.models import Q, Sum
+
+from .models import StudentAnswer, StudentScore
+
+
+def compute_scores(exam_id, user_ids=None):
+    """
+    Returns {user_id: total_points}. When user_ids is given every one of them is
+    present in the result (0.0 if they answered nothing).
+    """
+    answers = StudentAnswer.objects.filter(question__exam_id=exam_id)
+    if user_ids is not None:
+        answers = answers.filter(user_id__in=user_ids)
+
+    totals = answers.values("user_id").annotate(
+        objective=Sum(
+            "question__point",
+            filter=Q(is_correct=True) & ~Q(question__question_type='essay'),
+        ),
+        essay=Sum(
+            "points_earned",
+            filter=Q(question__question_type='essay', is_graded=True),
+        ),
+    )
+
+    scores = {user_id: 0.0 for user_id in (user_ids or [])}
+    for row in totals:
+        scores[row["user_id"]] = (row["objective"] or 0.0) + (row["essay"] or 0.0)
+    return scores
+
+
+def save_scores(exam_id, school_id, scores, batch_size=1000):
+    StudentScore.objects.bulk_create(
+        [
+            StudentScore(school_id=school_id, user_id=user_id, exam_id=exam_id, score=int(total))
+            for user_id, total in scores.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "exam"],
+        update_fields=["score", "school", "updated_at"],
+        batch_size=batch_size,
+    )
+
+
+def score_exam(exam, user_ids=None):
+    """
+    Recomputes and stores StudentScore for an exam. Without user_ids this covers every
+    candidate who answered or already has a score row. Returns {user_id: total_points}.
+    """
+    if user_ids is None:
+        user_ids = set(
+            StudentAnswer.objects.filter(question__exam=exam).values_list("user_id", flat=True).distinct()
+        ) | set(
+            StudentScore.objects.filter(exam=exam).values_list("user_id", flat=True)
+        )
+
+    scores = compute_scores(exam.id, user_ids)
+    save_scores(exam.id, exam.school_id, scores)
+    return scores
@@ -70,9 +70,25 @@ class QuestionWithAnswerSerializer(serializers.ModelSerializer):
         ]
 
     def get_student_answer(self, obj):
+        # The paper endpoint passes every saved answer up front as {question_id: answer_text}
+        answers = self.context.get("answers")
+        if answers is not None:
+            return answers.get(obj.id)
+
         user = self.context.get("request").user
         ans = StudentAnswer.objects.filter(user=user, question=obj).first()
         return ans.answer_text if ans else None
 
     def get_images(self, obj):
-        return [{"image": img.image.url, "caption": img.caption} for img in obj.images.all()]
\ No newline at end of file
+        # srcset: resized WebP/JPEG copies (image_variants.py), smallest first; clients pick the first that fits
+        return [
+            {
+                "image": img.image.url,
+                "caption": img.caption,
+                "srcset": [
+                    {"url": v.file.url, "width": v.width, "height": v.height, "format": v.format, "bytes": v.size}
+                    for v in sorted(img.blob.variants.all(), key=lambda v: (v.width, v.size))
+                ] if img.blob_id else [],
+            }
+            for img in obj.images.all()
+        ]
\ No newline at end of file
@@ -1,9 +1,15 @@
 import os
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from .models import School, StudentAnswer, StudentScore, UserProfile, Exam, Question, CourseRegistration, StudentClass, Course
+from .models import School, StudentAnswer, StudentScore, UserProfile, Exam, Question, QuestionImage, CourseRegistration, StudentClass, Course
+from .exam_cache import invalidate_exam, invalidate_exams
+from .image_store import add_refs, ingest_upload, release_refs
+from .jobs import enqueue
+from .regrade import key_changed, queue_regrade, snapshot
+from .auth_context import invalidate_user
+from .subscriptions import invalidate_subscription, subscription_changed
 from django.utils.text import slugify
 
 
@@ -62,4 +68,123 @@ def delete_user_profile(sender, instance, **kwargs):
 def delete_school_icon(sender, instance, **kwargs):
     if instance.icon:
         if os.path.isfile(instance.icon.path):
-            os.remove(instance.icon.path)
\ No newline at end of file
+            os.remove(instance.icon.path)
+
+
+# --- Exam question cache invalidation ---
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def invalidate_exam_cache(sender, instance, **kwargs):
+    invalidate_exam(instance.id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_cache(sender, instance, **kwargs):
+    invalidate_exam(instance.exam_id)
+
+
+@receiver(post_save, sender=QuestionImage)
+@receiver(post_delete, sender=QuestionImage)
+def invalidate_question_image_cache(sender, instance, **kwargs):
+    exam_id = Question.objects.filter(id=instance.question_id).values_list('exam_id', flat=True).first()
+    if exam_id:
+        invalidate_exam(exam_id)
+
+
+# The cached ExamSerializer payload carries the school, course and class names
+@receiver(post_save, sender=School)
+def invalidate_school_exam_cache(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_exams(Exam.objects.filter(school=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+def invalidate_course_exam_cache(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_exams(Exam.objects.filter(course=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=StudentClass)
+def invalidate_class_exam_cache(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_exams(Exam.objects.filter(course__target_class=instance).values_list('id', flat=True))
+
+
+# --- Image blob store (image_store.py) ---
+@receiver(pre_save, sender=QuestionImage)
+def store_question_image(sender, instance, **kwargs):
+    instance._blob_before = None
+    if instance.pk:
+        if hasattr(instance, '_loaded_blob'):
+            instance._blob_before = instance._loaded_blob
+        else: # Built by hand with a pk, or blob was deferred
+            instance._blob_before = QuestionImage.objects.filter(pk=instance.pk).values_list('blob_id', flat=True).first()
+    # A new upload (admin inline): keep one copy per content instead of a file per question
+    if instance.image and not instance.image._committed:
+        ingest_upload(instance)
+
+
+@receiver(post_save, sender=QuestionImage)
+def count_question_image_ref(sender, instance, created, **kwargs):
+    if created:
+        add_refs([instance.blob_id])
+    elif getattr(instance, '_blob_before', None) != instance.blob_id:
+        add_refs([instance.blob_id])
+        release_refs([instance._blob_before])
+    instance._loaded_blob = instance.blob_id # A second save of this instance compares with what it just wrote
+
+
+@receiver(post_delete, sender=QuestionImage)
+def release_question_image_ref(sender, instance, **kwargs):
+    release_refs([instance.blob_id])
+
+
+# Resized WebP/JPEG copies (image_variants.py) are built in a job, not in the admin's request
+@receiver(post_save, sender=QuestionImage)
+def optimize_question_image(sender, instance, **kwargs):
+    if instance.blob_id and not instance.blob.optimized:
+        enqueue(
+            "optimize_images", label=f"Optimize image: {instance.question}",
+            school=instance.question.school, params={"blob_ids": [instance.blob_id]},
+        )
+
+
+# --- Regrade when an answer key changes after candidates have answered ---
+@receiver(pre_save, sender=Question)
+def remember_question_key(sender, instance, update_fields=None, **kwargs):
+    instance._key_before = None
+    if not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(Question.KEY_FIELDS):
+        return # e.g. save(update_fields=['question_text']): the key can't change
+    # Snapshot taken when the row was loaded (Question.from_db); only hand-built instances need a query
+    instance._key_before = getattr(instance, '_loaded_key', None) or (
+        Question.objects.filter(pk=instance.pk).values_list(*Question.KEY_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Question)
+def regrade_on_key_change(sender, instance, created, **kwargs):
+    before = getattr(instance, '_key_before', None)
+    if not created and before and key_changed(before, instance):
+        queue_regrade(instance, before)
+    instance._loaded_key = snapshot(instance) # A second save of this instance compares with what it just wrote
+
+
+# --- Cached auth context invalidation ---
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_auth_context(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+# --- Subscription status cache invalidation ---
+@receiver(subscription_changed)
+def invalidate_subscription_status(sender, school_id, **kwargs):
+    invalidate_subscription(school_id)
+
+
+@receiver(post_delete, sender=School)
+def invalidate_deleted_school_subscription(sender, instance, **kwargs):
+    invalidate_subscription(instance.id)
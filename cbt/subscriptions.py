@@ -0,0 +1,62 @@
+#subscriptions.py
+"""
+Per-school subscription status cache.
+
+Holds (is_active, subscription_end) per school for SUBSCRIPTION_CACHE_TTL seconds.
+Expiry is checked against the cached subscription_end at request time, so an entry
+never needs to be dropped just because a subscription ran out.
+
+Anything that changes a subscription sends `subscription_changed`
+(paystack_webhook, StartSubscriptionView.activate_subscription, SchoolAdmin saves);
+the receiver in signals.py drops the cached entry.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import School
+
+
+TTL = getattr(settings, "SUBSCRIPTION_CACHE_TTL", 300)
+
+# Sent with school_id=<id> whenever a school's subscription fields change
+subscription_changed = Signal()
+
+
+class SubscriptionStatus(namedtuple("SubscriptionStatus", "is_active subscription_end")):
+    __slots__ = ()
+
+    def is_subscription_active(self):
+        # Same rule as School.is_subscription_active()
+        if not self.subscription_end:
+            return False
+        return timezone.now() <= self.subscription_end
+
+
+def _key(school_id):
+    return f"cbt:subscription:{school_id}"
+
+
+def get_subscription_status(school_id):
+    status = cache.get(_key(school_id))
+    if status is None:
+        row = School.objects.filter(id=school_id).values_list("is_active", "subscription_end").first()
+        status = SubscriptionStatus(*(row or (False, None)))
+        cache.set(_key(school_id), status, TTL)
+    return status
+
+
+async def aget_subscription_status(school_id):
+    status = await cache.aget(_key(school_id))
+    if status is None:
+        row = await School.objects.filter(id=school_id).values_list("is_active", "subscription_end").afirst()
+        status = SubscriptionStatus(*(row or (False, None)))
+        await cache.aset(_key(school_id), status, TTL)
+    return status
+
+
+def invalidate_subscription(school_id):
+    cache.delete(_key(school_id))
@@ -0,0 +1,14 @@
+from celery import shared_task
+from .jobs import run_job
+from .regrade import settle_regrade
+
+
+# Jobs carry their own status/error reporting, so no Celery retries here
+@shared_task(name="cbt.run_job", ignore_result=True)
+def run_job_task(job_id):
+    run_job(job_id)
+
+
+@shared_task(name="cbt.settle_regrade", ignore_result=True)
+def settle_regrade_task(regrade_id):
+    settle_regrade(regrade_id)
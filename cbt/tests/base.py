@@ -0,0 +1,101 @@
+#base.py
+"""
+Shared fixtures for the cbt tests: one school with a class, a course, an exam (open now)
+and a few registered students, plus a JWT client per student.
+
+Every test starts with an empty cache (exam ids are reused between tests, so a cached
+paper from one test would otherwise leak into the next) and a throwaway MEDIA_ROOT.
+CBTTransactionTestCase is the same for code that reaches the database from other
+threads (the async views' thread pool), which can't see TestCase's open transaction.
+"""
+import shutil
+import tempfile
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cbt.models import Course, CourseRegistration, Exam, Question, School, StudentClass, UserProfile
+
+
+PASSWORD = "pass1234"
+
+# (type, correct answer) for question 1, 2, ... in turn
+QUESTION_KINDS = [("obj", "A"), ("tf", "T"), ("fitg", "Lagos"), ("essay", None)]
+
+
+class CBTFixtures:
+    n_students = 2
+    n_questions = 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._media_root = tempfile.mkdtemp()
+        # Second passes of regrades run inline instead of on a timer thread
+        cls._settings = override_settings(MEDIA_ROOT=cls._media_root, REGRADE_SETTLE_SECONDS=0)
+        cls._settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._settings.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.school = School.objects.create(
+            name="Great Heights Academy", email="info@gha.test", is_active=True,
+            subscription_end=timezone.now() + timezone.timedelta(days=30),
+        )
+        self.student_class = StudentClass.objects.create(school=self.school, name="JSS 3")
+        self.course = Course.objects.create(school=self.school, name="Mathematics", target_class=self.student_class)
+        self.exam = self.make_exam()
+        self.questions = self.make_questions(self.exam, self.n_questions)
+        self.students = [self.make_student(i) for i in range(1, self.n_students + 1)]
+
+    def make_exam(self, minutes_ago=5, duration=60, **fields):
+        fields = {
+            "school": self.school, "course": self.course, "title": "First Term", "total_questions": self.n_questions,
+            "duration_minutes": duration, "start_datetime": timezone.now() - timezone.timedelta(minutes=minutes_ago),
+            **fields,
+        }
+        return Exam.objects.create(**fields)
+
+    def make_questions(self, exam, count):
+        questions = []
+        for number in range(1, count + 1):
+            q_type, correct = QUESTION_KINDS[(number - 1) % len(QUESTION_KINDS)]
+            questions.append(Question.objects.create(
+                school=self.school, exam=exam, question_number=number, question_type=q_type,
+                question_text=f"Question {number}", option_a="a", option_b="b", option_c="c", option_d="d",
+                correct_answer=correct, point=2.0,
+            ))
+        return questions
+
+    def make_student(self, number):
+        user = User.objects.create(username=f"gha{number}", password=make_password(PASSWORD), first_name=f"Student{number}")
+        UserProfile.objects.create(user=user, school=self.school, role="student", student_class=self.student_class)
+        CourseRegistration.objects.create(user=user, course=self.course, school=self.school)
+        return user
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def school_admin(self):
+        # Created by the School post_save signal
+        return User.objects.get(username="great-heights-academy_admin")
+
+
+class CBTTestCase(CBTFixtures, TestCase):
+    pass
+
+
+class CBTTransactionTestCase(CBTFixtures, TransactionTestCase):
+    pass
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from cbt import answer_journal
+from cbt.answer_journal import SQLiteJournal, append_answers, flush_journal
+from cbt.models import ExamSession, StudentAnswer, StudentScore
+
+from .base import CBTTestCase
+
+
+@override_settings(ANSWER_WRITE_MODE="journal")
+class AnswerJournalTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        patcher = mock.patch.object(answer_journal, "_journal", SQLiteJournal(self.path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(os.remove, self.path)
+
+    def test_saves_are_queued_until_flushed(self):
+        student = self.students[0]
+        response = self.client_for(student).post("/api/answers/batch/", {"answers": [
+            {"questionId": self.questions[0].id, "answer": "A", "client_ts": 1000},
+        ]}, format="json")
+
+        self.assertEqual(response.json(), {"status": "saved", "queued": 1})
+        self.assertFalse(StudentAnswer.objects.exists())
+
+        call_command("flush_answer_journal", stdout=open(os.devnull, "w"))
+        self.assertTrue(StudentAnswer.objects.get(user=student, question=self.questions[0]).is_correct)
+
+    def test_flush_keeps_the_latest_answer(self):
+        student, question = self.students[0], self.questions[0]
+        append_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "A", "client_ts": 3000}])
+        append_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "B", "client_ts": 2000}])
+
+        self.assertEqual(flush_journal(), 2)
+        self.assertEqual(StudentAnswer.objects.get(user=student, question=question).answer_text, "A")
+        self.assertEqual(flush_journal(), 0)
+
+    def test_per_user_flush_leaves_others_queued(self):
+        first = self.students[0]
+        for student in self.students:
+            append_answers(student.id, self.school.id, [{"questionId": self.questions[0].id, "answer": "A"}])
+
+        flush_journal(user_id=first.id)
+        self.assertEqual(list(StudentAnswer.objects.values_list("user_id", flat=True)), [first.id])
+
+    def test_ending_the_exam_flushes_before_scoring(self):
+        student = self.students[0]
+        client = self.client_for(student)
+        client.post(f"/api/exam/{self.exam.id}/start/")
+        client.post("/api/answers/batch/", {"answers": [
+            {"questionId": self.questions[0].id, "answer": "A"},
+            {"questionId": self.questions[1].id, "answer": "T"},
+        ]}, format="json")
+
+        response = client.post(f"/api/exam/{self.exam.id}/end/")
+
+        self.assertEqual(response.json(), {"score": 4.0})
+        self.assertEqual(StudentScore.objects.get(user=student, exam=self.exam).score, 4)
+        self.assertFalse(ExamSession.objects.filter(user=student).exists())
@@ -0,0 +1,74 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cbt.answer_keys import compile_answer_key, is_correct, lookup, regrade_exam
+from cbt.models import Question, QuestionRegrade, StudentAnswer, StudentScore
+from cbt.regrade import settle_regrade
+
+from .base import CBTTestCase
+
+
+class AnswerKeyTests(CBTTestCase):
+    def test_compiled_key_is_normalized(self):
+        answer_key = compile_answer_key(self.exam.id)
+        obj, tf, fitg, essay = self.questions
+
+        self.assertEqual(answer_key[fitg.id].key, "lagos")
+        self.assertIsNone(answer_key[essay.id].key)
+        self.assertTrue(is_correct(answer_key[fitg.id], " LAGOS"))
+        self.assertFalse(is_correct(answer_key[essay.id], "anything"))
+
+    def test_warm_lookup_needs_no_queries(self):
+        ids = [q.id for q in self.questions]
+        lookup(ids)
+        with CaptureQueriesContext(connection) as queries:
+            entries = lookup(ids)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(set(entries), set(ids))
+
+    def test_unknown_ids_are_left_out(self):
+        self.assertEqual(set(lookup([self.questions[0].id, 999999])), {self.questions[0].id})
+
+    def test_key_edit_is_seen_by_the_next_lookup(self):
+        question = self.questions[0]
+        lookup([question.id])
+
+        question.correct_answer = "C"
+        question.save()
+
+        self.assertEqual(lookup([question.id])[question.id].key, "c")
+
+    def test_regrade_exam(self):
+        student = self.students[0]
+        question = self.questions[0]
+        StudentAnswer.objects.create(school=self.school, user=student, question=question, answer_text="C", is_correct=False)
+        Question.objects.filter(id=question.id).update(correct_answer="C") # Bypasses the regrade signal
+
+        self.assertEqual(regrade_exam(self.exam), 1)
+        self.assertEqual(StudentScore.objects.get(user=student, exam=self.exam).score, 2)
+
+
+class SettleRegradeTests(CBTTestCase):
+    def test_answers_marked_with_the_old_key_are_fixed(self):
+        first, second = self.students
+        question = self.questions[0]
+        Question.objects.filter(id=question.id).update(correct_answer="B")
+        # Saves that still held the old key "A" after the first pass
+        StudentAnswer.objects.create(school=self.school, user=first, question=question, answer_text="A", is_correct=True)
+        StudentAnswer.objects.create(school=self.school, user=second, question=question, answer_text="B", is_correct=False)
+        for student, score in ((first, 2), (second, 0)):
+            StudentScore.objects.create(school=self.school, user=student, exam=self.exam, score=score)
+        regrade = QuestionRegrade.objects.create(
+            school=self.school, exam=self.exam, question=question, old_answer="A", new_answer="B",
+            old_point=2.0, new_point=2.0, old_type="obj", new_type="obj", status="done",
+        )
+
+        self.assertEqual(settle_regrade(regrade.id), 2)
+        self.assertEqual(
+            dict(StudentScore.objects.filter(exam=self.exam).values_list("user_id", "score")),
+            {first.id: 0, second.id: 2},
+        )
+
+        regrade.refresh_from_db()
+        self.assertIsNotNone(regrade.settled_at)
+        self.assertEqual(settle_regrade(regrade.id), 0) # Only settles once
@@ -0,0 +1,100 @@
+from cbt.answers import apply_answers, parse_client_ts, save_answers
+from cbt.models import School, StudentAnswer
+
+from .base import CBTTestCase
+
+
+class SaveAnswersTests(CBTTestCase):
+    def answer(self, user, question):
+        return StudentAnswer.objects.get(user=user, question=question)
+
+    def test_grades_against_the_key(self):
+        student = self.students[0]
+        obj, tf, fitg, essay = self.questions
+        result = save_answers(student.id, self.school.id, [
+            {"questionId": obj.id, "answer": "a"},
+            {"questionId": tf.id, "answer": "F"},
+            {"questionId": fitg.id, "answer": "  lagos "},
+            {"questionId": essay.id, "answer": "Because..."},
+        ])
+
+        self.assertEqual(
+            {item["questionId"]: item["is_correct"] for item in result["saved"]},
+            {obj.id: True, tf.id: False, fitg.id: True, essay.id: False},
+        )
+        self.assertFalse(self.answer(student, essay).is_graded)
+
+    def test_last_write_wins_by_client_timestamp(self):
+        student, question = self.students[0], self.questions[0]
+        save_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "B", "client_ts": 2000}])
+
+        # Arrives later but was made earlier (a retried request): ignored
+        result = save_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "A", "client_ts": 1000}])
+        self.assertEqual(result["stale"], [question.id])
+        self.assertEqual(self.answer(student, question).answer_text, "B")
+
+        result = save_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "C", "client_ts": 3000}])
+        self.assertEqual(result["stale"], [])
+        self.assertEqual(self.answer(student, question).answer_text, "C")
+
+    def test_equal_timestamp_replaces(self):
+        student, question = self.students[0], self.questions[0]
+        save_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "B", "client_ts": 2000}])
+        save_answers(student.id, self.school.id, [{"questionId": question.id, "answer": "A", "client_ts": 2000}])
+        self.assertEqual(self.answer(student, question).answer_text, "A")
+
+    def test_batch_coalesces_per_question(self):
+        student, question = self.students[0], self.questions[0]
+        result = save_answers(student.id, self.school.id, [
+            {"questionId": question.id, "answer": "C", "client_ts": 3000},
+            {"questionId": question.id, "answer": "A", "client_ts": 1000},
+            {"questionId": question.id, "answer": "B", "client_ts": 2000},
+        ])
+        self.assertEqual(len(result["saved"]), 1)
+        self.assertEqual(self.answer(student, question).answer_text, "C")
+
+    def test_many_candidates_in_one_call(self):
+        question = self.questions[1]
+        result = apply_answers([
+            {"user_id": student.id, "school_id": self.school.id, "questionId": question.id, "answer": "T", "client_ts": 1000}
+            for student in self.students
+        ])
+        self.assertEqual(len(result["saved"]), len(self.students))
+        self.assertEqual(StudentAnswer.objects.filter(question=question, is_correct=True).count(), len(self.students))
+
+    def test_unknown_and_foreign_questions_are_invalid(self):
+        other_school = School.objects.create(name="Other College", email="o@x.test")
+        result = save_answers(self.students[0].id, other_school.id, [
+            {"questionId": self.questions[0].id, "answer": "A"},
+            {"questionId": 999999, "answer": "A"},
+            {"questionId": "abc", "answer": "A"},
+        ])
+        self.assertEqual(sorted(map(str, result["invalid"])), sorted(map(str, [self.questions[0].id, 999999, "abc"])))
+        self.assertFalse(StudentAnswer.objects.exists())
+
+    def test_parse_client_ts(self):
+        self.assertEqual(parse_client_ts(1000).timestamp(), 1.0)
+        self.assertEqual(parse_client_ts("2026-01-01T00:00:00Z").year, 2026)
+        self.assertIsNotNone(parse_client_ts("not a date")) # Falls back to server time
+
+
+class AnswerEndpointTests(CBTTestCase):
+    def test_single_save(self):
+        client = self.client_for(self.students[0])
+        response = client.post("/api/answer/", {"questionId": self.questions[0].id, "selectedOption": "A"}, format="json")
+        self.assertEqual(response.json(), {"status": "saved", "is_correct": True})
+
+        response = client.post("/api/answer/", {"questionId": 999999, "selectedOption": "A"}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_save(self):
+        client = self.client_for(self.students[0])
+        response = client.post("/api/answers/batch/", {"answers": [
+            {"questionId": self.questions[0].id, "answer": "A", "client_ts": 1000},
+            {"questionId": self.questions[1].id, "answer": "T", "client_ts": 1000},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["saved"]), 2)
+
+        response = client.post("/api/answers/batch/", {"answers": "nope"}, format="json")
+        self.assertEqual(response.status_code, 400)
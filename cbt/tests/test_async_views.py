@@ -0,0 +1,64 @@
+import json
+
+from django.test import AsyncRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cbt import async_views
+from cbt.models import ExamSession, StudentAnswer
+from cbt.views import ExamPaperView
+
+from .base import CBTTransactionTestCase
+
+
+class AsyncCandidateViewTests(CBTTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.students[0]
+        self.factory = AsyncRequestFactory()
+        self.headers = {"Authorization": f"Bearer {RefreshToken.for_user(self.student).access_token}"}
+
+    def get(self):
+        return self.factory.get("/", headers=self.headers)
+
+    def post(self, data=None, body=None):
+        return self.factory.post("/", body or json.dumps(data or {}), content_type="application/json", headers=self.headers)
+
+    async def test_requests_without_a_token_are_refused(self):
+        request = self.factory.get("/")
+        response = await async_views.remaining_time(request, self.exam.id)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_start_save_and_fetch(self):
+        response = await async_views.start_exam_session(self.post(), self.exam.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(await ExamSession.objects.filter(user=self.student, exam=self.exam).aexists())
+
+        response = await async_views.save_answer(self.post({"questionId": self.questions[0].id, "selectedOption": "A"}))
+        self.assertEqual(json.loads(response.content), {"status": "saved", "is_correct": True})
+        self.assertTrue(await StudentAnswer.objects.filter(user=self.student, is_correct=True).aexists())
+
+        response = await async_views.question_by_index(self.get(), self.exam.id, 0)
+        question = json.loads(response.content)
+        self.assertEqual(question["student_answer"], "A")
+        self.assertNotIn("correct_answer", question)
+
+        response = await async_views.remaining_time(self.get(), self.exam.id)
+        self.assertGreater(json.loads(response.content)["remaining_time"], 0)
+
+    async def test_unknown_question_and_bad_body(self):
+        response = await async_views.save_answer(self.post({"questionId": 999999, "selectedOption": "A"}))
+        self.assertEqual(response.status_code, 404)
+
+        response = await async_views.save_answer(self.post(body="not json"))
+        self.assertEqual(response.status_code, 400)
+
+        response = await async_views.question_by_index(self.get(), self.exam.id, 99)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_offloaded_view_runs_and_renders_in_the_pool(self):
+        view = async_views.offload(ExamPaperView.as_view())
+        self.assertTrue(view.csrf_exempt)
+
+        response = await view(self.get(), exam_id=self.exam.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["questions"]), self.n_questions)
@@ -0,0 +1,38 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cbt.auth_context import build_auth_context
+
+from .base import CBTTestCase
+
+
+class AuthContextTests(CBTTestCase):
+    def test_second_lookup_needs_no_queries(self):
+        student = self.students[0]
+        build_auth_context(student.id)
+        with CaptureQueriesContext(connection) as queries:
+            context = build_auth_context(student.id)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual((context.school_id, context.role, context.class_id), (self.school.id, "student", self.student_class.id))
+        self.assertTrue(context.is_subscription_active())
+
+    def test_profile_change_invalidates(self):
+        student = self.students[0]
+        build_auth_context(student.id)
+
+        profile = student.userprofile
+        profile.role = "teacher"
+        profile.save()
+
+        self.assertEqual(build_auth_context(student.id).role, "teacher")
+
+    def test_user_without_profile(self):
+        self.assertEqual(build_auth_context(999999).school_id, None)
+
+    def test_api_requests_reuse_the_context(self):
+        client = self.client_for(self.students[0])
+        client.get("/api/subjects/")
+        with CaptureQueriesContext(connection) as queries:
+            client.get("/api/subjects/")
+        self.assertFalse(any("cbt_userprofile" in query["sql"] for query in queries))
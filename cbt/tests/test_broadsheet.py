@@ -0,0 +1,53 @@
+import io
+
+from openpyxl import load_workbook
+
+from cbt.broadsheet import score_matrix, select_exams, stream_broadsheet
+from cbt.models import StudentClass, StudentScore, UserProfile
+
+from .base import CBTTestCase
+
+
+class BroadsheetTests(CBTTestCase):
+    n_students = 3
+
+    def setUp(self):
+        super().setUp()
+        self.second_exam = self.make_exam(title="Second Term")
+        self.ss1 = StudentClass.objects.create(school=self.school, name="SS 1")
+        UserProfile.objects.filter(user=self.students[2]).update(student_class=self.ss1)
+
+        first, second, third = self.students
+        for student, exam, score in (
+            (first, self.exam, 6), (first, self.second_exam, 4),
+            (second, self.exam, 8), (second, self.second_exam, 2),
+            (third, self.exam, 3),
+        ):
+            StudentScore.objects.create(school=self.school, user=student, exam=exam, score=score)
+
+    def test_matrix_turns_exams_into_columns(self):
+        exams = list(select_exams(school=self.school))
+        matrix = {row["user__username"]: row for row in score_matrix(exams)}
+
+        self.assertEqual(
+            (matrix["gha1"][f"exam_{self.exam.id}"], matrix["gha1"][f"exam_{self.second_exam.id}"], matrix["gha1"]["total"]),
+            (6, 4, 10),
+        )
+        self.assertIsNone(matrix["gha3"][f"exam_{self.second_exam.id}"])
+        self.assertEqual(matrix["gha3"]["sat"], 1)
+
+        # gha1 and gha2 tie on 10
+        self.assertEqual({name: row["position"] for name, row in matrix.items()}, {"gha1": 1, "gha2": 1, "gha3": 3})
+        self.assertEqual(matrix["gha3"]["class_position"], 1)
+
+    def test_class_filter(self):
+        matrix = score_matrix(list(select_exams(school=self.school)), student_class=self.ss1)
+        self.assertEqual([row["user__username"] for row in matrix], ["gha3"])
+
+    def test_workbook_has_a_sheet_per_class_and_a_summary(self):
+        exams = select_exams(school=self.school)
+        book = load_workbook(io.BytesIO(b"".join(stream_broadsheet(exams))), read_only=True)
+
+        self.assertEqual(book.sheetnames, ["Broadsheet", "JSS 3", "SS 1", "Exam Summary"])
+        summary = list(book["Exam Summary"].iter_rows(values_only=True))
+        self.assertEqual(summary[1][2:7], (8, 3, 8, 3, 5.67))
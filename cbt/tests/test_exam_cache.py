@@ -0,0 +1,96 @@
+import os
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from cbt.checks import shared_cache_check
+from cbt.exam_cache import get_exam_bundle, get_exam_version, invalidate_exam
+from cbt.models import QuestionImage
+
+from .base import CBTTestCase
+
+
+class ExamCacheTests(CBTTestCase):
+    def test_warm_bundle_needs_no_queries(self):
+        get_exam_bundle(self.exam.id)
+        with CaptureQueriesContext(connection) as queries:
+            bundle = get_exam_bundle(self.exam.id)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(bundle["questions"]), self.n_questions)
+
+    def test_question_edit_invalidates(self):
+        version = get_exam_version(self.exam.id)
+        get_exam_bundle(self.exam.id)
+
+        question = self.questions[0]
+        question.question_text = "What is 2 + 2?"
+        question.save()
+
+        self.assertNotEqual(get_exam_version(self.exam.id), version)
+        self.assertEqual(get_exam_bundle(self.exam.id)["questions"][0]["question_text"], "What is 2 + 2?")
+
+    def test_exam_edit_and_question_delete_invalidate(self):
+        get_exam_bundle(self.exam.id)
+        self.exam.title = "Mock"
+        self.exam.save()
+        self.assertEqual(get_exam_bundle(self.exam.id)["exam"]["title"], "Mock")
+
+        self.questions[-1].delete()
+        self.assertEqual(len(get_exam_bundle(self.exam.id)["questions"]), self.n_questions - 1)
+
+    def test_image_delete_invalidates(self):
+        image = QuestionImage.objects.create(question=self.questions[0], image="question_images/x.png")
+        version = get_exam_version(self.exam.id)
+        image.delete()
+        self.assertNotEqual(get_exam_version(self.exam.id), version)
+
+    def test_school_course_and_class_edits_invalidate(self):
+        get_exam_bundle(self.exam.id)
+        self.school.color = "#123456"
+        self.school.save()
+        self.assertEqual(get_exam_bundle(self.exam.id)["exam"]["school"]["color"], "#123456")
+
+        self.course.name = "Further Mathematics"
+        self.course.save()
+        self.assertEqual(get_exam_bundle(self.exam.id)["exam"]["course_name"], "Further Mathematics")
+
+        self.student_class.name = "SS 1"
+        self.student_class.save()
+        self.assertEqual(get_exam_bundle(self.exam.id)["exam"]["class_name"], "SS 1")
+
+    def test_invalidate_is_per_exam(self):
+        other = self.make_exam()
+        version = get_exam_version(other.id)
+        invalidate_exam(self.exam.id)
+        self.assertEqual(get_exam_version(other.id), version)
+
+    def test_missing_exam(self):
+        self.assertIsNone(get_exam_bundle(999999))
+
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+REDIS = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379"}}
+
+
+class SharedCacheCheckTests(CBTTestCase):
+    def errors(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return [error.id for error in shared_cache_check(None)]
+
+    @override_settings(CACHES=LOCMEM, JOBS_EAGER=True)
+    def test_locmem_with_one_worker_is_fine(self):
+        self.assertEqual(self.errors(WEB_CONCURRENCY="1"), [])
+
+    @override_settings(CACHES=LOCMEM, JOBS_EAGER=True)
+    def test_locmem_with_several_workers_fails(self):
+        self.assertEqual(self.errors(WEB_CONCURRENCY="4"), ["cbt.E001"])
+
+    @override_settings(CACHES=LOCMEM, JOBS_EAGER=False)
+    def test_locmem_with_a_celery_worker_fails(self):
+        self.assertEqual(self.errors(WEB_CONCURRENCY="1"), ["cbt.E002"])
+
+    @override_settings(CACHES=REDIS, JOBS_EAGER=False)
+    def test_shared_cache_passes(self):
+        self.assertEqual(self.errors(WEB_CONCURRENCY="4"), [])
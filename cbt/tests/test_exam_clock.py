@@ -0,0 +1,111 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.utils import timezone
+
+from cbt import exam_clock
+from cbt.exam_clock import clock_events, extend_time, force_submit
+from cbt.models import ExamSession, StudentAnswer, StudentScore
+
+from .base import CBTTestCase
+
+
+def event_name(message):
+    return message.split("event: ", 1)[1].split("\n", 1)[0]
+
+
+async def take(events, after, count):
+    """Names of the first `count` events, calling after() once the first one is sent."""
+    received = [event_name(await events.__anext__())]
+    await sync_to_async(after)()
+    async for message in events:
+        received.append(event_name(message))
+        if len(received) == count:
+            break
+    await events.aclose()
+    return received
+
+
+class ExamClockTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.end_time = now + timezone.timedelta(minutes=30)
+        self.sessions = [
+            ExamSession.objects.create(school=self.school, user=student, exam=self.exam, start_time=now, end_time=self.end_time)
+            for student in self.students
+        ]
+        for name, value in (("POLL", 0), ("RESYNC", 3600)):
+            patcher = mock.patch.object(exam_clock, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stream(self, student, after, count=2):
+        events = clock_events(student.id, self.exam.id, self.school.id, self.end_time)
+        return async_to_sync(take)(events, after, count)
+
+    def test_extend_time_for_everyone(self):
+        self.assertEqual(extend_time(self.exam, 10), 2)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.duration_minutes, 70)
+        self.assertEqual(ExamSession.objects.filter(end_time=self.end_time + timezone.timedelta(minutes=10)).count(), 2)
+
+    def test_extend_time_for_one_candidate(self):
+        first, second = self.students
+        self.assertEqual(extend_time(self.exam, 10, [first.id]), 1)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.duration_minutes, 60)
+        self.assertEqual(ExamSession.objects.get(user=second).end_time, self.end_time)
+
+    def test_extend_time_leaves_ended_sessions_closed(self):
+        first, second = self.students
+        force_submit(self.exam, [first.id])
+        ExamSession.objects.filter(user=second).update(end_time=timezone.now() - timezone.timedelta(minutes=1))
+
+        self.assertEqual(extend_time(self.exam, 10), 0)
+        self.assertFalse(ExamSession.objects.filter(user=first).exists())
+        self.assertLess(ExamSession.objects.get(user=second).end_time, timezone.now())
+
+    def test_force_submit_scores_offline_candidates(self):
+        first, second = self.students
+        StudentAnswer.objects.create(school=self.school, user=first, question=self.questions[0], answer_text="A", is_correct=True)
+
+        self.assertEqual(force_submit(self.exam, [first.id]), 1)
+        self.assertEqual(StudentScore.objects.get(user=first, exam=self.exam).score, 2)
+        self.assertFalse(StudentScore.objects.filter(user=second).exists())
+        self.assertEqual(force_submit(self.exam, [first.id]), 0) # Already ended
+
+    def test_force_submitted_candidate_cannot_end_again(self):
+        first = self.students[0]
+        force_submit(self.exam, [first.id])
+        self.assertFalse(ExamSession.objects.filter(user=first).exists())
+
+        StudentAnswer.objects.create(school=self.school, user=first, question=self.questions[0], answer_text="A", is_correct=True)
+        response = self.client_for(first).post(f"/api/exam/{self.exam.id}/end/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(StudentScore.objects.get(user=first, exam=self.exam).score, 0)
+
+    def test_stream_announces_an_extension(self):
+        events = self.stream(self.students[0], lambda: extend_time(self.exam, 5))
+        self.assertEqual(events, ["deadline", "deadline"])
+
+    def test_stream_tells_the_candidate_to_submit(self):
+        events = self.stream(self.students[0], lambda: force_submit(self.exam))
+        self.assertEqual(events, ["deadline", "submit"])
+
+    def test_stream_ignores_other_candidates(self):
+        first, second = self.students
+        with mock.patch.object(exam_clock, "HEARTBEAT", 0):
+            events = self.stream(first, lambda: extend_time(self.exam, 5, [second.id]))
+        self.assertEqual(events, ["deadline", "heartbeat"])
+
+    def test_stream_resyncs_without_the_announcement(self):
+        # The change was made by a worker whose cache this one doesn't see
+        later = self.end_time + timezone.timedelta(minutes=5)
+        with mock.patch.object(exam_clock, "RESYNC", 0):
+            events = self.stream(self.students[0], lambda: ExamSession.objects.filter(user=self.students[0]).update(end_time=later))
+        self.assertEqual(events, ["deadline", "deadline"])
+
+    def test_stream_needs_asgi(self):
+        response = self.client_for(self.students[0]).get(f"/api/exam/{self.exam.id}/clock/")
+        self.assertEqual(response.status_code, 501)
@@ -0,0 +1,150 @@
+import hashlib
+import hmac
+import io
+import json
+import zipfile
+
+from django.core import signing
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from cbt.exam_packs import get_exam_pack, sync_key, verify_pack
+from cbt.models import ExamSession, QuestionImage, StudentAnswer, StudentScore
+
+from .base import CBTTestCase
+
+
+def rewrite(pack_bytes, name, content):
+    """The same zip with one member replaced."""
+    source, output = zipfile.ZipFile(io.BytesIO(pack_bytes)), io.BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        for item in source.namelist():
+            archive.writestr(item, content if item == name else source.read(item))
+    output.seek(0)
+    return output
+
+
+class ExamPackTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+        QuestionImage.objects.create(question=self.questions[0], image=SimpleUploadedFile("map.png", buffer.getvalue()))
+        self.student = self.students[0]
+        self.api = self.client_for(self.student)
+
+    def start(self, exam=None):
+        now = timezone.now()
+        return ExamSession.objects.create(
+            school=self.school, user=self.student, exam=exam or self.exam, start_time=now, end_time=now + timezone.timedelta(minutes=30),
+        )
+
+    def download(self, exam=None, **headers):
+        return self.api.get(f"/api/exam/{(exam or self.exam).id}/pack/", **headers)
+
+    def test_pack_only_inside_the_window_with_a_session(self):
+        self.assertEqual(self.download().status_code, 409)
+
+        upcoming = self.make_exam(minutes_ago=-10)
+        self.start(upcoming)
+        self.assertEqual(self.download(upcoming).status_code, 403)
+
+        closed = self.make_exam(minutes_ago=120)
+        self.start(closed)
+        self.assertEqual(self.download(closed).status_code, 403)
+
+    def test_signed_pack_without_answers(self):
+        session = self.start()
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Exam-Sync-Key"], sync_key(session))
+
+        manifest = verify_pack(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(len(manifest["questions"]), self.n_questions)
+        self.assertNotIn("correct_answer", manifest["questions"][0])
+        self.assertEqual(len(manifest["files"]), 1)
+
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_tampering_is_detected(self):
+        content = get_exam_pack(self.exam.id).file.read()
+        manifest = zipfile.ZipFile(io.BytesIO(content)).read("manifest.json")
+        image_path = next(iter(json.loads(manifest)["files"]))
+
+        with self.assertRaises(signing.BadSignature):
+            verify_pack(rewrite(content, "manifest.json", manifest.replace(b"Question 1", b"Question X")))
+        with self.assertRaises(signing.BadSignature):
+            verify_pack(rewrite(content, image_path, b"not the picture"))
+
+    def test_pack_is_rebuilt_after_an_edit(self):
+        first = get_exam_pack(self.exam.id)
+        self.assertEqual(get_exam_pack(self.exam.id).version, first.version)
+
+        question = self.questions[1]
+        question.question_text = "Edited"
+        question.save()
+        self.assertNotEqual(get_exam_pack(self.exam.id).version, first.version)
+
+
+class SyncAnswersTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.students[0]
+        now = timezone.now()
+        self.session = ExamSession.objects.create(
+            school=self.school, user=self.student, exam=self.exam, start_time=now, end_time=now + timezone.timedelta(minutes=30),
+        )
+
+    def sync(self, answers, key=None, finished=False):
+        body = json.dumps({"user_id": self.student.id, "answers": answers, "finished": finished}).encode()
+        signature = hmac.new((key or sync_key(self.session)).encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            f"/api/exam/{self.exam.id}/sync/", body, content_type="application/json", HTTP_X_SYNC_SIGNATURE=signature,
+        )
+
+    def entry(self, question, answer, client_ts=None):
+        return {"questionId": question.id, "answer": answer, "client_ts": client_ts or int(timezone.now().timestamp() * 1000)}
+
+    def test_signed_batch_is_saved(self):
+        response = self.sync([self.entry(self.questions[0], "A")])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(StudentAnswer.objects.get(user=self.student, question=self.questions[0]).is_correct)
+
+    def test_bad_signature_is_refused(self):
+        self.assertEqual(self.sync([self.entry(self.questions[0], "A")], key="guessed").status_code, 403)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+    def test_key_dies_with_the_session(self):
+        old_key = sync_key(self.session)
+        self.client_for(self.student).post(f"/api/exam/{self.exam.id}/end/")
+        self.assertEqual(self.sync([self.entry(self.questions[0], "A")], key=old_key).status_code, 403)
+
+        # Even a fresh session for the same candidate gets a different key
+        self.session = ExamSession.objects.create(
+            school=self.school, user=self.student, exam=self.exam, start_time=timezone.now(), end_time=self.session.end_time,
+        )
+        self.assertEqual(self.sync([self.entry(self.questions[0], "A")], key=old_key).status_code, 403)
+
+    def test_batches_after_the_grace_period_are_refused(self):
+        ExamSession.objects.filter(id=self.session.id).update(end_time=timezone.now() - timezone.timedelta(hours=2))
+        self.session.refresh_from_db()
+        self.assertEqual(self.sync([self.entry(self.questions[0], "A")]).status_code, 403)
+
+    def test_late_and_foreign_answers_are_dropped(self):
+        late_ts = int((self.session.end_time + timezone.timedelta(minutes=10)).timestamp() * 1000)
+        response = self.sync([
+            self.entry(self.questions[0], "A", late_ts),
+            {"questionId": 999999, "answer": "A"},
+            self.entry(self.questions[1], "T"),
+        ]).json()
+
+        self.assertEqual((response["late"], response["invalid"]), ([self.questions[0].id], [999999]))
+        self.assertEqual(list(StudentAnswer.objects.values_list("question_id", flat=True)), [self.questions[1].id])
+
+    def test_finished_batch_scores_and_closes_the_session(self):
+        response = self.sync([self.entry(self.questions[0], "A"), self.entry(self.questions[1], "T")], finished=True)
+
+        self.assertEqual(response.json()["score"], 4.0)
+        self.assertEqual(StudentScore.objects.get(user=self.student, exam=self.exam).score, 4)
+        self.assertFalse(ExamSession.objects.filter(id=self.session.id).exists())
@@ -0,0 +1,58 @@
+import io
+
+from openpyxl import load_workbook
+
+from cbt.exports import RESULT_HEADERS, result_rows, stream_results_xlsx
+from cbt.models import StudentScore
+from cbt.xlsx import column_letter, sheet_title, stream_xlsx
+
+from .base import CBTTestCase
+
+
+def read_xlsx(chunks):
+    return load_workbook(io.BytesIO(b"".join(chunks)), read_only=True)
+
+
+class ResultExportTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        for student, score in zip(self.students, (6, 3)):
+            StudentScore.objects.create(school=self.school, user=student, exam=self.exam, score=score)
+
+    def test_result_rows(self):
+        self.assertEqual(list(result_rows(self.exam)), [
+            ("Student1", "gha1", "JSS 3", 6, 8.0, 75.0),
+            ("Student2", "gha2", "JSS 3", 3, 8.0, 37.5),
+        ])
+
+    def test_xlsx_opens_in_openpyxl(self):
+        sheet = read_xlsx(stream_results_xlsx(self.exam))["Exam Results"]
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), RESULT_HEADERS)
+        self.assertEqual(rows[1], ("Student1", "gha1", "JSS 3", 6, 8, 75))
+
+    def test_admin_download(self):
+        self.client.force_login(self.school_admin())
+        response = self.client.get(f"/admin/cbt/exam/{self.exam.id}/export-results/?format=csv")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(RESULT_HEADERS))
+        self.assertEqual(len(lines), 3)
+
+
+class XlsxWriterTests(CBTTestCase):
+    def test_column_letters(self):
+        self.assertEqual([column_letter(i) for i in (0, 25, 26, 701, 702)], ["A", "Z", "AA", "ZZ", "AAA"])
+
+    def test_sheet_titles_are_cleaned_and_unique(self):
+        self.assertEqual(sheet_title("Maths: Term 1/2"), "Maths  Term 1 2")
+        self.assertEqual(sheet_title("x" * 40, ["x" * 31]), "x" * 27 + " (2)")
+
+    def test_many_rows_text_escaping_and_several_sheets(self):
+        rows = [(n, f"<b>&\x01{n}", None) for n in range(1200)]
+        book = read_xlsx(stream_xlsx([("One", ["n", "text", "empty"], rows), ("One", ["a"], [])]))
+
+        self.assertEqual(book.sheetnames, ["One", "One (2)"])
+        data = list(book["One"].iter_rows(values_only=True))
+        self.assertEqual(len(data), 1201)
+        self.assertEqual(data[-1][:2], (1199, "<b>&1199"))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password
+from django.test import override_settings
+
+from cbt.hashing import EXAM_HASHER, ExamAccountBackend, POOL_THRESHOLD, hash_password, hash_passwords, student_hasher
+
+from .base import PASSWORD, CBTTestCase
+
+
+class HashPasswordsTests(CBTTestCase):
+    def test_pool_keeps_input_order(self):
+        passwords = [f"password{i}" for i in range(POOL_THRESHOLD)]
+        reported = []
+
+        hashes = hash_passwords(passwords, lambda percent, message: reported.append(percent), hasher=EXAM_HASHER, workers=2)
+
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+        self.assertEqual(len(set(hashes)), len(hashes)) # Salted
+        self.assertTrue(all(percent <= 80 for percent in reported))
+
+    def test_default_hasher_unless_fast_hash_is_on(self):
+        self.assertEqual(student_hasher(), "default")
+        with override_settings(EXAM_ACCOUNT_FAST_HASH=True):
+            self.assertEqual(student_hasher(), EXAM_HASHER)
+            self.assertTrue(hash_password("secret").startswith(EXAM_HASHER + "$"))
+
+
+@override_settings(AUTHENTICATION_BACKENDS=["cbt.hashing.ExamAccountBackend", "django.contrib.auth.backends.ModelBackend"])
+class ExamAccountBackendTests(CBTTestCase):
+    def test_exam_hash_logs_in_without_an_upgrade(self):
+        student = self.students[0]
+        student.password = hash_password(PASSWORD, hasher=EXAM_HASHER)
+        student.save()
+
+        self.assertEqual(authenticate(username=student.username, password=PASSWORD), student)
+        self.assertIsNone(authenticate(username=student.username, password="wrong"))
+        student.refresh_from_db()
+        self.assertTrue(student.password.startswith(EXAM_HASHER + "$"))
+
+    def test_other_hashes_are_left_to_the_model_backend(self):
+        student = self.students[0]
+        self.assertIsNone(ExamAccountBackend().authenticate(None, username=student.username, password=PASSWORD))
+        self.assertEqual(authenticate(username=student.username, password=PASSWORD), student)
+
+
+class DefaultBackendsTests(CBTTestCase):
+    def test_backend_is_only_installed_with_fast_hashing(self):
+        installed = "cbt.hashing.ExamAccountBackend" in settings.AUTHENTICATION_BACKENDS
+        self.assertEqual(installed, settings.EXAM_ACCOUNT_FAST_HASH)
+
+    @override_settings(AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"])
+    def test_exam_hashes_still_log_in_after_fast_hashing_is_turned_off(self):
+        student = self.students[0]
+        student.password = hash_password(PASSWORD, hasher=EXAM_HASHER)
+        student.save()
+
+        self.assertEqual(authenticate(username=student.username, password=PASSWORD), student)
+        student.refresh_from_db()
+        self.assertFalse(student.password.startswith(EXAM_HASHER + "$")) # Upgraded by ModelBackend
@@ -0,0 +1,83 @@
+import io
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from cbt.image_store import collect_garbage, recount
+from cbt.models import ImageBlob, QuestionImage
+
+from .base import CBTTestCase
+
+
+def upload(color, name="diagram.png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class BlobRefCountTests(CBTTestCase):
+    def add_image(self, question, color):
+        return QuestionImage.objects.create(question=question, image=upload(color))
+
+    def ref_count(self, image):
+        return ImageBlob.objects.get(id=image.blob_id).ref_count
+
+    def test_same_picture_shares_one_blob(self):
+        first = self.add_image(self.questions[0], "red")
+        second = self.add_image(self.questions[1], "red")
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.ref_count(first), 2)
+        self.assertTrue(default_storage.exists(first.image.name))
+
+    def test_replacing_the_upload_moves_the_reference(self):
+        image = self.add_image(self.questions[0], "red")
+        old_blob = image.blob_id
+
+        image.image = upload("green")
+        image.save()
+
+        self.assertNotEqual(image.blob_id, old_blob)
+        self.assertEqual(ImageBlob.objects.get(id=old_blob).ref_count, 0)
+        self.assertEqual(self.ref_count(image), 1)
+
+    def test_deletes_and_cascades_release(self):
+        kept = self.add_image(self.questions[0], "red")
+        self.add_image(self.questions[1], "red")
+        self.add_image(self.questions[2], "red").delete()
+        self.assertEqual(self.ref_count(kept), 2)
+
+        self.questions[1].delete()
+        self.assertEqual(self.ref_count(kept), 1)
+
+        self.exam.delete()
+        self.assertEqual(ImageBlob.objects.get(id=kept.blob_id).ref_count, 0)
+
+
+class BlobGarbageCollectionTests(CBTTestCase):
+    def test_recount_repairs_drift(self):
+        image = QuestionImage.objects.create(question=self.questions[0], image=upload("red"))
+        ImageBlob.objects.filter(id=image.blob_id).update(ref_count=5)
+
+        self.assertEqual(recount(), 1)
+        self.assertEqual(ImageBlob.objects.get(id=image.blob_id).ref_count, 1)
+
+    def test_unreferenced_blobs_and_files_are_deleted(self):
+        used = QuestionImage.objects.create(question=self.questions[0], image=upload("red"))
+        unused = QuestionImage.objects.create(question=self.questions[1], image=upload("blue"))
+        unused_blob = ImageBlob.objects.get(id=unused.blob_id)
+        unused.delete()
+
+        self.assertEqual(collect_garbage(timedelta(0), dry_run=True), (1, unused_blob.size))
+        self.assertEqual(collect_garbage(timedelta(hours=1)), (0, 0)) # Still inside the grace period
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("gc_image_blobs", grace_hours=0, stdout=io.StringIO())
+
+        self.assertEqual(list(ImageBlob.objects.values_list("id", flat=True)), [used.blob_id])
+        self.assertFalse(default_storage.exists(unused_blob.file.name))
+        self.assertTrue(default_storage.exists(used.image.name))
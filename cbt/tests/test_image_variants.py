@@ -0,0 +1,52 @@
+import io
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from cbt.exam_cache import get_exam_bundle
+from cbt.image_variants import build_variants, render_variants, variant_widths
+from cbt.models import ImageBlob, QuestionImage
+
+from .base import CBTTestCase
+
+
+def noisy_png(width, height):
+    # Noise doesn't compress, so the PNG is large and every recompressed copy is smaller
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (width, height), os.urandom(width * height * 3)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640])
+class ImageVariantTests(CBTTestCase):
+    def test_widths_never_exceed_the_original(self):
+        self.assertEqual(variant_widths(1000), [320, 640])
+        self.assertEqual(variant_widths(500), [320, 500])
+        self.assertEqual(variant_widths(200), [200])
+
+    def test_render(self):
+        rendered = render_variants(noisy_png(800, 400))
+        self.assertEqual(
+            [(fmt, width, height) for fmt, width, height, _ in rendered],
+            [("webp", 320, 160), ("jpeg", 320, 160), ("webp", 640, 320), ("jpeg", 640, 320)],
+        )
+        self.assertEqual(render_variants(b"not an image"), [])
+
+    def test_build_variants_and_serve_them(self):
+        image = QuestionImage.objects.create(
+            question=self.questions[0], image=SimpleUploadedFile("big.png", noisy_png(700, 350), content_type="image/png"),
+        )
+        get_exam_bundle(self.exam.id) # Cached without variants
+
+        self.assertEqual(build_variants(ImageBlob.objects.all(), workers=1), 1)
+        self.assertEqual(build_variants(ImageBlob.objects.all(), workers=1), 0) # Already optimized
+
+        blob = ImageBlob.objects.get(id=image.blob_id)
+        self.assertTrue(blob.optimized)
+        self.assertEqual(blob.variants.count(), 4)
+
+        srcset = get_exam_bundle(self.exam.id)["questions"][0]["images"][0]["srcset"]
+        self.assertEqual([item["width"] for item in srcset], [320, 320, 640, 640])
+        self.assertLessEqual(srcset[0]["bytes"], srcset[1]["bytes"])
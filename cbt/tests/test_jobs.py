@@ -0,0 +1,117 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cbt import jobs
+from cbt.checks import job_storage_check
+from cbt.jobs import enqueue, scrub_expired_secrets, seal, unseal
+from cbt.models import Job
+
+from .base import CBTTestCase
+
+
+CSV = b"first_name,middle_name,last_name,password\nAda,,Obi,secret1\nBola,,Ade,secret2\n,,Broken,x\n"
+
+
+class JobTests(CBTTestCase):
+    def run_job(self, kind, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue(kind, label="Test job", school=self.school, **kwargs)
+        job.refresh_from_db()
+        return job
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            enqueue("nope", label="x")
+
+    def test_eager_job_reports_progress_and_result(self):
+        def count_to_three(job, progress):
+            progress(50, "Halfway")
+            job.result = {"count": 3}
+
+        with mock.patch.dict(jobs.HANDLERS, {"count": count_to_three}):
+            job = self.run_job("count")
+
+        self.assertEqual((job.status, job.progress, job.result), ("done", 100, {"count": 3}))
+
+    def test_failed_job_keeps_the_traceback(self):
+        def explode(job, progress):
+            raise RuntimeError("boom")
+
+        with mock.patch.dict(jobs.HANDLERS, {"explode": explode}):
+            job = self.run_job("explode")
+
+        self.assertEqual(job.status, "failed")
+        self.assertIn("RuntimeError: boom", job.error)
+
+    def test_student_import_seals_passwords_and_drops_the_upload(self):
+        job = self.run_job("import_students", input_file=SimpleUploadedFile("students.csv", CSV))
+
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result["count"], 2)
+        self.assertEqual(len(job.result["errors"]), 1)
+        self.assertNotIn("secret1", str(job.result))
+        self.assertEqual([row["password"] for row in unseal(job.result["sealed"])], ["secret1", "secret2"])
+        self.assertFalse(job.input_file)
+        self.assertEqual([name for _, _, names in os.walk(settings.MEDIA_ROOT) for name in names if name.endswith(".csv")], [])
+
+
+class SealTests(CBTTestCase):
+    def test_round_trip_and_tampering(self):
+        token = seal([{"password": "secret"}])
+        self.assertEqual(unseal(token), [{"password": "secret"}])
+        self.assertIsNone(unseal(token[:-4] + "AAAA"))
+
+    @override_settings(JOB_SECRET_TTL=-1)
+    def test_expired_secrets_are_unreadable_and_scrubbed(self):
+        token = seal(["secret"])
+        self.assertIsNone(unseal(token))
+
+        job = Job.objects.create(
+            kind="import_students", label="Old import", status="done",
+            finished_at=timezone.now() - timezone.timedelta(minutes=1), result={"count": 1, "sealed": token},
+        )
+        self.assertEqual(scrub_expired_secrets(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {"count": 1})
+
+
+class JobStorageCheckTests(CBTTestCase):
+    def errors(self):
+        return [error.id for error in job_storage_check(None)]
+
+    @override_settings(JOBS_EAGER=False, JOBS_SHARED_STORAGE=False)
+    def test_local_media_with_a_celery_worker_fails(self):
+        self.assertEqual(self.errors(), ["cbt.E003"])
+
+    @override_settings(JOBS_EAGER=False, JOBS_SHARED_STORAGE=True)
+    def test_declared_shared_volume_passes(self):
+        self.assertEqual(self.errors(), [])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_pass(self):
+        self.assertEqual(self.errors(), [])
+
+
+class ImportResultViewTests(CBTTestCase):
+    def test_only_the_importer_sees_the_passwords(self):
+        superuser = User.objects.create_superuser("root", "root@x.test", "pass1234") # No UserProfile
+        job = Job.objects.create(
+            kind="import_students", label="Import", status="done", created_by=superuser,
+            result={"count": 1, "errors": [], "sealed": seal([{"username": "gha9", "password": "secret"}])},
+        )
+        url = reverse("admin:import-students-result", args=[job.id])
+
+        self.client.force_login(self.school_admin())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(superuser)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "secret")
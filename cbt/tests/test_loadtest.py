@@ -0,0 +1,42 @@
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from cbt.loadtest import (
+    InProcessTransport, Recorder, _percentile, build_report, cleanup_hall, format_report, run_candidate, seed_hall,
+)
+from cbt.models import School, StudentScore
+
+from .base import CBTTestCase
+
+
+OPTIONS = {"fetch": "paper", "answer_mode": "batch", "changes": 1, "time_polls": 1, "think_time": 0, "questions": 6}
+
+
+class LoadtestTests(CBTTestCase):
+    def test_candidate_flow_completes(self):
+        hall = seed_hall(students=2, questions=6)
+        recorder = Recorder()
+
+        # run_hall would do this on worker threads; here it runs on the test's own connection
+        self.assertTrue(run_candidate(InProcessTransport(), recorder, hall["usernames"][0], OPTIONS))
+        self.assertEqual(set(recorder.samples), {"login", "exam", "start", "paper", "answers-batch", "time", "end"})
+        self.assertTrue(StudentScore.objects.filter(exam_id=hall["exam_id"]).exists())
+
+        report = build_report(recorder, 1.0, [True], OPTIONS, None)
+        self.assertEqual(report["completed"], 1)
+        self.assertEqual(sum(row["errors"] for row in report["endpoints"].values()), 0)
+        self.assertIn("p95 +0.0% vs baseline", format_report(report, baseline=report))
+
+        cleanup_hall(hall)
+        self.assertFalse(School.objects.filter(id=hall["school_id"]).exists())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(_percentile(values, 50), 50)
+        self.assertEqual(_percentile(values, 99), 99)
+        self.assertEqual(_percentile([], 95), 0.0)
+
+    @override_settings(DEBUG=False)
+    def test_command_refuses_a_non_debug_database(self):
+        with self.assertRaises(CommandError):
+            call_command("loadtest", students=1)
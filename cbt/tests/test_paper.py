@@ -0,0 +1,39 @@
+from cbt.models import School, StudentAnswer
+
+from .base import CBTTestCase
+
+
+class ExamPaperViewTests(CBTTestCase):
+    def test_returns_all_questions_without_answers_and_with_own_saved_answers(self):
+        student, other = self.students
+        StudentAnswer.objects.create(school=self.school, user=student, question=self.questions[0], answer_text="B")
+        StudentAnswer.objects.create(school=self.school, user=other, question=self.questions[1], answer_text="T")
+
+        response = self.client_for(student).get(f"/api/exam/{self.exam.id}/paper/")
+
+        self.assertEqual(response.status_code, 200)
+        questions = response.json()["questions"]
+        self.assertEqual([q["id"] for q in questions], [q.id for q in self.questions])
+        self.assertNotIn("correct_answer", questions[0])
+        self.assertEqual(questions[0]["student_answer"], "B")
+        self.assertIsNone(questions[1]["student_answer"]) # The other student's answer stays theirs
+
+    def test_etag_revalidation(self):
+        client = self.client_for(self.students[0])
+        first = client.get(f"/api/exam/{self.exam.id}/paper/")
+
+        unchanged = client.get(f"/api/exam/{self.exam.id}/paper/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(unchanged.status_code, 304)
+
+        StudentAnswer.objects.create(school=self.school, user=self.students[0], question=self.questions[0], answer_text="C")
+        changed = client.get(f"/api/exam/{self.exam.id}/paper/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_other_schools_exam_is_not_found(self):
+        other = School.objects.create(name="Other College", email="o@x.test")
+        self.exam.school = other
+        self.exam.save()
+
+        response = self.client_for(self.students[0]).get(f"/api/exam/{self.exam.id}/paper/")
+        self.assertEqual(response.status_code, 404)
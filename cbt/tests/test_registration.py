@@ -0,0 +1,38 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cbt.models import Course, CourseRegistration, StudentClass, UserProfile
+from cbt.registration import register, register_classes, register_pairs
+
+from .base import CBTTestCase
+
+
+class RegistrationTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        self.english = Course.objects.create(school=self.school, name="English", target_class=self.student_class)
+
+    def registered(self):
+        return set(CourseRegistration.objects.values_list("user_id", "course_id"))
+
+    def test_only_missing_pairs_are_created(self):
+        ids = [s.id for s in self.students]
+        self.assertEqual(register(ids, [self.course.id, self.english.id], self.school), 2) # Mathematics exists already
+        self.assertEqual(self.registered(), {(u, c) for u in ids for c in (self.course.id, self.english.id)})
+        self.assertEqual(register(ids, [self.english.id], self.school), 0)
+
+    def test_query_count_does_not_grow_with_pairs(self):
+        with CaptureQueriesContext(connection) as queries:
+            register_pairs([(s.id, self.english.id) for s in self.students], self.school)
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(register_pairs([], self.school), 0)
+
+    def test_register_classes(self):
+        other_class = StudentClass.objects.create(school=self.school, name="SS 1")
+        physics = Course.objects.create(school=self.school, name="Physics", target_class=other_class)
+        newcomer = self.make_student(3)
+        UserProfile.objects.filter(user=newcomer).update(student_class=other_class)
+
+        self.assertEqual(register_classes(StudentClass.objects.filter(school=self.school)), 3)
+        self.assertIn((newcomer.id, physics.id), self.registered())
+        self.assertNotIn((newcomer.id, self.english.id), self.registered())
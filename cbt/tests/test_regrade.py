@@ -0,0 +1,67 @@
+from django.urls import reverse
+
+from cbt.models import School, StudentAnswer, StudentScore
+
+from .base import CBTTestCase
+
+
+class RegradeTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = self.questions[0] # obj, key "A", 2 points
+        self.right, self.wrong = self.students
+        for student, text, correct, score in ((self.right, "A", True, 10), (self.wrong, "B", False, 10)):
+            StudentAnswer.objects.create(school=self.school, user=student, question=self.question, answer_text=text, is_correct=correct)
+            StudentScore.objects.create(school=self.school, user=student, exam=self.exam, score=score)
+
+    def edit(self, **fields):
+        for name, value in fields.items():
+            setattr(self.question, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        return self.question.regrades.get()
+
+    def scores(self):
+        return dict(StudentScore.objects.filter(exam=self.exam).values_list("user_id", "score"))
+
+    def test_key_change_moves_the_mark(self):
+        regrade = self.edit(correct_answer="b")
+
+        self.assertEqual(regrade.status, "done")
+        self.assertEqual(self.scores(), {self.right.id: 8, self.wrong.id: 12})
+        self.assertEqual(
+            dict(StudentAnswer.objects.filter(question=self.question).values_list("user_id", "is_correct")),
+            {self.right.id: False, self.wrong.id: True},
+        )
+
+    def test_point_change_adjusts_only_correct_answers(self):
+        self.edit(point=5.0)
+        self.assertEqual(self.scores(), {self.right.id: 13, self.wrong.id: 10})
+
+    def test_fractional_points_fall_back_to_a_rescore(self):
+        regrade = self.edit(point=2.5)
+        self.assertEqual(regrade.scores_adjusted, 2)
+        # Rescored from the answers alone: only this question was answered
+        self.assertEqual(self.scores(), {self.right.id: 2, self.wrong.id: 0})
+
+    def test_unrelated_edit_queues_nothing(self):
+        self.question.question_text = "Pick one"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        self.assertFalse(self.question.regrades.exists())
+        self.assertEqual(self.scores(), {self.right.id: 10, self.wrong.id: 10})
+
+
+class RegradesViewTests(CBTTestCase):
+    def test_requires_admin_login(self):
+        response = self.client.get(reverse("admin:exam-regrades", args=[self.exam.id]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_other_schools_exam_is_not_found(self):
+        self.client.force_login(self.school_admin())
+        self.assertEqual(self.client.get(reverse("admin:exam-regrades", args=[self.exam.id])).status_code, 200)
+
+        other = School.objects.create(name="Other College", email="o@x.test")
+        self.exam.school = other
+        self.exam.save()
+        self.assertEqual(self.client.get(reverse("admin:exam-regrades", args=[self.exam.id])).status_code, 404)
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.utils import timezone
+
+from cbt import relay
+from cbt.models import RelaySyncState, School, StudentAnswer, StudentScore
+from cbt.relay import apply_push, create_node, decode, encode
+
+from .base import CBTTestCase
+
+
+class RelayPushTests(CBTTestCase):
+    def setUp(self):
+        super().setUp()
+        self.node, self.key = create_node(self.school, "Main hall")
+
+    def push(self, payload, key=None):
+        return self.client.post(
+            "/api/relay/push/", encode(payload), content_type="application/json",
+            HTTP_CONTENT_ENCODING="gzip", HTTP_AUTHORIZATION=f"Relay {key or self.key}",
+        )
+
+    def test_unknown_key_is_refused(self):
+        self.assertEqual(self.push({"answers": []}, key="guessed").status_code, 401)
+        self.node.is_active = False
+        self.node.save()
+        self.assertEqual(self.push({"answers": []}).status_code, 401)
+
+    def test_answers_are_graded_and_scores_recomputed_centrally(self):
+        student = self.students[0]
+        response = self.push({
+            "answers": [
+                {"user_id": student.id, "questionId": self.questions[0].id, "answer": "A", "client_ts": 1000},
+                {"user_id": student.id, "questionId": self.questions[1].id, "answer": "F", "client_ts": 1000},
+            ],
+            "scores": [{"user_id": student.id, "exam_id": self.exam.id, "score": 100}],
+        })
+
+        self.assertEqual(response.json(), {"saved": 2, "stale": 0, "rejected": 0, "scored": 1})
+        self.assertEqual(StudentScore.objects.get(user=student, exam=self.exam).score, 2) # Not the relay's 100
+        self.node.refresh_from_db()
+        self.assertIsNotNone(self.node.last_push_at)
+
+    def test_older_pushes_lose_and_repeats_change_nothing(self):
+        student, question = self.students[0], self.questions[0]
+        answer = {"user_id": student.id, "questionId": question.id, "answer": "B", "client_ts": 2000}
+        self.push({"answers": [answer]})
+        self.push({"answers": [answer]})
+
+        result = self.push({"answers": [dict(answer, answer="A", client_ts=1000)]}).json()
+        self.assertEqual(result["stale"], 1)
+        self.assertEqual(StudentAnswer.objects.get(user=student, question=question).answer_text, "B")
+
+    def test_other_schools_rows_are_rejected(self):
+        other = School.objects.create(name="Other College", email="o@x.test")
+        _, other_key = create_node(other, "Their hall")
+
+        result = self.push({"answers": [
+            {"user_id": self.students[0].id, "questionId": self.questions[0].id, "answer": "A", "client_ts": 1000},
+        ]}, key=other_key).json()
+        self.assertEqual(result["rejected"], 1)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+
+class RelaySnapshotTests(CBTTestCase):
+    def test_snapshot_carries_the_days_exams_and_logins(self):
+        _, key = create_node(self.school, "Main hall")
+        day = timezone.localtime(self.exam.start_datetime).date() # Not localdate(): the exam may have started before midnight
+        response = self.client.get(f"/api/relay/snapshot/?day={day}", HTTP_AUTHORIZATION=f"Relay {key}")
+
+        data = decode(response.content, response["Content-Encoding"])
+        self.assertEqual([row["id"] for row in data["exams"]], [self.exam.id])
+        self.assertEqual(len(data["questions"]), self.n_questions)
+        self.assertEqual({row["username"] for row in data["users"]}, {s.username for s in self.students})
+        self.assertTrue(all(row["password"].startswith("pbkdf2_sha256$") for row in data["users"]))
+
+        self.assertEqual(self.client.get("/api/relay/snapshot/?day=tomorrow", HTTP_AUTHORIZATION=f"Relay {key}").status_code, 400)
+
+
+class RelayNodePushTests(CBTTestCase):
+    """The relay side of push(), with central played by apply_push on the same database."""
+
+    def test_push_sends_answers_then_scores_and_moves_the_watermark(self):
+        node, _ = create_node(self.school, "Main hall")
+        student = self.students[0]
+        StudentAnswer.objects.create(school=self.school, user=student, question=self.questions[0], answer_text="A")
+        StudentScore.objects.create(school=self.school, user=student, exam=self.exam, score=0)
+
+        def central(method, path, payload=None, **kwargs):
+            return mock.Mock(json=lambda: apply_push(node, decode(encode(payload), "gzip")))
+
+        with mock.patch.object(relay, "_upstream", side_effect=central):
+            totals = relay.push()
+
+        self.assertEqual(totals, {"saved": 1, "stale": 0, "rejected": 0, "scored": 1})
+        self.assertEqual(StudentScore.objects.get(user=student, exam=self.exam).score, 2)
+        self.assertIsNotNone(RelaySyncState.load().push_watermark)
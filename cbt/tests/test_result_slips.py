@@ -0,0 +1,50 @@
+import io
+import zipfile
+
+from django.urls import reverse
+
+from cbt.models import StudentClass, StudentScore, UserProfile
+from cbt.result_slips import slip_header, slip_rows, write_class_zip, write_slips
+
+from .base import CBTTestCase
+
+
+class ResultSlipTests(CBTTestCase):
+    n_students = 3
+
+    def setUp(self):
+        super().setUp()
+        ss1 = StudentClass.objects.create(school=self.school, name="SS 1", group="A")
+        UserProfile.objects.filter(user=self.students[2]).update(student_class=ss1)
+        for student, score in zip(self.students, (6, 3, 8)):
+            StudentScore.objects.create(school=self.school, user=student, exam=self.exam, score=score)
+
+    def test_header_and_rows(self):
+        header = slip_header(self.exam)
+        self.assertEqual((header.course_name, header.total_possible), ("Mathematics", 8.0))
+        self.assertEqual([(row.username, row.class_name) for row in slip_rows(self.exam)], [
+            ("gha1", "JSS 3"), ("gha2", "JSS 3"), ("gha3", "SS 1 A"),
+        ])
+
+    def test_one_page_per_candidate(self):
+        output = io.BytesIO()
+        self.assertEqual(write_slips(slip_header(self.exam), slip_rows(self.exam), output), 3)
+        self.assertTrue(output.getvalue().startswith(b"%PDF"))
+
+    def test_empty_exam_still_gives_a_pdf(self):
+        output = io.BytesIO()
+        self.assertEqual(write_slips(slip_header(self.exam), [], output), 0)
+        self.assertTrue(output.getvalue().startswith(b"%PDF"))
+
+    def test_class_zip_is_the_same_with_or_without_workers(self):
+        header, rows = slip_header(self.exam), list(slip_rows(self.exam))
+        for workers in (1, 2):
+            output = io.BytesIO()
+            self.assertEqual(write_class_zip(header, rows, output, workers=workers), 2)
+            self.assertEqual(sorted(zipfile.ZipFile(output).namelist()), ["jss-3.pdf", "ss-1-a.pdf"])
+
+    def test_admin_download(self):
+        self.client.force_login(self.school_admin())
+        response = self.client.get(reverse("admin:print-result-slips", args=[self.exam.id]) + "?split=class")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("by_class.zip", response["Content-Disposition"])
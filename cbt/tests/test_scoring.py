@@ -0,0 +1,49 @@
+from cbt.models import StudentAnswer, StudentScore
+from cbt.scoring import compute_scores, score_exam
+
+from .base import CBTTestCase
+
+
+class ScoringTests(CBTTestCase):
+    def answer(self, user, question, **fields):
+        return StudentAnswer.objects.create(school=self.school, user=user, question=question, **fields)
+
+    def test_objective_and_graded_essay_points(self):
+        student = self.students[0]
+        obj, tf, fitg, essay = self.questions
+        self.answer(student, obj, answer_text="A", is_correct=True)
+        self.answer(student, tf, answer_text="F", is_correct=False)
+        self.answer(student, essay, answer_text="...", is_correct=True, is_graded=True, points_earned=1.5)
+
+        self.assertEqual(compute_scores(self.exam.id), {student.id: 3.5})
+
+    def test_ungraded_essay_counts_nothing(self):
+        student = self.students[0]
+        self.answer(student, self.questions[3], answer_text="...", is_correct=True, points_earned=2.0)
+        self.assertEqual(compute_scores(self.exam.id, [student.id]), {student.id: 0.0})
+
+    def test_requested_candidates_without_answers_score_zero(self):
+        self.assertEqual(compute_scores(self.exam.id, [s.id for s in self.students]), {s.id: 0.0 for s in self.students})
+
+    def test_score_exam_updates_existing_rows(self):
+        first, second = self.students
+        StudentScore.objects.create(school=self.school, user=second, exam=self.exam, score=6)
+        self.answer(first, self.questions[0], answer_text="A", is_correct=True)
+
+        self.assertEqual(score_exam(self.exam), {first.id: 2.0, second.id: 0.0})
+        self.assertEqual(
+            dict(StudentScore.objects.filter(exam=self.exam).values_list("user_id", "score")),
+            {first.id: 2, second.id: 0},
+        )
+
+    def test_end_endpoint_scores_and_closes_the_session(self):
+        student = self.students[0]
+        client = self.client_for(student)
+        self.assertEqual(client.post(f"/api/exam/{self.exam.id}/end/").status_code, 404)
+
+        client.post(f"/api/exam/{self.exam.id}/start/")
+        client.post("/api/answer/", {"questionId": self.questions[2].id, "selectedOption": "lagos"}, format="json")
+        response = client.post(f"/api/exam/{self.exam.id}/end/")
+
+        self.assertEqual(response.json(), {"score": 2.0})
+        self.assertEqual(StudentScore.objects.get(user=student, exam=self.exam).score, 2)
@@ -0,0 +1,56 @@
+import csv
+import io
+
+from django.contrib.auth.models import User
+
+from cbt.models import CourseRegistration, StudentClass, UserProfile
+from cbt.student_import import import_students, parse_rows
+
+from .base import CBTTestCase
+
+
+def reader(text):
+    rows = csv.reader(io.StringIO(text))
+    next(rows) # Header
+    return rows
+
+
+CSV = """first_name,middle_name,last_name,password,class_name,group_name
+Ada,,Obi,secret1,JSS 3,
+Bola,Ife,Ade,secret2,SS 1,
+,,Nameless,secret3,JSS 3,
+
+Chidi,,Eze,,JSS 3,
+Short,row
+"""
+
+
+class StudentImportTests(CBTTestCase):
+    def test_parse_reports_bad_rows_by_line(self):
+        rows, errors = parse_rows(reader(CSV))
+
+        self.assertEqual([row["first"] for row in rows], ["Ada", "Bola"])
+        self.assertEqual(rows[1]["last_name"], "Ade Ife")
+        self.assertEqual([error["line"] for error in errors], [4, 6, 7])
+
+    def test_import_creates_students_with_profiles_and_registrations(self):
+        result = import_students(self.school, reader(CSV))
+
+        self.assertEqual(len(result["errors"]), 3)
+        # gha1 and gha2 exist already, so the sequence starts after them
+        self.assertEqual([row["username"] for row in result["created"]], ["gha3", "gha4"])
+
+        ada = User.objects.get(username="gha3")
+        self.assertTrue(ada.check_password("secret1"))
+        self.assertEqual(ada.userprofile.student_class, self.student_class)
+        self.assertTrue(CourseRegistration.objects.filter(user=ada, course=self.course).exists())
+
+        bola = UserProfile.objects.get(user__username="gha4")
+        self.assertEqual(bola.student_class, StudentClass.objects.get(school=self.school, name="SS 1"))
+        self.assertFalse(CourseRegistration.objects.filter(user=bola.user).exists())
+
+    def test_nothing_valid_creates_nothing(self):
+        users = User.objects.count()
+        result = import_students(self.school, reader("header\nOnly,two\n"))
+        self.assertEqual(result["created"], [])
+        self.assertEqual(User.objects.count(), users)
@@ -0,0 +1,45 @@
+from django.utils import timezone
+
+from cbt.models import School
+from cbt.subscriptions import get_subscription_status, subscription_changed
+
+from .base import CBTTestCase
+
+
+class SubscriptionStatusTests(CBTTestCase):
+    def expire(self):
+        School.objects.filter(id=self.school.id).update(subscription_end=timezone.now() - timezone.timedelta(days=1))
+
+    def test_status_is_cached_until_changed(self):
+        self.assertTrue(get_subscription_status(self.school.id).is_subscription_active())
+
+        self.expire()
+        self.assertTrue(get_subscription_status(self.school.id).is_subscription_active())
+
+        subscription_changed.send(sender=School, school_id=self.school.id)
+        self.assertFalse(get_subscription_status(self.school.id).is_subscription_active())
+
+    def test_unknown_school_is_inactive(self):
+        self.assertFalse(get_subscription_status(999999).is_subscription_active())
+
+    def test_expired_school_is_blocked_from_the_api(self):
+        self.expire()
+        subscription_changed.send(sender=School, school_id=self.school.id)
+        # SubscriptionMiddleware sees session logins; JWT users are authenticated later, by DRF
+        self.client.force_login(self.students[0])
+
+        response = self.client.get("/api/subjects/")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()["status"], "expired")
+
+    def test_renewal_reopens_the_admin(self):
+        self.client.force_login(self.school_admin())
+        self.expire()
+        subscription_changed.send(sender=School, school_id=self.school.id)
+        response = self.client.get("/admin/")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/payment?", response["Location"])
+
+        School.objects.filter(id=self.school.id).update(subscription_end=timezone.now() + timezone.timedelta(days=30))
+        subscription_changed.send(sender=School, school_id=self.school.id)
+        self.assertEqual(self.client.get("/admin/").status_code, 200)
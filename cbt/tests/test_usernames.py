@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+
+from cbt.models import UsernameSequence
+from cbt.usernames import reserve_usernames, school_prefix
+
+from .base import CBTTestCase
+
+
+class UsernameTests(CBTTestCase):
+    def test_school_prefix(self):
+        self.assertEqual(school_prefix("Greenfield"), "gre")
+        self.assertEqual(school_prefix("Flora School"), "fls")
+        self.assertEqual(school_prefix("Great Heights Academy"), "gha")
+
+    def test_first_use_starts_after_the_highest_taken(self):
+        User.objects.create(username="gha10")
+        User.objects.create(username="gha10x") # Not a generated name
+        self.assertEqual(reserve_usernames("gha", 2, self.school), ["gha11", "gha12"])
+        self.assertEqual(UsernameSequence.objects.get(prefix="gha").next_value, 13)
+
+    def test_blocks_never_overlap(self):
+        first = reserve_usernames("gha", 3)
+        second = reserve_usernames("gha", 3)
+        self.assertEqual(first + second, [f"gha{n}" for n in range(3, 9)])
+
+    def test_manually_taken_names_are_skipped(self):
+        reserve_usernames("gha", 1) # Seeds the sequence at gha3
+        User.objects.create(username="gha5")
+        self.assertEqual(reserve_usernames("gha", 3), ["gha4", "gha6", "gha7"])
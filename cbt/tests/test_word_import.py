@@ -0,0 +1,104 @@
+import io
+import os
+from unittest import mock
+
+from django.conf import settings
+from docx import Document
+from PIL import Image
+
+from cbt.models import ImageBlob, Question, QuestionImage
+from cbt.word_import import PLACEHOLDER_TEXT, import_word_document
+
+from .base import CBTTestCase
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def word_file(*questions):
+    """questions: dicts with number, q, type and optionally options, correct, points, image."""
+    doc = Document()
+    for question in questions:
+        doc.add_paragraph(f"--- Question {question['number']} ---")
+        doc.add_paragraph(f"[[[% Q %]]] {question['q']} [[[% /Q %]]]")
+        doc.add_paragraph(f"[[[% TYPE %]]] {question['type']} [[[% /TYPE %]]]")
+        if question.get("options"):
+            doc.add_paragraph("[[[% OPTIONS %]]]")
+            for letter, text in zip("ABCD", question["options"]):
+                doc.add_paragraph(f"[[{letter}]] {text}")
+            doc.add_paragraph("[[[% /OPTIONS %]]]")
+        doc.add_paragraph(f"[[[% CORRECT %]]] {question.get('correct', '')} [[[% /CORRECT %]]]")
+        doc.add_paragraph(f"[[[% POINTS %]]] {question.get('points', '1.0')} [[[% /POINTS %]]]")
+        if question.get("image"):
+            doc.add_picture(question["image"])
+        doc.add_paragraph("[[[% END %]]]")
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def stored_files():
+    return {name for _, _, names in os.walk(settings.MEDIA_ROOT) for name in names}
+
+
+OBJ = {"number": 1, "q": "What is 1 + 1?", "type": "obj", "options": ["2", "3", "4", "5"], "correct": "A", "points": "2.0"}
+
+
+class WordImportTests(CBTTestCase):
+    def test_updates_creates_and_skips_placeholders(self):
+        report = import_word_document(self.exam, word_file(
+            OBJ,
+            {"number": 5, "q": "Capital of Nigeria?", "type": "fitg", "correct": "Abuja"},
+            {"number": 6, "q": PLACEHOLDER_TEXT, "type": "obj"},
+        ))
+
+        self.assertEqual((report["created"], report["updated"], report["skipped"], report["errors"]), (1, 1, [6], []))
+        self.assertEqual(Question.objects.get(exam=self.exam, question_number=1).question_text, "What is 1 + 1?")
+        self.assertEqual(Question.objects.get(exam=self.exam, question_number=5).correct_answer, "ABUJA")
+        self.assertFalse(Question.objects.filter(exam=self.exam, question_number=6).exists())
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.total_questions, 5)
+
+        report = import_word_document(self.exam, word_file(OBJ))
+        self.assertEqual((report["created"], report["updated"], report["unchanged"]), (0, 0, 1))
+
+    def test_any_invalid_question_imports_nothing(self):
+        report = import_word_document(self.exam, word_file(
+            OBJ,
+            {"number": 2, "q": "True?", "type": "yesno", "correct": "T"},
+            {"number": 3, "q": "Pick", "type": "obj", "options": ["a", "b", "c", "d"], "correct": "E"},
+            {"number": 4, "q": "Points?", "type": "tf", "correct": "T", "points": "many"},
+            {"number": 4, "q": "Again", "type": "tf", "correct": "T"},
+        ))
+
+        self.assertEqual([error["question"] for error in report["errors"]], [2, 3, 4, 4])
+        self.assertIn("more than once", report["errors"][-1]["error"])
+        self.assertEqual(Question.objects.get(exam=self.exam, question_number=1).question_text, "Question 1")
+
+    def test_images_are_stored_once_and_kept_on_reimport(self):
+        question = dict(OBJ, image=png("red"))
+        report = import_word_document(self.exam, word_file(question))
+        self.assertEqual(report["images_written"], 1)
+
+        image = QuestionImage.objects.get(question__exam=self.exam, question__question_number=1)
+        self.assertEqual(image.blob.ref_count, 1)
+        self.assertTrue(os.path.exists(image.image.path))
+
+        report = import_word_document(self.exam, word_file(dict(OBJ, image=png("red"))))
+        self.assertEqual((report["images_written"], report["images_kept"]), (0, 1))
+        self.assertEqual(ImageBlob.objects.count(), 1)
+
+    def test_failed_import_removes_the_files_it_wrote(self):
+        before = stored_files()
+        with mock.patch("cbt.word_import.add_refs", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                import_word_document(self.exam, word_file(dict(OBJ, image=png("blue"))))
+
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertEqual(stored_files(), before)
@@ -1,19 +1,46 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
+from . import async_views
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+# The hot candidate endpoints have async versions for the ASGI server (see async_views.py)
+if settings.ASYNC_CANDIDATE_VIEWS:
+    question_by_index = async_views.question_by_index
+    save_answer = async_views.save_answer
+    start_session = async_views.start_exam_session
+    remaining_time = async_views.remaining_time
+    # The rest stay sync views, run off the worker's single sync thread
+    candidate_view = async_views.offload
+else:
+    question_by_index = QuestionByIndexView.as_view()
+    save_answer = SaveAnswerView.as_view()
+    start_session = StartExamSessionView.as_view()
+    remaining_time = RemainingTimeView.as_view()
+    candidate_view = lambda view: view
+
 urlpatterns = [
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
-    path("api/login/", StudentLoginView.as_view(), name="student-login"),
-    path("api/subjects/", SubjectRegisteredView.as_view(), name="subjects-registered"),
-    path("api/exam/<int:exam_id>/", ExamDetailView.as_view(), name="exam-detail"),
-    path("api/exam/<int:exam_id>/question/<int:index>/", QuestionByIndexView.as_view(), name="question-by-index"),
-    path("api/answer/", SaveAnswerView.as_view(), name="save-answer"),
-    path("api/exam/<int:exam_id>/start/", StartExamSessionView.as_view(), name="start-session"),
-    path("api/exam/<int:exam_id>/time/", RemainingTimeView.as_view(), name="remaining-time"),
-    path("api/exam/<int:exam_id>/end/", EndExamSessionView.as_view(), name="end-session"),
+    path("api/login/", candidate_view(StudentLoginView.as_view()), name="student-login"),
+    path("api/subjects/", candidate_view(SubjectRegisteredView.as_view()), name="subjects-registered"),
+    path("api/exam/<int:exam_id>/", candidate_view(ExamDetailView.as_view()), name="exam-detail"),
+    path("api/exam/<int:exam_id>/question/<int:index>/", question_by_index, name="question-by-index"),
+    path("api/exam/<int:exam_id>/paper/", candidate_view(ExamPaperView.as_view()), name="exam-paper"),
+    path("api/exam/<int:exam_id>/pack/", candidate_view(ExamPackView.as_view()), name="exam-pack"),
+    path("api/exam/<int:exam_id>/sync/", candidate_view(SyncAnswersView.as_view()), name="sync-answers"),
+    path("api/answer/", save_answer, name="save-answer"),
+    path("api/answers/batch/", candidate_view(SaveAnswersBatchView.as_view()), name="save-answers-batch"),
+    path("api/exam/<int:exam_id>/start/", start_session, name="start-session"),
+    path("api/exam/<int:exam_id>/time/", remaining_time, name="remaining-time"),
+    path("api/exam/<int:exam_id>/clock/", exam_clock_stream, name="exam-clock"),
+    path("api/exam/<int:exam_id>/end/", candidate_view(EndExamSessionView.as_view()), name="end-session"),
+
+    # Exam-centre relay nodes (relay.py)
+    path("api/relay/snapshot/", relay_snapshot, name="relay-snapshot"),
+    path("api/relay/blob/<str:sha>/", relay_blob, name="relay-blob"),
+    path("api/relay/push/", relay_push, name="relay-push"),
 
 
     # Subscription and Payment URLs
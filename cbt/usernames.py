@@ -0,0 +1,75 @@
+#usernames.py
+"""
+Student usernames: school prefix + number (gha1, gha2, ...).
+
+Numbers come from a UsernameSequence row per prefix. reserve_usernames() locks the row,
+takes a block and moves the counter past it, so concurrent imports and single creates
+never hand out the same name, and 5,000 names cost a few queries instead of a count
+plus an exists() probe per gap. The first use of a prefix seeds the counter from the
+highest number already taken.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import UsernameSequence
+
+
+def school_prefix(school_name):
+    words = school_name.split()
+
+    # Rule: Only one word -> first 3 letters
+    if len(words) == 1:
+        return words[0][:3].lower()
+
+    # Rule: Exactly two words -> first 2 of word1 + first 1 of word2
+    # Example: "Flora School" -> "fls"
+    if len(words) == 2:
+        return (words[0][:2] + words[1][0]).lower()
+
+    # Rule: Three or more words -> first 3 initials
+    # Example: "Great Heights Academy" -> "gha"
+    initials = "".join([word[0].lower() for word in words])
+    return initials[:3]
+
+
+def highest_taken(prefix):
+    pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
+    numbers = [
+        int(match.group(1))
+        for match in map(pattern.match, User.objects.filter(username__startswith=prefix).values_list("username", flat=True))
+        if match
+    ]
+    return max(numbers, default=0)
+
+
+def _sequence(prefix, school=None):
+    sequence = UsernameSequence.objects.select_for_update().filter(prefix=prefix).first()
+    if sequence is None:
+        UsernameSequence.objects.get_or_create(
+            prefix=prefix, defaults={"school": school, "next_value": highest_taken(prefix) + 1}
+        )
+        sequence = UsernameSequence.objects.select_for_update().get(prefix=prefix)
+    return sequence
+
+
+def reserve_usernames(prefix, count, school=None):
+    """`count` unused usernames for the prefix, in order. Numbers are never handed out twice."""
+    usernames = []
+    with transaction.atomic():
+        sequence = _sequence(prefix, school)
+        while len(usernames) < count:
+            needed = count - len(usernames)
+            block = [f"{prefix}{n}" for n in range(sequence.next_value, sequence.next_value + needed)]
+            sequence.next_value += needed
+
+            # Manually chosen usernames (e.g. "gha120") can sit inside the block; skip those
+            taken = set()
+            for start in range(0, len(block), 1000):
+                taken.update(User.objects.filter(username__in=block[start:start + 1000]).values_list("username", flat=True))
+            usernames += [username for username in block if username not in taken]
+
+        sequence.save(update_fields=["next_value"])
+    return usernames
+
@@ -20,7 +20,9 @@ import hashlib
 from django.conf import settings
 from django.core.mail import send_mail
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.http import parse_etags
 
 from .models import Exam, Question, School, SchoolRequest, StudentAnswer, ExamSession, StudentScore, CourseRegistration, UserProfile
 from .serializers import (
@@ -29,6 +31,16 @@ from .serializers import (
     ExamSessionSerializer,
     UserSerializer,
 )
+from .exam_cache import get_exam_bundle
+from .answers import save_answers
+from .answer_journal import append_answers, flush_journal, journal_enabled
+from .scoring import compute_scores, save_scores, score_exam
+from .answer_keys import get_answer_key
+from .auth_context import aget_auth_context, get_auth_context
+from .exam_clock import clock_events, get_session_end
+from .exam_packs import get_exam_pack, sync_answers, sync_deadline, sync_key, verify_batch
+from . import relay
+from .subscriptions import subscription_changed
 
 
 # -------------------
@@ -104,9 +116,9 @@ class SubjectRegisteredView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
         # Pulling codes from the Course model via Registration
-        registrations = CourseRegistration.objects.filter(user=request.user, school=school).select_related("course")
+        registrations = CourseRegistration.objects.filter(user=request.user, school_id=school_id).select_related("course")
         subjects = [reg.course.name for reg in registrations]
         return Response({"subjects": subjects})
 
@@ -118,14 +130,13 @@ class ExamDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, exam_id):
-        school = request.user.userprofile.school
-        try:
-            exam = Exam.objects.get(id=exam_id, school=school)
-        except Exam.DoesNotExist:
+        school_id = get_auth_context(request).school_id
+        bundle = get_exam_bundle(exam_id)
+        if not bundle or bundle["school_id"] != school_id:
             return Response({"error": "Exam not found"}, status=404)
 
         return Response({
-            "exam": ExamSerializer(exam).data,
+            "exam": bundle["exam"],
             "student": UserSerializer(request.user).data
         })
 
@@ -137,15 +148,130 @@ class QuestionByIndexView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, exam_id, index): # Changed parameter
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
+        bundle = get_exam_bundle(exam_id)
         try:
-            exam = Exam.objects.get(id=exam_id, school=school)
-            question = Question.objects.filter(exam=exam).order_by("question_number")[index]
-        except (Exam.DoesNotExist, IndexError):
+            if not bundle or bundle["school_id"] != school_id:
+                raise IndexError
+            question = dict(bundle["questions"][index])
+        except IndexError:
             return Response({"error": "Question not found"}, status=404)
 
-        serializer = QuestionWithAnswerSerializer(question, context={"request": request})
-        return Response(serializer.data)
+        question["student_answer"] = StudentAnswer.objects.filter(
+            user=request.user, question_id=question["id"]
+        ).values_list("answer_text", flat=True).first()
+        return Response(question)
+
+
+# -------------------
+# Whole Exam Paper (all questions + images + saved answers in one call)
+# -------------------
+class ExamPaperView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, exam_id):
+        school_id = get_auth_context(request).school_id
+        bundle = get_exam_bundle(exam_id)
+        if not bundle or bundle["school_id"] != school_id:
+            return Response({"error": "Exam not found"}, status=404)
+
+        # Questions come from the shared cache; only this student's answers hit the DB
+        answers = dict(
+            StudentAnswer.objects.filter(user=request.user, question__exam_id=exam_id)
+            .values_list("question_id", "answer_text")
+        )
+
+        payload = {
+            "exam": bundle["exam"],
+            "questions": [
+                dict(question, student_answer=answers.get(question["id"]))
+                for question in bundle["questions"]
+            ],
+        }
+
+        # ETag lets a client that reloads mid-exam revalidate with a 304 instead of a full download
+        digest = hashlib.md5(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        etag = f'"{digest}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+# -------------------
+# Offline Exam Pack (exam + questions + images in one signed zip, see exam_packs.py)
+# -------------------
+class ExamPackView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, exam_id):
+        school_id = get_auth_context(request).school_id
+        exam = Exam.objects.filter(id=exam_id, school_id=school_id).first()
+        if not exam:
+            return Response({"error": "Exam not found"}, status=404)
+
+        # The pack is the full paper: same window as the online start, and only for a running session
+        if not exam.start_datetime:
+            return Response({"error": "Exam start time is not configured."}, status=400)
+        now = timezone.now()
+        if now < exam.start_datetime:
+            return Response({"error": "The exam has not started yet."}, status=403)
+        if now > exam.start_datetime + timezone.timedelta(minutes=exam.duration_minutes):
+            return Response({"error": "The exam window has already closed."}, status=403)
+        session = ExamSession.objects.filter(user=request.user, exam=exam).first()
+        if not session:
+            return Response({"error": "Start the exam before downloading its pack."}, status=409)
+
+        pack = get_exam_pack(exam_id)
+        etag = f'"{pack.sha256}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = FileResponse(
+                pack.file.open("rb"), as_attachment=True,
+                filename=f"exam_{exam_id}_pack.zip", content_type="application/zip",
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        response["X-Exam-Pack-Signature"] = pack.signature
+        # The device signs its offline answer batches with this (SyncAnswersView)
+        response["X-Exam-Sync-Key"] = sync_key(session)
+        return response
+
+
+# -------------------
+# Sync Offline Answers
+# -------------------
+class SyncAnswersView(APIView):
+    # The batch is authenticated by its X-Sync-Signature; the access token has usually expired by the time it arrives
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, exam_id):
+        body = request.body # Signed bytes, read before DRF parses the stream
+        try:
+            batch = json.loads(body)
+            user_id = int(batch.get("user_id"))
+        except (ValueError, TypeError, AttributeError):
+            return Response({"error": "Body must be JSON with 'user_id' and 'answers'"}, status=400)
+
+        entries = batch.get("answers")
+        if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            return Response({"error": "'answers' must be a list of {questionId, answer, client_ts}"}, status=400)
+
+        # No session means the candidate never started, or already submitted online: nothing to sync into
+        session = ExamSession.objects.select_related("exam").filter(user_id=user_id, exam_id=exam_id).first()
+        if not session or not verify_batch(session, body, request.headers.get("X-Sync-Signature", "")):
+            return Response({"error": "Invalid signature or no running session"}, status=403)
+
+        if timezone.now() > sync_deadline(session):
+            return Response({"error": "The sync window for this exam has closed."}, status=403)
+
+        result = sync_answers(session, entries, finished=bool(batch.get("finished")))
+        return Response({"status": "synced", **result})
 
 
 # -------------------
@@ -155,31 +281,47 @@ class SaveAnswerView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
         question_id = request.data.get("questionId")
         answer_text = request.data.get("selectedOption") # This is the generic answer
+        entry = {
+            "questionId": question_id,
+            "answer": answer_text,
+            "client_ts": request.data.get("client_ts"),
+        }
 
-        question = generics.get_object_or_404(Question, id=question_id, school=school)
+        # Write-behind mode: journal it now, the flusher grades and stores it in bulk
+        if journal_enabled():
+            append_answers(request.user.id, school_id, [entry])
+            return Response({"status": "saved", "queued": True})
 
-        # Logic for auto-grading Objective, T/F, and FITG
-        is_correct = False
-        if question.question_type in ['obj', 'tf', 'fitg']:
-            provided = str(answer_text).strip().lower()
-            actual = str(question.correct_answer).strip().lower()
-            if provided == actual:
-                is_correct = True
+        result = save_answers(request.user.id, school_id, [entry])
+        if result["invalid"]:
+            return Response({"detail": "No Question matches the given query."}, status=404)
+        if result["stale"]:
+            return Response({"status": "stale"})
 
-        answer, created = StudentAnswer.objects.update_or_create(
-            user=request.user,
-            question=question,
-            defaults={
-                'school': school,
-                'answer_text': answer_text,
-                'is_correct': is_correct,
-                'is_graded': question.question_type != 'essay' # Essay remains ungraded
-            }
-        )
-        return Response({"status": "saved", "is_correct": is_correct})
+        return Response({"status": "saved", "is_correct": result["saved"][0]["is_correct"]})
+
+
+# -------------------
+# Save Student Answers (batch)
+# -------------------
+class SaveAnswersBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        entries = request.data.get("answers")
+        if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            return Response({"error": "'answers' must be a list of {questionId, answer, client_ts}"}, status=400)
+
+        school_id = get_auth_context(request).school_id
+        if journal_enabled():
+            append_answers(request.user.id, school_id, entries)
+            return Response({"status": "saved", "queued": len(entries)})
+
+        result = save_answers(request.user.id, school_id, entries)
+        return Response({"status": "saved", **result})
 
 
 # -------------------
@@ -189,9 +331,9 @@ class StartExamSessionView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, exam_id):
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
         try:
-            exam = Exam.objects.get(id=exam_id, school=school)
+            exam = Exam.objects.get(id=exam_id, school_id=school_id)
         except Exam.DoesNotExist:
             return Response({"error": "Exam not found"}, status=404)
 
@@ -209,12 +351,15 @@ class StartExamSessionView(APIView):
         if now > official_end_time:
             return Response({"error": "The exam window has already closed."}, status=403)
 
+        # Build (or confirm) the compiled answer key now so answer saves never read Question rows
+        get_answer_key(exam.id)
+
         existing = ExamSession.objects.filter(user=request.user, exam=exam).first()
         if existing:
             return Response(ExamSessionSerializer(existing).data)
 
         session = ExamSession.objects.create(
-            school=school,
+            school_id=school_id,
             user=request.user,
             exam=exam,
             start_time=now,           
@@ -230,10 +375,10 @@ class RemainingTimeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, exam_id):
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
         try:
-            exam = Exam.objects.get(id=exam_id, school=school)
-            session = ExamSession.objects.get(school=school, user=request.user, exam=exam)
+            exam = Exam.objects.get(id=exam_id, school_id=school_id)
+            session = ExamSession.objects.get(school_id=school_id, user=request.user, exam=exam)
         except (Exam.DoesNotExist, ExamSession.DoesNotExist):
             return Response({"remaining_time": 0})
 
@@ -242,6 +387,34 @@ class RemainingTimeView(APIView):
         return Response({"remaining_time": max(0, int(remaining))})
 
 
+# -------------------
+# Exam Clock Stream (SSE, replaces /time/ polling when served under ASGI)
+# -------------------
+async def exam_clock_stream(request, exam_id):
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would pin a worker for the whole exam; clients keep polling /time/
+        return JsonResponse({"error": "Clock stream needs the ASGI server, poll /time/ instead."}, status=501)
+
+    # EventSource can't set headers, so the access token may also come as ?token=
+    context = await aget_auth_context(request, allow_query_token=True)
+    if context is None:
+        return JsonResponse({"detail": "Invalid or expired token"}, status=401)
+    if context.school_id and not context.is_subscription_active():
+        return JsonResponse({"detail": "Subscription expired", "status": "expired"}, status=403)
+
+    end_time = await get_session_end(context.user_id, exam_id, context.school_id)
+    if end_time is None:
+        return JsonResponse({"error": "No active session found"}, status=404)
+
+    response = StreamingHttpResponse(
+        clock_events(context.user_id, exam_id, context.school_id, end_time),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no" # Stop nginx from buffering the events
+    return response
+
+
 # -------------------
 # End Exam Session + Calculate Score
 # -------------------
@@ -249,7 +422,7 @@ class EndExamSessionView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, exam_id):
-        school = request.user.userprofile.school
+        school_id = get_auth_context(request).school_id
         user = request.user
         
         # Discrepancy Fix: Verify session exists and isn't expired before allowing submit
@@ -260,32 +433,13 @@ class EndExamSessionView(APIView):
         # Logic: We allow the submit even if slightly over, but you can be strict:
         # if timezone.now() > session.end_time + timezone.timedelta(seconds=30): ...
 
-        # Sum the 'point' value of all questions where is_correct is True
-        score_data = StudentAnswer.objects.filter(
-            school=school,
-            user=user,
-            question__exam_id=exam_id,
-            is_correct=True
-        ).aggregate(total_points=Sum('question__point'))
-
-        total_score = score_data['total_points'] or 0.0
-
-        # Handle Essays: Add manually graded points
-        essay_points = StudentAnswer.objects.filter(
-            user=user,
-            question__exam_id=exam_id,
-            question__question_type='essay',
-            is_graded=True
-        ).aggregate(essay_sum=Sum('points_earned'))['essay_sum'] or 0.0
-
-        final_total = total_score + essay_points
+        # Write-behind mode: make sure every journaled answer is in StudentAnswer before scoring
+        if journal_enabled():
+            flush_journal(user_id=user.id)
 
-        StudentScore.objects.update_or_create(
-            school=school,
-            user=user,
-            exam_id=exam_id,
-            defaults={"score": final_total}
-        )
+        # One grouped query for the total, one upsert for StudentScore
+        final_total = compute_scores(exam_id, [user.id])[user.id]
+        save_scores(exam_id, school_id, {user.id: final_total})
 
         session.delete()
         return Response({"score": final_total})
@@ -400,6 +554,7 @@ class StartSubscriptionView(APIView):
         school.subscription_end = now() + timedelta(days=PLAN_DAYS[plan])
         school.is_active = True
         school.save()
+        subscription_changed.send(sender=School, school_id=school.id)
 
     def initialize_paystack_payment(self, email, plan):
         amount_map = {
@@ -438,6 +593,51 @@ class StartSubscriptionView(APIView):
 
 
 
+# -------------------
+# Relay Node API (central side, see relay.py); nodes authenticate with "Authorization: Relay <key>"
+# -------------------
+def relay_snapshot(request):
+    node = relay.authenticate_node(request)
+    if not node:
+        return JsonResponse({"error": "Unknown relay node"}, status=401)
+
+    try:
+        day = relay.parse_day(request.GET.get("day"))
+    except ValueError:
+        return JsonResponse({"error": "day must be YYYY-MM-DD"}, status=400)
+    exam_ids = [int(e) for e in request.GET.getlist("exam") if e.isdigit()]
+
+    response = HttpResponse(relay.encode(relay.snapshot(node, day, exam_ids)), content_type="application/json")
+    response["Content-Encoding"] = "gzip"
+    return response
+
+
+def relay_blob(request, sha):
+    node = relay.authenticate_node(request)
+    if not node:
+        return JsonResponse({"error": "Unknown relay node"}, status=401)
+
+    blob = relay.blob_for_node(node, sha)
+    if not blob:
+        return JsonResponse({"error": "Image not found"}, status=404)
+    return FileResponse(blob.file.open("rb"), content_type="application/octet-stream")
+
+
+@csrf_exempt
+def relay_push(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "POST only"}, status=405)
+    node = relay.authenticate_node(request)
+    if not node:
+        return JsonResponse({"error": "Unknown relay node"}, status=401)
+
+    try:
+        payload = relay.decode(request.body, request.headers.get("Content-Encoding"))
+    except (OSError, ValueError):
+        return JsonResponse({"error": "Body must be JSON (optionally gzipped)"}, status=400)
+    return JsonResponse(relay.apply_push(node, payload))
+
+
 @csrf_exempt
 def paystack_webhook(request):
     payload = json.loads(request.body)
@@ -463,6 +663,7 @@ def paystack_webhook(request):
     school.subscription_end = now() + timedelta(days=days)
     school.is_active = True
     school.save()
+    subscription_changed.send(sender=School, school_id=school.id)
 
     return HttpResponse(status=200)
 
@@ -480,6 +681,7 @@ def grade_essays(request, exam_id):
     
     if request.method == "POST":
         # 1. Update the individual essay answers
+        graded = []
         for answer in answers:
             score_input = request.POST.get(f"score_{answer.id}")
             if score_input is not None and score_input != "":
@@ -491,23 +693,12 @@ def grade_essays(request, exam_id):
                 answer.is_graded = True
                 # A question is 'correct' if it earned any points
                 answer.is_correct = True if val > 0 else False
-                answer.save()
+                graded.append(answer)
 
-        # 2. Recalculate StudentScores (DO THIS ONCE outside the loop)
-        # Find all students who took this exam
-        student_ids = StudentAnswer.objects.filter(question__exam=exam).values_list('user', flat=True).distinct()
-        
-        for s_id in student_ids:
-            total_pts = StudentAnswer.objects.filter(
-                user_id=s_id, 
-                question__exam=exam
-            ).aggregate(total=Sum('points_earned'))['total'] or 0.0
-            
-            StudentScore.objects.update_or_create(
-                user_id=s_id, 
-                exam=exam,
-                defaults={'score': int(total_pts), 'school': exam.school}
-            )
+        StudentAnswer.objects.bulk_update(graded, ['points_earned', 'is_graded', 'is_correct'], batch_size=500)
+
+        # 2. Recalculate StudentScores for everyone in one pass
+        score_exam(exam)
         
         messages.success(request, "Grades saved. Scores recalculated for all students.")
         return redirect("..")
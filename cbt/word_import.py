@@ -0,0 +1,284 @@
+#word_import.py
+"""
+Applies an edited Word template (see ExamAdmin.generate_word_template) to an exam.
+
+  1. parse: one pass over the paragraphs builds a list of ParsedQuestion (text, tags,
+     options, images). Images are found with an xpath on each paragraph instead of
+     serialising its XML.
+  2. validate: every question is checked up front. If anything is wrong nothing is
+     imported and the caller gets one error per question to fix. Blocks the template
+     emitted for an empty question and nobody filled in (placeholder Q text, no images)
+     are skipped, not errors.
+  3. apply, in one transaction:
+     * new questions are bulk_created, changed ones bulk_updated, unchanged ones skipped
+     * images are compared by sha256 (QuestionImage.content_hash): unchanged images stay,
+       new ones go through the content-addressed blob store (image_store.py), which
+       writes only contents it hasn't stored before, in parallel threads. Those files are
+       deleted again if the transaction rolls back
+     * bulk operations skip the Question signals, so answer-key changes are queued for
+       regrade here (regrade.queue_regrade) and the exam cache is invalidated on commit
+"""
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+from django.db import transaction
+from docx import Document
+
+from .exam_cache import invalidate_exam
+from .image_store import add_refs, discard_files, store_blobs
+from .models import Question, QuestionImage
+from .regrade import key_changed, queue_regrade, snapshot
+
+
+END_TAG = "[[[% END %]]]"
+PLACEHOLDER_TEXT = "[Enter Question Here]" # Q text generate_word_template writes for an empty question
+QUESTION_FIELDS = [
+    'question_type', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer', 'point',
+]
+
+ParsedQuestion = namedtuple("ParsedQuestion", "number block images")
+DocImage = namedtuple("DocImage", "blob ext sha")
+
+
+def extract_tag(tag, text):
+    pattern = rf"\[\[\[% {tag} %\]\]\](.*?)\[\[\[% /{tag} %\]\]\]"
+    match = re.search(pattern, text, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def extract_option(letter, text):
+    pattern = rf"\[\[{letter}\]\](.*?)(\[\[|$)"
+    match = re.search(pattern, text, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+# -------------------
+# 1. Parse
+# -------------------
+def parse_document(word_file):
+    """
+    -> [ParsedQuestion]. A block runs up to its END tag; the images between the previous
+    END and this one belong to the block's question (same rule as the original importer).
+    """
+    doc = Document(word_file)
+
+    images = {}
+    for rel in doc.part.rels.values():
+        if "image" in rel.reltype:
+            blob = rel.target_part.blob
+            images[rel.rId] = DocImage(blob, os.path.splitext(rel.target_part.partname)[1] or ".png", hashlib.sha256(blob).hexdigest())
+
+    blocks = []
+    lines, block_images = [], []
+    for para in doc.paragraphs:
+        block_images += [images[r_id] for r_id in para._p.xpath('.//a:blip/@r:embed') if r_id in images]
+
+        text = para.text
+        while END_TAG in text:
+            before, text = text.split(END_TAG, 1)
+            lines.append(before)
+            blocks.append(("\n".join(lines), block_images))
+            lines, block_images = [], []
+        lines.append(text)
+    blocks.append(("\n".join(lines), block_images))
+
+    parsed = []
+    for block, block_images in blocks:
+        q_match = re.search(r"--- Question (\d+) ---", block)
+        if q_match:
+            parsed.append(ParsedQuestion(int(q_match.group(1)), block, block_images))
+    return parsed
+
+
+# -------------------
+# 2. Validate
+# -------------------
+def question_values(parsed):
+    """-> (field values for Question, error or None)"""
+    block = parsed.block
+    q_type = extract_tag("TYPE", block).lower()
+    opt_block = extract_tag("OPTIONS", block)
+    correct = extract_tag("CORRECT", block).upper()
+
+    values = {
+        'question_type': q_type,
+        'question_text': extract_tag("Q", block),
+        'option_a': extract_option('A', opt_block) if q_type == 'obj' else None,
+        'option_b': extract_option('B', opt_block) if q_type == 'obj' else None,
+        'option_c': extract_option('C', opt_block) if q_type == 'obj' else None,
+        'option_d': extract_option('D', opt_block) if q_type == 'obj' else None,
+        'correct_answer': correct,
+    }
+
+    try:
+        values['point'] = float(extract_tag("POINTS", block) or "1.0")
+    except ValueError:
+        return values, f"POINTS must be a number, got '{extract_tag('POINTS', block)}'."
+
+    if q_type not in dict(Question.QUESTION_TYPES):
+        return values, f"TYPE must be one of obj, tf, fitg, essay, got '{q_type}'."
+    if not values['question_text'] and not parsed.images:
+        return values, "The question text (Q tag) is empty."
+    if values['point'] < 0:
+        return values, "POINTS can't be negative."
+    if q_type == 'obj':
+        if correct not in ('A', 'B', 'C', 'D'):
+            return values, f"CORRECT must be A, B, C or D for obj questions, got '{correct}'."
+        if not values[f'option_{correct.lower()}']:
+            return values, f"The correct option {correct} is empty."
+        if any(len(values[f'option_{letter}'] or "") > 255 for letter in 'abcd'):
+            return values, "Options can be at most 255 characters."
+    if q_type == 'tf' and correct not in ('T', 'F'):
+        return values, f"CORRECT must be T or F for tf questions, got '{correct}'."
+    if q_type == 'fitg' and not correct:
+        return values, "CORRECT is empty; fitg questions need the expected answer."
+    return values, None
+
+
+def is_placeholder(parsed):
+    return extract_tag("Q", parsed.block) in ("", PLACEHOLDER_TEXT) and not parsed.images
+
+
+def validate(parsed_questions):
+    """-> ({number: (values, images)}, [{"question", "error"}], [skipped placeholder numbers])"""
+    questions, errors, skipped = {}, [], []
+    for parsed in parsed_questions:
+        if is_placeholder(parsed):
+            skipped.append(parsed.number)
+            continue
+        if parsed.number in questions:
+            errors.append({"question": parsed.number, "error": "This question number appears more than once."})
+            continue
+        values, error = question_values(parsed)
+        if error:
+            errors.append({"question": parsed.number, "error": error})
+        questions[parsed.number] = (values, parsed.images)
+    return questions, errors, skipped
+
+
+# -------------------
+# 3. Apply
+# -------------------
+def _sync_images(exam, questions_by_number, images_by_number, report, written, progress=None):
+    existing = {}
+    for image in QuestionImage.objects.filter(question__in=questions_by_number.values()).order_by('id'):
+        existing.setdefault(image.question_id, []).append(image)
+
+    to_delete, to_write = [], [] # to_write: (question, DocImage)
+    for number, question in questions_by_number.items():
+        wanted = images_by_number[number]
+        current = existing.get(question.id, [])
+        if [image.content_hash for image in current] == [image.sha for image in wanted]:
+            report["images_kept"] += len(current)
+            continue
+
+        # Keep the stored files whose content is still wanted, write the rest
+        kept = {}
+        for image in current:
+            if image.content_hash and image.content_hash not in kept:
+                kept[image.content_hash] = image
+            else:
+                to_delete.append(image.id)
+        wanted_hashes = {image.sha for image in wanted}
+        for sha, image in list(kept.items()):
+            if sha not in wanted_hashes:
+                to_delete.append(image.id)
+                del kept[sha]
+        report["images_kept"] += len(kept)
+
+        for image in wanted:
+            if image.sha not in kept:
+                kept[image.sha] = None # Same picture twice in one question is stored once
+                to_write.append((question, image))
+
+    if to_delete:
+        QuestionImage.objects.filter(id__in=to_delete).delete()
+        report["images_removed"] = len(to_delete)
+
+    if not to_write:
+        return
+
+    # Only contents the blob store hasn't seen are written (in parallel); repeats share the blob
+    if progress:
+        progress(70, f"Saving {len(to_write)} images")
+    blobs = store_blobs(((image.sha, image.blob, image.ext) for _, image in to_write), written)
+
+    QuestionImage.objects.bulk_create([
+        QuestionImage(question=question, image=blobs[image.sha].file.name, content_hash=image.sha, blob=blobs[image.sha])
+        for question, image in to_write
+    ])
+    add_refs(blobs[image.sha].id for _, image in to_write) # bulk_create skips the ref-counting signal
+    report["images_written"] = len(to_write)
+
+
+def import_word_document(exam, word_file, progress=None):
+    """
+    Returns a report: {"created", "updated", "unchanged", "skipped", "images_written",
+    "images_kept", "images_removed", "highest", "errors"}. When "errors" is not empty
+    nothing was changed; "skipped" lists the untouched placeholder questions.
+    """
+    if progress:
+        progress(5, "Reading the document")
+    questions, errors, skipped = validate(parse_document(word_file))
+
+    report = {
+        "created": 0, "updated": 0, "unchanged": 0, "skipped": skipped,
+        "images_written": 0, "images_kept": 0, "images_removed": 0,
+        "highest": max(questions, default=0), "errors": errors,
+    }
+    if errors or not questions:
+        return report
+
+    if progress:
+        progress(30, f"Saving {len(questions)} questions")
+    written = [] # Blob files this import wrote
+    try:
+        _apply(exam, questions, report, written, progress)
+    except Exception:
+        # The blob rows went with the rollback; nothing would ever reference or collect their files
+        discard_files(written)
+        raise
+    return report
+
+
+def _apply(exam, questions, report, written, progress):
+    with transaction.atomic():
+        existing = {q.question_number: q for q in Question.objects.select_for_update().filter(exam=exam)}
+
+        to_create, to_update, key_changes = [], [], []
+        for number, (values, _) in questions.items():
+            question = existing.get(number)
+            if question is None:
+                to_create.append(Question(exam=exam, school=exam.school, question_number=number, **values))
+                continue
+
+            before = snapshot(question)
+            if all(getattr(question, field) == value for field, value in values.items()) and question.school_id == exam.school_id:
+                report["unchanged"] += 1
+                continue
+            for field, value in values.items():
+                setattr(question, field, value)
+            question.school = exam.school
+            to_update.append(question)
+            if key_changed(before, question):
+                key_changes.append((question, before))
+
+        Question.objects.bulk_create(to_create)
+        Question.objects.bulk_update(to_update, QUESTION_FIELDS + ['school'], batch_size=500)
+        report["created"], report["updated"] = len(to_create), len(to_update)
+
+        # bulk_update skips the pre/post_save signals that normally queue these
+        for question, before in key_changes:
+            queue_regrade(question, before)
+
+        questions_by_number = {**existing, **{q.question_number: q for q in to_create}}
+        questions_by_number = {number: questions_by_number[number] for number in questions}
+        _sync_images(exam, questions_by_number, {n: images for n, (_, images) in questions.items()}, report, written, progress)
+
+        if report["highest"] > exam.total_questions:
+            exam.total_questions = report["highest"]
+            exam.save(update_fields=['total_questions'])
+
+        transaction.on_commit(lambda: invalidate_exam(exam.id))
@@ -0,0 +1,174 @@
+#xlsx.py
+"""
+Minimal streaming XLSX writer for large exports.
+
+openpyxl keeps the workbook in memory (or, in write-only mode, in a temp file) until
+save(), so nothing reaches the client until the last row is written. Here the zip is
+written to an unseekable sink (zipfile then uses data descriptors) and whatever has been
+compressed so far is yielded every CHUNK_ROWS rows, so memory stays flat and the
+download starts with the first rows.
+
+    stream_xlsx([("Results", ["Name", "Score"], rows), ...])  # rows: iterable of tuples
+
+Cells are numbers (int/float/Decimal) or text; None is an empty cell. The first row of
+each sheet is bold. Sheets are written one after another, so each sheet's rows may be
+a lazy iterator.
+"""
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+
+CHUNK_ROWS = 500
+
+# XML 1.0 can't carry these; Excel refuses the file if they slip into a cell
+ILLEGAL_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Style 0: default, style 1: bold (header row)
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+
+class _Sink:
+    """Write-only file object; zipfile sees no seek/tell and streams with data descriptors."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def sheet_title(title, taken=()):
+    """Excel sheet names: max 31 chars, no []:*?/\\ , unique in the workbook."""
+    title = re.sub(r"[\[\]:*?/\\]", " ", str(title)).strip()[:31] or "Sheet"
+    candidate, n = title, 2
+    while candidate.lower() in {t.lower() for t in taken}:
+        suffix = f" ({n})"
+        candidate, n = title[:31 - len(suffix)] + suffix, n + 1
+    return candidate
+
+
+def _cell(ref, value, style):
+    style_attr = ' s="1"' if style else ""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    text = escape(ILLEGAL_CHARS.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(number, values, style=0):
+    cells = "".join(_cell(f"{column_letter(i)}{number}", value, style) for i, value in enumerate(values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_xlsx(sheets):
+    """sheets: iterable of (title, header, rows). Yields the .xlsx file in chunks."""
+    sink = _Sink()
+    titles = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for title, header, rows in sheets:
+            titles.append(sheet_title(title, titles))
+            with archive.open(f"xl/worksheets/sheet{len(titles)}.xml", "w") as sheet:
+                sheet.write(SHEET_START.encode())
+                sheet.write(_row(1, header, style=1).encode())
+
+                lines = []
+                for number, values in enumerate(rows, start=2):
+                    lines.append(_row(number, values))
+                    if len(lines) >= CHUNK_ROWS:
+                        sheet.write("".join(lines).encode())
+                        lines = []
+                        yield sink.drain()
+                sheet.write("".join(lines).encode())
+                sheet.write(SHEET_END.encode())
+            yield sink.drain()
+
+        # The index parts only need the sheet titles, so they go after the data
+        numbers = range(1, len(titles) + 1)
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES.format(
+            sheets="".join(SHEET_CONTENT_TYPE.format(n=n) for n in numbers)
+        ))
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("xl/workbook.xml", WORKBOOK.format(sheets="".join(
+            f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, title in zip(numbers, titles)
+        )))
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS.format(sheets="".join(
+            f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{n}.xml"/>'
+            for n in numbers
+        )))
+        archive.writestr("xl/styles.xml", STYLES)
+    yield sink.drain()
@@ -0,0 +1,19 @@
+"""
+Celery app for background jobs (cbt/jobs.py). Only used when JOBS_EAGER is off, which
+needs CELERY_BROKER_URL set explicitly. The worker is then an extra process, e.g. a
+Procfile line next to web:
+
+    worker: celery -A cbt_backend worker --pool threads --concurrency 4 -l info
+
+Use the threads pool: jobs start their own process pools for CPU-heavy work (password
+hashing, PDF pages), and Celery's prefork children are not allowed to have children.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cbt_backend.settings')
+
+app = Celery('cbt_backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,44 @@
+"""
+Gunicorn profile for serving cbt_backend.asgi with uvicorn workers. The Procfile serves
+WSGI; switch its web command to this (with ASYNC_CANDIDATE_VIEWS=True) only after the
+comparison below shows a win:
+
+    gunicorn cbt_backend.asgi:application -c cbt_backend/gunicorn_asgi.py
+
+One event loop per worker. The async candidate views (cbt/async_views.py) and the exam
+clock stream wait on the cache without holding a thread, so a worker keeps thousands of
+mostly idle candidates connected. Sync views do NOT get a thread per request: Django runs
+all of a worker's sync code, async ORM calls included, on one thread (thread_sensitive).
+urls.py moves the candidate APIViews to the thread pool (async_views.offload), but the
+admin still runs on that one thread and queues behind itself, so keep heavy admin work
+(imports, exports) on a WSGI deployment or in jobs.
+
+Tuning (all from the environment):
+  WEB_CONCURRENCY        worker processes, default = CPU cores (not 2n+1, each worker is a loop)
+  GUNICORN_TIMEOUT       seconds before a stuck worker is restarted
+  GUNICORN_KEEPALIVE     idle keep-alive seconds; candidates poll every few seconds, keep it above that
+
+Keep CONN_MAX_AGE at 0 under ASGI (pool threads close their connection after each call);
+put pgbouncer in front of Postgres if connection setup shows up in profiles.
+
+Comparing with the sync deployment (same box, same database):
+
+    gunicorn cbt_backend.wsgi:application -w 9 --threads 4            # sync, ASYNC_CANDIDATE_VIEWS=False
+    gunicorn cbt_backend.asgi:application -c cbt_backend/gunicorn_asgi.py
+    python manage.py loadtest --base-url http://127.0.0.1:8000 --students 2000 \
+        --think-time 2 --output asgi.json [--baseline wsgi.json]
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 75))
+
+# Recycle workers now and then so slow leaks can't build up over an exam day
+max_requests = 20000
+max_requests_jitter = 2000
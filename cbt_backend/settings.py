@@ -179,6 +179,104 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Read by the exam client when it downloads an offline pack (cbt/exam_packs.py)
+CORS_EXPOSE_HEADERS = ["ETag", "X-Exam-Pack-Signature", "X-Exam-Sync-Key"]
+
+# Shared cache (exam question payloads, etc.). Falls back to per-process memory when no Redis is configured,
+# which is only safe with a single worker process (cbt/checks.py fails the system check otherwise)
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+EXAM_CACHE_TIMEOUT = int(os.getenv("EXAM_CACHE_TIMEOUT", 60 * 60))
+
+# Cached school/role/class/subscription per user (shared cache TTL, then a short per-process TTL)
+AUTH_CONTEXT_TTL = int(os.getenv("AUTH_CONTEXT_TTL", 300))
+AUTH_CONTEXT_LOCAL_TTL = int(os.getenv("AUTH_CONTEXT_LOCAL_TTL", 10))
+SUBSCRIPTION_CACHE_TTL = int(os.getenv("SUBSCRIPTION_CACHE_TTL", 300))
+
+# Answer saves: "direct" writes StudentAnswer per request, "journal" appends to a write-behind
+# journal that `manage.py flush_answer_journal` merges in bulk (sqlite:///... or redis://...)
+ANSWER_WRITE_MODE = os.getenv("ANSWER_WRITE_MODE", "direct")
+ANSWER_JOURNAL_URL = os.getenv("ANSWER_JOURNAL_URL", f"sqlite:///{BASE_DIR / 'answer_journal.sqlite3'}")
+
+# Serve answer saves, question fetches, session start and remaining time from the async views
+# (cbt/async_views.py). Only worth turning on together with the ASGI server (cbt_backend/gunicorn_asgi.py),
+# and only once `manage.py loadtest --baseline` shows it beating the WSGI deployment on your hardware
+ASYNC_CANDIDATE_VIEWS = os.getenv("ASYNC_CANDIDATE_VIEWS", "False") == "True"
+
+# Processes used to hash passwords during bulk student imports (default: one per CPU core)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0)) or None
+
+# Django's defaults plus the exam-account hasher; the first entry stays the default for everyone
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'cbt.hashing.ExamAccountHasher',
+]
+
+# Processes drawing per-class result slip PDFs (ExamAdmin print slips, ?split=class); default: one per CPU core
+SLIP_WORKERS = int(os.getenv("SLIP_WORKERS", 0)) or None
+
+# Question image variants (cbt/image_variants.py): widths in px, and processes resizing them (default: one per CPU core)
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1024").split(",") if w.strip()]
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 0)) or None
+
+# Widest image variant put in offline exam packs (cbt/exam_packs.py)
+EXAM_PACK_IMAGE_WIDTH = int(os.getenv("EXAM_PACK_IMAGE_WIDTH", 1024))
+
+# Minutes after a candidate's end time (server clock) that offline answer batches are still accepted
+EXAM_SYNC_GRACE_MINUTES = int(os.getenv("EXAM_SYNC_GRACE_MINUTES", 60))
+
+# Relay mode (cbt/relay.py): set both on an exam-centre node to pull from / push to the central server
+RELAY_UPSTREAM_URL = os.getenv("RELAY_UPSTREAM_URL", "")
+RELAY_KEY = os.getenv("RELAY_KEY", "")
+
+# Opt-in lower-cost hashing for temporary exam-only student accounts (weaker if the database leaks; see cbt/hashing.py)
+EXAM_ACCOUNT_FAST_HASH = os.getenv("EXAM_ACCOUNT_FAST_HASH", "False") == "True"
+EXAM_ACCOUNT_HASH_ITERATIONS = int(os.getenv("EXAM_ACCOUNT_HASH_ITERATIONS", 100_000))
+
+# With fast hashing on, ExamAccountBackend verifies exam-account hashes without upgrading them at login and
+# everything else falls through to ModelBackend. Off, it would only repeat ModelBackend's user lookup
+AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+if EXAM_ACCOUNT_FAST_HASH:
+    AUTHENTICATION_BACKENDS.insert(0, 'cbt.hashing.ExamAccountBackend')
+
+# Background jobs (cbt/jobs.py). Without a broker they run in-process (eager) after the request commits;
+# with one, `celery -A cbt_backend worker --pool threads` runs them (see cbt_backend/celery.py).
+# The broker is never taken from REDIS_URL: a shared cache alone doesn't switch jobs to Celery
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "")
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+JOBS_EAGER = os.getenv("JOBS_EAGER", "False" if CELERY_BROKER_URL else "True") == "True"
+# With a Celery worker, job files must be reachable from both sides: set this when MEDIA_ROOT is a shared volume
+JOBS_SHARED_STORAGE = os.getenv("JOBS_SHARED_STORAGE", "False") == "True"
+# Seconds a job keeps secrets it produced (passwords from a student import), encrypted, before they are dropped
+JOB_SECRET_TTL = int(os.getenv("JOB_SECRET_TTL", 3600))
+
+# Seconds after a regrade before its second pass re-marks answers saved with the old key (cbt/regrade.py)
+REGRADE_SETTLE_SECONDS = int(os.getenv("REGRADE_SETTLE_SECONDS", 120))
+
+# Exam clock stream (/api/exam/<id>/clock/): seconds between heartbeats, and between checks for admin changes
+EXAM_CLOCK_HEARTBEAT = int(os.getenv("EXAM_CLOCK_HEARTBEAT", 15))
+EXAM_CLOCK_POLL = float(os.getenv("EXAM_CLOCK_POLL", 1.0))
+# Seconds between each stream's own re-read of its session, so changes also arrive without a shared cache
+EXAM_CLOCK_RESYNC = int(os.getenv("EXAM_CLOCK_RESYNC", 10))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (